@@ -8,7 +8,7 @@ from typing import Iterable, Union, MutableMapping, MutableSet
 
 from adventofcode2019.boundless_grid import BoundlessGrid, Coord
 from adventofcode2019.intcode.computer import IntcodeComputerV11
-from adventofcode2019.intcode.exceptions import WaitingForInput
+from adventofcode2019.intcode.run_status import RunStatus
 
 LOG = logging.getLogger(__name__)
 
@@ -53,13 +53,10 @@ class PaintingRobot:
         self.painted_locations: MutableSet[Coord] = set()
 
     def run(self) -> None:
-        while not self.computer.is_terminated:
-            try:
-                self.computer.run()
-            except WaitingForInput:
-                # print(self.hull)
-                self.check_computer_output()
-                self.give_computer_input()
+        while self.computer.run_until(RunStatus.NEEDS_INPUT) is RunStatus.NEEDS_INPUT:
+            # print(self.hull)
+            self.check_computer_output()
+            self.give_computer_input()
 
     def check_computer_output(self) -> None:
         with suppress(queue.Empty):
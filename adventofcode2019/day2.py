@@ -1,5 +1,6 @@
 import argparse
 
+from adventofcode2019.intcode import symbolic
 from adventofcode2019.intcode.computer import run_intcode
 
 
@@ -8,14 +9,14 @@ def parta(input_data: str, noun: int = 12, verb: int = 2) -> str:
     fixed_state = input_state.copy()
     fixed_state[1] = noun
     fixed_state[2] = verb
-    return run_intcode(fixed_state).split(',')[0]
+    return str(run_intcode(fixed_state).memory[0])
 
 
 def partb(input_data: str) -> str:
-    for noun in range(0, 100):
-        for verb in range(0, 100):
-            if parta(input_data, noun=noun, verb=verb) == '19690720':
-                return str(100 * noun + verb)
+    solution = symbolic.solve(input_data, 19690720, symbols=(1, 2), domain=range(100))
+    if solution is not None:
+        noun, verb = solution
+        return str(100 * noun + verb)
 
 
 if __name__ == '__main__':
@@ -1,20 +1,23 @@
 import argparse
 import itertools
 import logging
-import queue
-import threading
-from contextlib import suppress
-from time import sleep
 from typing import Union, Iterable, Sequence
 
 from adventofcode2019.intcode.computer import IntcodeComputerV5
+from adventofcode2019.intcode.image import ProgramImage
+from adventofcode2019.intcode.memo import RunCache
+from adventofcode2019.intcode.scheduler import Scheduler
 
 LOG = logging.getLogger(__name__)
 
+AMPLIFIER_RUNS = RunCache()
+"""permutations share prefixes, and so the inputs of many amplifier runs"""
+
 
 def parta(code: Union[str, Iterable[Union[int, str]]]) -> int:
-    code = [int(instruction) for instruction in code.split(',')]
+    code = ProgramImage.of(code)
     best = None, -1
+    # run in this process, so that every permutation shares AMPLIFIER_RUNS
     for phase_settings in itertools.permutations(range(5)):
         result = output_for_phase_settings(code, phase_settings)
         if result > best[1]:
@@ -25,8 +28,9 @@ def parta(code: Union[str, Iterable[Union[int, str]]]) -> int:
 
 
 def partb(code: Union[str, Iterable[Union[int, str]]]) -> int:
-    code = [int(instruction) for instruction in code.split(',')]
+    code = ProgramImage.of(code)
     best = None, -1
+    # 120 runs take less than starting a process pool would
     for phase_settings in itertools.permutations(range(5, 10)):
         result = feedback_for_phase_settings(code, phase_settings)
         if result > best[1]:
@@ -36,36 +40,27 @@ def partb(code: Union[str, Iterable[Union[int, str]]]) -> int:
     return best[1]
 
 
-
-
 def output_for_phase_settings(code: Sequence[int], phase_settings: Iterable[int]) -> int:
+    code = ProgramImage.of(code)
     input_signal = 0
 
     for phase_setting in phase_settings:
-        vm = IntcodeComputerV5(code, stdin=[int(phase_setting), input_signal])
-        vm.run()
-        input_signal = list(vm.stdout)[0]
+        run = AMPLIFIER_RUNS.run(code, (int(phase_setting), input_signal), IntcodeComputerV5)
+        input_signal = run.outputs[0]
 
     return input_signal
 
 
 def feedback_for_phase_settings(code: Sequence[int], phase_settings: Iterable[int]) -> int:
-    vms = [IntcodeComputerV5(code, stdin=[int(phase_setting)]) for phase_setting in phase_settings]
-    threads = []
-    for vm in vms:
-        threads.append(threading.Thread(target=vm.run))
-        threads[-1].start()
-
-    vms[0].put_stdin(0)
-
-    while any(thread.is_alive() for thread in threads):
-        for idx in range(len(vms)):
-            vm = vms[idx]
-            with suppress(queue.Empty):
-                vms[(idx + 1) % len(vms)].put_stdin(vm.get_stdout_nowait())
-        sleep(0)  # ensure we rotate threads
-
-    return vms[-1].get_stdout()
+    code = ProgramImage.of(code)
+    scheduler = Scheduler()
+    vms = [scheduler.add(IntcodeComputerV5(code, stdin=[int(phase_setting)]))
+           for phase_setting in phase_settings]
+    for source, destination in zip(vms, vms[1:] + vms[:1]):
+        scheduler.connect(source, destination)
+    scheduler.send(vms[0], 0)
+    scheduler.run()
+    return scheduler.last_output[vms[-1]]
 
 
 if __name__ == '__main__':
@@ -1,7 +1,42 @@
+from .async_computer import AsyncIntcodeComputer
+from .batch import BatchIntcodeComputer
+from .channel import CallbackChannel, Channel, DequeChannel, SynchronizedChannel
 from .computer import IntcodeComputer, IntcodeComputerV5, IntcodeComputerV9
+from .image import ProgramImage
+from .memory import ArrayMemory, DictMemory, ListMemory, Memory, PagedMemory
+from .metrics import MetricsRegistry, VMMetrics
+from .network import Network
+from .profiler import Profiler
+from .result import MemoryView, RunResult
+from .run_status import RunStatus
+from .scheduler import Scheduler
+from .trace import Tracer
+from .watchdog import Watchdog
 
 __all__ = (
     'IntcodeComputer',
     'IntcodeComputerV5',
     'IntcodeComputerV9',
+    'AsyncIntcodeComputer',
+    'BatchIntcodeComputer',
+    'Channel',
+    'CallbackChannel',
+    'DequeChannel',
+    'SynchronizedChannel',
+    'Memory',
+    'ArrayMemory',
+    'DictMemory',
+    'ListMemory',
+    'PagedMemory',
+    'MetricsRegistry',
+    'VMMetrics',
+    'Network',
+    'ProgramImage',
+    'Profiler',
+    'MemoryView',
+    'RunResult',
+    'RunStatus',
+    'Scheduler',
+    'Tracer',
+    'Watchdog',
 )
@@ -0,0 +1,289 @@
+"""static analysis of Intcode programs: disassembly, basic blocks and control flow
+
+Code is found by following control flow from address 0, so data is never
+mistaken for instructions; the price is that code only reachable through an
+indirect jump (e.g. a return address pushed on the stack) is not found unless
+it is passed as an extra entry point.
+"""
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Mapping, MutableMapping, Optional, \
+    Sequence, Tuple, Union
+
+import attr
+
+from .image import ProgramImage, program_hash
+from .instruction import Operand
+from .opcode import Opcode
+from .parameter_mode import ParameterMode
+
+LOG = logging.getLogger(__name__)
+
+PARAMETER_COUNTS = {
+    Opcode.ADD: 3,
+    Opcode.MULTIPLY: 3,
+    Opcode.SAVE: 1,
+    Opcode.OUTPUT: 1,
+    Opcode.JUMP_IF_TRUE: 2,
+    Opcode.JUMP_IF_FALSE: 2,
+    Opcode.LESS_THAN: 3,
+    Opcode.EQUALS: 3,
+    Opcode.ADJUST_RELATIVE_BASE: 1,
+    Opcode.HALT: 0,
+}
+
+MNEMONICS = {
+    Opcode.ADD: 'add',
+    Opcode.MULTIPLY: 'mul',
+    Opcode.SAVE: 'in',
+    Opcode.OUTPUT: 'out',
+    Opcode.JUMP_IF_TRUE: 'jnz',
+    Opcode.JUMP_IF_FALSE: 'jz',
+    Opcode.LESS_THAN: 'lt',
+    Opcode.EQUALS: 'eq',
+    Opcode.ADJUST_RELATIVE_BASE: 'arb',
+    Opcode.HALT: 'halt',
+}
+
+WRITE_PARAMETER = {
+    Opcode.ADD: 3,
+    Opcode.MULTIPLY: 3,
+    Opcode.LESS_THAN: 3,
+    Opcode.EQUALS: 3,
+    Opcode.SAVE: 1,
+}
+
+JUMPS = {Opcode.JUMP_IF_TRUE, Opcode.JUMP_IF_FALSE}
+
+
+def format_operand(operand: Operand) -> str:
+    mode, value = operand
+    if mode == ParameterMode.POSITION:
+        return f'[{value}]'
+    elif mode == ParameterMode.IMMEDIATE:
+        return f'{value}'
+    return f'[rb{value:+d}]'
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class DecodedInstruction:
+    address: int
+    opcode: Opcode
+    operands: Tuple[Operand, ...]
+
+    @property
+    def size(self) -> int:
+        return 1 + len(self.operands)
+
+    @property
+    def next_address(self) -> int:
+        return self.address + self.size
+
+    @property
+    def written(self) -> Optional[Operand]:
+        """the operand this instruction writes through, if any"""
+        idx = WRITE_PARAMETER.get(self.opcode)
+        return None if idx is None else self.operands[idx - 1]
+
+    def successors(self) -> Tuple[Optional[int], ...]:
+        """where control can go next; None stands for an indirect jump target"""
+        if self.opcode == Opcode.HALT:
+            return ()
+        if self.opcode not in JUMPS:
+            return self.next_address,
+        (cond_mode, cond), (target_mode, target) = self.operands
+        target = target if target_mode == ParameterMode.IMMEDIATE else None
+        if cond_mode == ParameterMode.IMMEDIATE:
+            # a constant condition always or never jumps
+            return (target,) if (cond != 0) == (self.opcode == Opcode.JUMP_IF_TRUE) \
+                else (self.next_address,)
+        return target, self.next_address
+
+    def __str__(self) -> str:
+        operands = ', '.join(format_operand(operand) for operand in self.operands)
+        return f'{MNEMONICS[self.opcode]} {operands}'.rstrip()
+
+
+def decode(program: Sequence[int], address: int) -> Optional[DecodedInstruction]:
+    """the instruction at ``address``, or None if the word there is not one"""
+    if not 0 <= address < len(program):
+        return None
+    word = program[address]
+    try:
+        opcode = Opcode(word % 100)
+        operands = tuple((ParameterMode(word // 10 ** (idx + 1) % 10), program[address + idx])
+                         for idx in range(1, PARAMETER_COUNTS[opcode] + 1))
+    except (ValueError, IndexError):
+        return None
+    if word // 10 ** (len(operands) + 2):
+        # mode digits beyond the last parameter
+        return None
+    written = WRITE_PARAMETER.get(opcode)
+    if written is not None and operands[written - 1][0] == ParameterMode.IMMEDIATE:
+        return None
+    return DecodedInstruction(address, opcode, operands)
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class BasicBlock:
+    start: int
+    end: int
+    """the address just past the block"""
+    instructions: Tuple[DecodedInstruction, ...]
+    successors: Tuple[int, ...]
+    """starts of the blocks control can continue in, indirect jumps aside"""
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class Analysis:
+    program_hash: str
+    instructions: Mapping[int, DecodedInstruction]
+    """every reachable instruction, by address"""
+    blocks: Mapping[int, BasicBlock]
+    """basic blocks by start address"""
+    indirect_jumps: Tuple[int, ...]
+    """jumps whose target is read from memory"""
+    self_modifying: Tuple[Tuple[int, int], ...]
+    """(instruction, code cell) pairs where an instruction writes a fixed address in code"""
+    dynamic_writes: Tuple[int, ...]
+    """instructions writing relative to ``rb``, whose target is only known at run time"""
+    invalid: Tuple[int, ...]
+    """reachable addresses holding no valid instruction (yet: code may patch them)"""
+    overlapping: Tuple[int, ...]
+    """instructions sharing cells with another one, usually because a path the
+    program never takes at run time decodes its operands as code"""
+
+    @property
+    def code_cells(self) -> FrozenSet[int]:
+        return frozenset(cell for instr in self.instructions.values()
+                         for cell in range(instr.address, instr.next_address))
+
+    @property
+    def loop_heads(self) -> FrozenSet[int]:
+        """starts of blocks entered by a jump backwards, which every loop through fixed
+        jump targets passes"""
+        return frozenset(successor for block in self.blocks.values()
+                         for successor in block.successors if successor <= block.start)
+
+    def is_safe(self, start: int) -> bool:
+        """whether no instruction writes the block at ``start`` through a fixed address
+
+        Writes through ``rb`` (``dynamic_writes``) are not ruled out, so engines
+        precompiling a safe block must still guard against them, as the block
+        compiler does.
+        """
+        block = self.blocks[start]
+        written = {cell for _, cell in self.self_modifying}
+        return not any(cell in written for cell in range(block.start, block.end))
+
+    def disassemble(self) -> str:
+        """a listing of the reachable code, one block after another"""
+        lines = []
+        for start in sorted(self.blocks):
+            block = self.blocks[start]
+            successors = ', '.join(str(successor) for successor in block.successors)
+            lines.append(f'block {start} -> {successors or "-"}')
+            lines.extend(f'{instr.address:6d}: {instr}' for instr in block.instructions)
+        return '\n'.join(lines)
+
+
+_cache: MutableMapping[Tuple[str, Tuple[int, ...]], Analysis] = OrderedDict()
+CACHE_SIZE = 64
+
+
+def analyze(program: Union[ProgramImage, str, Iterable[Union[int, str]]],
+            entry_points: Iterable[int] = (0,)) -> Analysis:
+    """the analysis of ``program``, cached by its hash and entry points"""
+    image = ProgramImage.of(program)
+    program = image.values()
+    entry_points = tuple(sorted(set(entry_points)))
+    key = image.digest, entry_points
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    analysis = _cache[key] = _analyze(program, key[0], entry_points)
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return analysis
+
+
+def _analyze(program: Sequence[int], digest: str, entry_points: Sequence[int]) -> Analysis:
+    instructions: Dict[int, DecodedInstruction] = {}
+    leaders = set(entry_points)
+    invalid, indirect_jumps = set(), set()
+    pending = list(entry_points)
+    while pending:
+        address = pending.pop()
+        if address in instructions or address in invalid:
+            continue
+        instr = decode(program, address)
+        if instr is None:
+            invalid.add(address)
+            continue
+        instructions[address] = instr
+        successors = instr.successors()
+        if instr.opcode in JUMPS:
+            leaders.update(successor for successor in successors if successor is not None)
+        if instr.opcode in JUMPS or instr.opcode == Opcode.HALT:
+            leaders.add(instr.next_address)
+        for successor in successors:
+            if successor is None:
+                indirect_jumps.add(address)
+            else:
+                pending.append(successor)
+
+    owners: Dict[int, List[int]] = defaultdict(list)
+    for instr in instructions.values():
+        for cell in range(instr.address, instr.next_address):
+            owners[cell].append(instr.address)
+    overlapping = {address for cell_owners in owners.values() if len(cell_owners) > 1
+                   for address in cell_owners}
+    code = owners.keys() | invalid
+    self_modifying, dynamic_writes = [], []
+    for address, instr in sorted(instructions.items()):
+        written = instr.written
+        if written is None:
+            continue
+        mode, value = written
+        if mode == ParameterMode.RELATIVE:
+            dynamic_writes.append(address)
+        elif value in code:
+            self_modifying.append((address, value))
+            # the written instruction may change, so it starts a block of its own
+            leaders.update(start for start in range(value - 3, value + 1)
+                           if start in instructions and instructions[start].next_address > value)
+
+    blocks = _blocks(instructions, leaders)
+    if self_modifying:
+        LOG.debug('%s writes into code', len(self_modifying))
+    return Analysis(
+        program_hash=digest,
+        instructions=instructions,
+        blocks=blocks,
+        indirect_jumps=tuple(sorted(indirect_jumps)),
+        self_modifying=tuple(self_modifying),
+        dynamic_writes=tuple(dynamic_writes),
+        invalid=tuple(sorted(invalid)),
+        overlapping=tuple(sorted(overlapping)),
+    )
+
+
+def _blocks(instructions: Mapping[int, DecodedInstruction],
+            leaders: Iterable[int]) -> Dict[int, BasicBlock]:
+    leaders = {leader for leader in leaders if leader in instructions}
+    blocks = {}
+    for start in sorted(leaders):
+        body: List[DecodedInstruction] = []
+        address = start
+        while True:
+            instr = instructions[address]
+            body.append(instr)
+            successors = instr.successors()
+            address = instr.next_address
+            if len(successors) != 1 or successors[0] != address or address in leaders \
+                    or address not in instructions:
+                break
+        block_successors = tuple(sorted({successor for successor in successors
+                                         if successor is not None and successor in instructions}))
+        blocks[start] = BasicBlock(start, body[-1].next_address, tuple(body), block_successors)
+    return blocks
@@ -0,0 +1,324 @@
+"""an assembler for Intcode, and generators of parameterized workloads written in it
+
+Instructions use the disassembler's mnemonics and operand syntax (see
+``analysis``)::
+
+    ; counts [counter] down from 10
+            add 10, 0, [counter]    ; immediate, immediate, position
+    loop:   add [counter], -1, [counter]
+            jnz [counter], loop     ; a label is an immediate operand...
+            halt
+    counter: data 0                 ; ...and [label] the cell at it
+
+An operand is a number or a label, optionally ``+``/``-`` a number, in square
+brackets to read or write the cell it addresses; ``[rb]``, ``[rb-n]`` and
+``[rb+x]``, for a number or label ``x``, address relative to the relative base.
+Directives lay out data: ``data`` a list of operands, ``zero n`` that many zero
+cells.  ``rep n, i`` repeats the statements up to ``end`` ``n`` times, with ``i``
+standing for 0 to ``n - 1``; the block is parsed once, so unrolled code of
+millions of instructions assembles as fast as it is laid out.  Macros keep a
+stack at the relative base, which points just past its top element once a
+program has done e.g. ``arb stack`` with ``stack:`` at its end:
+
+===============  ======================================================
+``jmp t``        jump to ``t``
+``mov a, d``     copy ``a`` to ``d``
+``push a``       push ``a``
+``pop d``        pop the top element into ``d``, or drop it with no ``d``
+``call t``       push the return address, then jump to ``t``
+``ret``          pop a return address and jump to it
+===============  ======================================================
+
+so ``[rb-1]`` is the top element, and a function called with its arguments
+pushed finds the last one at ``[rb-2]``, below its return address.
+"""
+import functools
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .analysis import MNEMONICS, PARAMETER_COUNTS, WRITE_PARAMETER
+from .exceptions import AssemblyError
+from .image import ProgramImage
+from .parameter_mode import ParameterMode
+
+INSTRUCTIONS = {
+    # mnemonic: opcode, parameter count, the parameter written
+    mnemonic: (opcode.value, PARAMETER_COUNTS[opcode], WRITE_PARAMETER.get(opcode))
+    for opcode, mnemonic in MNEMONICS.items()
+}
+# mode digits, as plain ints: parsing compares and scales them once per operand
+POSITION, IMMEDIATE, RELATIVE = (mode.value for mode in (
+    ParameterMode.POSITION, ParameterMode.IMMEDIATE, ParameterMode.RELATIVE))
+
+Fixup = Tuple[int, Optional[str], int]
+"""a word to patch: its offset in a statement, and the label (or None for the
+statement's own address) plus the number to patch in"""
+Statement = Tuple[List[int], List[Fixup]]
+
+LABEL = re.compile(r'[A-Za-z_][\w.]*$')
+EXPRESSION = re.compile(r'([A-Za-z_][\w.]*)\s*(?:([+-])\s*(\d+))?$')
+
+
+def parse_expression(text: str) -> Tuple[Optional[str], int]:
+    """a label, or None, and the number added to it"""
+    try:
+        return None, int(text, 0)
+    except ValueError:
+        pass
+    match = EXPRESSION.match(text)
+    if match is None:
+        raise AssemblyError(f'Invalid expression: {text!r}')
+    label, sign, number = match.groups()
+    return label, 0 if number is None else int(sign + number)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def parse_operand(text: str) -> Tuple[int, Optional[str], int]:
+    """the mode digit of an operand, and the expression it is in that mode"""
+    if not (text.startswith('[') and text.endswith(']')):
+        return (IMMEDIATE, *parse_expression(text))
+    inner = text[1:-1].strip()
+    if inner == 'rb':
+        return RELATIVE, None, 0
+    if inner.startswith('rb') and inner[2:].lstrip()[:1] in ('+', '-'):
+        offset = inner[2:].replace(' ', '')
+        # a number can be negative, but a label cannot be subtracted
+        return (RELATIVE, *parse_expression(offset if offset[0] == '-' else offset[1:]))
+    return (POSITION, *parse_expression(inner))
+
+
+def instruction(mnemonic: str, operands: List[str]) -> Statement:
+    """the words of one instruction, with fixups for the labels it references"""
+    try:
+        word, parameter_count, written = INSTRUCTIONS[mnemonic]
+    except KeyError:
+        raise AssemblyError(f'Unknown mnemonic: {mnemonic!r}') from None
+    if len(operands) != parameter_count:
+        raise AssemblyError(f'{mnemonic} takes {parameter_count} operands, '
+                            f'not {len(operands)}')
+    words, fixups = [0], []
+    scale = 100
+    for idx, text in enumerate(operands, 1):
+        mode, label, value = parse_operand(text)
+        if mode == IMMEDIATE and idx == written:
+            raise AssemblyError(f'{mnemonic} cannot write to an immediate operand: {text!r}')
+        word += mode * scale
+        scale *= 10
+        if label is not None:
+            fixups.append((idx, label, value))
+            value = 0
+        words.append(value)
+    words[0] = word
+    return words, fixups
+
+
+def concatenate(*statements: Statement) -> Statement:
+    words: List[int] = []
+    fixups: List[Fixup] = []
+    for statement_words, statement_fixups in statements:
+        fixups.extend((offset + len(words), label, value)
+                      for offset, label, value in statement_fixups)
+        words.extend(statement_words)
+    return words, fixups
+
+
+def macro(mnemonic: str, operands: List[str]) -> Optional[Statement]:
+    """the instructions a macro expands to, or None if ``mnemonic`` is not one"""
+    if mnemonic == 'jmp' and len(operands) == 1:
+        return instruction('jnz', ['1', operands[0]])
+    if mnemonic == 'mov' and len(operands) == 2:
+        return instruction('add', [operands[0], '0', operands[1]])
+    if mnemonic == 'push' and len(operands) == 1:
+        return concatenate(instruction('add', [operands[0], '0', '[rb]']),
+                           instruction('arb', ['1']))
+    if mnemonic == 'pop' and len(operands) <= 1:
+        pop = instruction('arb', ['-1'])
+        return pop if not operands else concatenate(
+            pop, instruction('add', ['[rb]', '0', operands[0]]))
+    if mnemonic == 'call' and len(operands) == 1:
+        words, fixups = concatenate(instruction('add', ['0', '0', '[rb]']),
+                                    instruction('arb', ['1']),
+                                    instruction('jnz', ['1', operands[0]]))
+        # the return address: the statement's own, plus its length
+        return words, [(1, None, len(words))] + fixups
+    if mnemonic == 'ret' and not operands:
+        return concatenate(instruction('arb', ['-1']), instruction('jz', ['0', '[rb]']))
+    if mnemonic in ('jmp', 'mov', 'push', 'pop', 'call', 'ret'):
+        raise AssemblyError(f'Wrong number of operands for {mnemonic}: {len(operands)}')
+    return None
+
+
+@functools.lru_cache(maxsize=1 << 12)
+def statement(text: str) -> Statement:
+    """the words of an instruction, macro or directive"""
+    mnemonic, _, rest = ' '.join(text.split()).partition(' ')
+    operands = [operand.strip() for operand in rest.split(',')] if rest else []
+    if mnemonic == 'data':
+        words, fixups = [], []
+        for offset, operand in enumerate(operands):
+            label, value = parse_expression(operand)
+            if label is None:
+                words.append(value)
+            else:
+                fixups.append((offset, label, value))
+                words.append(0)
+        return words, fixups
+    if mnemonic == 'zero':
+        if len(operands) != 1:
+            raise AssemblyError('zero takes a number of cells')
+        return [0] * int(operands[0], 0), []
+    return macro(mnemonic, operands) or instruction(mnemonic, operands)
+
+
+def strip(line: str) -> str:
+    return line.partition(';')[0].strip()
+
+
+def repetition(header: str, lines: Iterator[Tuple[int, str]]
+               ) -> Tuple[int, Optional[str], Statement]:
+    """the count, counter and body of a ``rep`` block, reading its lines up to ``end``"""
+    count, _, counter = header[len('rep'):].partition(',')
+    count, counter = int(count, 0), counter.strip() or None
+    if counter is not None and not LABEL.match(counter):
+        raise AssemblyError(f'Invalid counter: {counter!r}')
+    body = []
+    for line_no, line in lines:
+        text = strip(line)
+        if text == 'end':
+            return count, counter, concatenate(*body)
+        try:
+            if ':' in text:
+                raise AssemblyError('Labels cannot be repeated')
+            if text.startswith('rep '):
+                raise AssemblyError('rep blocks cannot be nested')
+            if text:
+                body.append(statement(text))
+        except (AssemblyError, ValueError) as exc:
+            raise AssemblyError(f'line {line_no}: {exc}') from None
+    raise AssemblyError('rep without end')
+
+
+def assemble(source: Union[str, Iterable[str]]) -> ProgramImage:
+    """assemble a program from its text, or from its lines"""
+    if isinstance(source, str):
+        source = source.splitlines()
+    code: List[int] = []
+    labels: Dict[str, int] = {}
+    pending: List[Tuple[int, str, int, int]] = []
+    lines = enumerate(source, 1)
+    for line_no, line in lines:
+        text = strip(line)
+        count, counter = 1, None
+        try:
+            while ':' in text:
+                label, _, text = text.partition(':')
+                label, text = label.strip(), text.strip()
+                if not LABEL.match(label):
+                    raise AssemblyError(f'Invalid label: {label!r}')
+                if label in labels:
+                    raise AssemblyError(f'Duplicate label: {label!r}')
+                labels[label] = len(code)
+            if not text:
+                continue
+            if text.startswith('rep '):
+                count, counter, (words, fixups) = repetition(text, lines)
+            else:
+                # generated programs repeat statements, which are parsed once each
+                words, fixups = statement(text)
+        except (AssemblyError, ValueError) as exc:
+            if str(exc).startswith('line '):
+                raise
+            raise AssemblyError(f'line {line_no}: {exc}') from None
+        for idx in range(count):
+            address = len(code)
+            code.extend(words)
+            for offset, label, value in fixups:
+                if label is None:
+                    code[address + offset] = address + value
+                elif label == counter:
+                    code[address + offset] = value + idx
+                else:
+                    pending.append((address + offset, label, value, line_no))
+    for address, label, value, line_no in pending:
+        try:
+            code[address] = labels[label] + value
+        except KeyError:
+            raise AssemblyError(f'line {line_no}: Undefined label: {label!r}') from None
+    return ProgramImage(code)
+
+
+def loop(iterations: int) -> ProgramImage:
+    """counts down from ``iterations``, two instructions per iteration"""
+    return assemble(f'''
+            mov {iterations}, [counter]
+    loop:   add [counter], -1, [counter]
+            jnz [counter], loop
+            halt
+    counter: data 0
+    ''')
+
+
+def fib(n: int) -> ProgramImage:
+    """outputs the ``n``-th Fibonacci number, computed by naive recursion on the stack"""
+    return assemble(f'''
+            arb stack
+            push {n}
+            call fib
+            out [rb-1]
+            halt
+
+    ; replaces its argument n, at [rb-2], with fib(n)
+    fib:    lt [rb-2], 2, [rb]
+            jnz [rb], done           ; fib(n) = n for n < 2
+            add [rb-2], -1, [rb]
+            arb 1
+            call fib                 ; fib(n - 1) at [rb-1]
+            add [rb-3], -2, [rb]
+            arb 1
+            call fib                 ; fib(n - 2) at [rb-1]
+            add [rb-1], [rb-2], [rb-4]
+            arb -2
+    done:   ret
+    stack:
+    ''')
+
+
+def memory_sweep(size: int, passes: int = 1, unrolled: bool = False) -> ProgramImage:
+    """increments each of ``size`` cells ``passes`` times, then outputs their sum
+
+    The cells follow the code and are walked with the relative base, or with
+    ``unrolled``, each addressed by an instruction of its own, for a program of
+    ``size`` instructions.
+    """
+    if size < 1 or passes < 1:
+        raise ValueError(f'A sweep needs cells and passes: {size}, {passes}')
+    if unrolled:
+        sweep = [f'rep {size}, cell', 'add [rb+cell], 1, [rb+cell]', 'end']
+    else:
+        sweep = [
+            f'mov {size}, [left]',
+            'cell: add [rb], 1, [rb]',
+            'arb 1',
+            'add [left], -1, [left]',
+            'jnz [left], cell',
+            f'arb -{size}',
+        ]
+    return assemble([
+        'arb cells',
+        f'mov {passes}, [passes]',
+        'pass:',
+        *sweep,
+        'add [passes], -1, [passes]',
+        'jnz [passes], pass',
+        f'mov {size}, [left]',
+        'sum: add [total], [rb], [total]',
+        'arb 1',
+        'add [left], -1, [left]',
+        'jnz [left], sum',
+        'out [total]',
+        'halt',
+        'left: data 0',
+        'passes: data 0',
+        'total: data 0',
+        'cells:',
+    ])
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import Any, Mapping, Optional
+
+from .computer import IntcodeComputerV9
+from .exceptions import Halt, InfiniteLoop, LimitExceeded
+from .run_status import RunStatus
+
+LOG = logging.getLogger(__name__)
+
+
+class AsyncIntcodeComputer(IntcodeComputerV9):
+    """an Intcode VM for asyncio, whose ``run()`` is a coroutine
+
+    Instructions execute synchronously, ``batch_size`` dispatches at a time, and
+    ``run()`` yields to the event loop between batches so that thousands of VMs can
+    share one loop.  Otherwise it only awaits when stdin is empty, until
+    ``put_stdin`` wakes it.  ``get_stdout`` awaits the next output, so VMs can be
+    wired to each other or to the rest of a service without threads.  Both must be
+    called from the event loop's thread, and each VM supports one reader of stdout.
+    """
+    __slots__ = ('batch_size', '_stdin_waiter', '_stdout_waiter')
+
+    default_blocking = False
+    default_batch_size = 10000
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.batch_size = self.default_batch_size
+        self._stdin_waiter: Optional[asyncio.Future] = None
+        self._stdout_waiter: Optional[asyncio.Future] = None
+
+    def settings(self) -> Mapping[str, Any]:
+        return {**super().settings(), 'batch_size': self.batch_size}
+
+    async def run(self) -> None:
+        """run until halted, awaiting input whenever stdin is empty
+
+        Raises ``InfiniteLoop`` or ``LimitExceeded`` if a ``watchdog`` stops the VM,
+        like the synchronous ``run``.
+        """
+        try:
+            while not self.is_terminated:
+                status = self.run_until(RunStatus.NEEDS_INPUT, self.batch_size)
+                if status is RunStatus.NEEDS_INPUT:
+                    while self._stdin.empty():
+                        self._stdin_waiter = asyncio.get_running_loop().create_future()
+                        await self._stdin_waiter
+                elif status is RunStatus.BUDGET_EXHAUSTED:
+                    await asyncio.sleep(0)
+                elif status is RunStatus.LOOPING:
+                    raise InfiniteLoop(self.watchdog.cycle)
+                elif status is RunStatus.LIMIT_EXCEEDED:
+                    raise LimitExceeded()
+        finally:
+            # a reader waiting on a halted VM gets Halt instead of waiting forever
+            self._wake(self._stdout_waiter)
+
+    def put_stdin(self, value: int) -> None:
+        super().put_stdin(value)
+        self._wake(self._stdin_waiter)
+
+    def put_stdout(self, value: int) -> None:
+        super().put_stdout(value)
+        self._wake(self._stdout_waiter)
+
+    async def get_stdout(self) -> int:
+        """the next output, once there is one; raises ``Halt`` if there never will be"""
+        while self._stdout.empty():
+            if self.is_terminated:
+                raise Halt()
+            self._stdout_waiter = asyncio.get_running_loop().create_future()
+            await self._stdout_waiter
+        return self._stdout.get()
+
+    @staticmethod
+    def _wake(waiter: Optional[asyncio.Future]) -> None:
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
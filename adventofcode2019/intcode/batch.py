@@ -0,0 +1,202 @@
+import logging
+from collections import deque
+from enum import IntEnum
+from typing import Callable, Deque, Iterable, List, Mapping, Optional, Sequence, Union
+
+import numpy
+
+from .image import INT64_MIN
+from .opcode import Opcode
+from .parameter_mode import ParameterMode
+
+LOG = logging.getLogger(__name__)
+
+
+class LaneStatus(IntEnum):
+    RUNNING = 0
+    WAITING = 1
+    HALTED = 2
+    FAILED = 3
+
+
+class BatchIntcodeComputer:
+    """runs many copies of one program in lockstep over a 2-D int64 memory array
+
+    Each row of ``memory`` is one VM (a lane).  Every step groups the running lanes
+    by the opcode under their ``iptr`` and executes each group as one vectorized
+    operation; lanes that are waiting for input, halted or failed are masked out.
+    Cells are int64, so this suits programs whose values stay within 64 bits (day2,
+    day7) rather than day9's big-number checks; a lane whose ADD or MULTIPLY
+    overflows is failed rather than left with a wrapped value.  Memory is shared
+    column-wise by all lanes, so a lane touching an address at or beyond
+    ``max_address`` (or a negative one) is failed instead of growing every row.
+    """
+
+    def __init__(self, initial: Union[str, Iterable[Union[int, str]]], lanes: int,
+                 stdin: Sequence[Iterable[int]] = None, max_address: int = 1 << 20) -> None:
+        if hasattr(initial, 'split'):
+            initial = initial.split(',')
+        program = numpy.fromiter((int(val) for val in initial), dtype=numpy.int64)
+        self.memory = numpy.tile(program, (lanes, 1))
+        self.iptr = numpy.zeros(lanes, dtype=numpy.int64)
+        self.rbptr = numpy.zeros(lanes, dtype=numpy.int64)
+        self.status = numpy.full(lanes, LaneStatus.RUNNING, dtype=numpy.int8)
+        self.steps = 0
+        self.max_address = max_address
+        self._stdin: List[Deque[int]] = [deque(values) for values in stdin or [()] * lanes]
+        self._stdout: List[List[int]] = [[] for _ in range(lanes)]
+        self._handlers: Mapping[int, Callable[[numpy.ndarray, numpy.ndarray], None]] = {
+            Opcode.ADD.value: self._add,
+            Opcode.MULTIPLY.value: self._multiply,
+            Opcode.SAVE.value: self._save,
+            Opcode.OUTPUT.value: self._output,
+            Opcode.JUMP_IF_TRUE.value: self._jump_if_true,
+            Opcode.JUMP_IF_FALSE.value: self._jump_if_false,
+            Opcode.LESS_THAN.value: self._less_than,
+            Opcode.EQUALS.value: self._equals,
+            Opcode.ADJUST_RELATIVE_BASE.value: self._adjust_relative_base,
+            Opcode.HALT.value: self._halt,
+        }
+
+    @property
+    def lanes(self) -> int:
+        return self.memory.shape[0]
+
+    def put_stdin(self, lane: int, value: int) -> None:
+        self._stdin[lane].append(value)
+        if self.status[lane] == LaneStatus.WAITING:
+            self.status[lane] = LaneStatus.RUNNING
+
+    def stdout(self, lane: int) -> List[int]:
+        return self._stdout[lane]
+
+    def run(self, max_steps: Optional[int] = None) -> None:
+        """step until no lane is running, or for at most ``max_steps`` steps"""
+        steps = 0
+        while (max_steps is None or steps < max_steps) and self.step():
+            steps += 1
+
+    def step(self) -> int:
+        """execute one instruction on every running lane; returns the number of lanes run"""
+        rows = numpy.flatnonzero(self.status == LaneStatus.RUNNING)
+        iptr = self.iptr[rows]
+        self._fail(rows, (iptr < 0) | (iptr >= self.max_address))
+        rows = rows[(iptr >= 0) & (iptr < self.max_address)]
+        if not rows.size:
+            return 0
+        self._ensure(int(self.iptr[rows].max()) + 4)
+        words = self.memory[rows, self.iptr[rows]]
+        opcodes = words % 100
+        for opcode in numpy.unique(opcodes):
+            group = opcodes == opcode
+            handler = self._handlers.get(int(opcode))
+            if handler is None:
+                LOG.debug('Invalid opcode %s on %s lanes', opcode, group.sum())
+                self.status[rows[group]] = LaneStatus.FAILED
+                continue
+            handler(rows[group], words[group])
+        self.steps += 1
+        return rows.size
+
+    def _ensure(self, size: int) -> None:
+        width = self.memory.shape[1]
+        if size > width:
+            grow = max(size, min(2 * width, self.max_address + 4)) - width
+            self.memory = numpy.pad(self.memory, ((0, 0), (0, grow)))
+
+    def _fail(self, rows: numpy.ndarray, mask: numpy.ndarray) -> None:
+        if mask.any():
+            self.status[rows[mask]] = LaneStatus.FAILED
+
+    def _address(self, rows: numpy.ndarray, words: numpy.ndarray, idx: int):
+        mode = words // 10 ** (idx + 1) % 10
+        raw = self.memory[rows, self.iptr[rows] + idx]
+        address = numpy.where(mode == ParameterMode.RELATIVE.value, raw + self.rbptr[rows], raw)
+        self._fail(rows, mode > ParameterMode.RELATIVE.value)
+        return mode, raw, address
+
+    def _read(self, rows: numpy.ndarray, words: numpy.ndarray, idx: int) -> numpy.ndarray:
+        mode, raw, address = self._address(rows, words, idx)
+        indirect = mode != ParameterMode.IMMEDIATE.value
+        bad = indirect & ((address < 0) | (address >= self.max_address))
+        self._fail(rows, bad)
+        indirect &= ~bad
+        value = raw.copy()
+        if indirect.any():
+            self._ensure(int(address[indirect].max()) + 1)
+            value[indirect] = self.memory[rows[indirect], address[indirect]]
+        return value
+
+    def _write(self, rows: numpy.ndarray, words: numpy.ndarray, idx: int,
+               value: numpy.ndarray) -> None:
+        mode, _, address = self._address(rows, words, idx)
+        valid = ((mode != ParameterMode.IMMEDIATE.value)
+                 & (address >= 0) & (address < self.max_address))
+        self._fail(rows, ~valid)
+        # lanes failed earlier in this instruction (bad read, overflow) write nothing
+        valid &= self.status[rows] != LaneStatus.FAILED
+        if valid.any():
+            self._ensure(int(address[valid].max()) + 1)
+            self.memory[rows[valid], address[valid]] = value[valid]
+
+    def _add(self, rows: numpy.ndarray, words: numpy.ndarray) -> None:
+        left, right = self._read(rows, words, 1), self._read(rows, words, 2)
+        result = left + right
+        # wrapped around iff both operands have the same sign and the result does not
+        self._fail(rows, ((left < 0) == (right < 0)) & ((result < 0) != (left < 0)))
+        self._write(rows, words, 3, result)
+        self.iptr[rows] += 4
+
+    def _multiply(self, rows: numpy.ndarray, words: numpy.ndarray) -> None:
+        left, right = self._read(rows, words, 1), self._read(rows, words, 2)
+        with numpy.errstate(over='ignore', divide='ignore'):
+            result = left * right
+            divisor = numpy.where(right == 0, 1, right)
+            overflow = (right != 0) & (result // divisor != left)
+        overflow |= (right == -1) & (left == INT64_MIN) | (left == -1) & (right == INT64_MIN)
+        self._fail(rows, overflow)
+        self._write(rows, words, 3, result)
+        self.iptr[rows] += 4
+
+    def _less_than(self, rows: numpy.ndarray, words: numpy.ndarray) -> None:
+        result = self._read(rows, words, 1) < self._read(rows, words, 2)
+        self._write(rows, words, 3, result.astype(numpy.int64))
+        self.iptr[rows] += 4
+
+    def _equals(self, rows: numpy.ndarray, words: numpy.ndarray) -> None:
+        result = self._read(rows, words, 1) == self._read(rows, words, 2)
+        self._write(rows, words, 3, result.astype(numpy.int64))
+        self.iptr[rows] += 4
+
+    def _jump_if_true(self, rows: numpy.ndarray, words: numpy.ndarray) -> None:
+        condition = self._read(rows, words, 1) != 0
+        self.iptr[rows] = numpy.where(condition, self._read(rows, words, 2), self.iptr[rows] + 3)
+
+    def _jump_if_false(self, rows: numpy.ndarray, words: numpy.ndarray) -> None:
+        condition = self._read(rows, words, 1) == 0
+        self.iptr[rows] = numpy.where(condition, self._read(rows, words, 2), self.iptr[rows] + 3)
+
+    def _adjust_relative_base(self, rows: numpy.ndarray, words: numpy.ndarray) -> None:
+        self.rbptr[rows] += self._read(rows, words, 1)
+        self.iptr[rows] += 2
+
+    def _save(self, rows: numpy.ndarray, words: numpy.ndarray) -> None:
+        # input is per lane, so it cannot be vectorized; lanes with nothing queued wait
+        ready = numpy.array([bool(self._stdin[lane]) for lane in rows], dtype=bool)
+        self.status[rows[~ready]] = LaneStatus.WAITING
+        rows, words = rows[ready], words[ready]
+        if rows.size:
+            value = numpy.array([self._stdin[lane].popleft() for lane in rows], dtype=numpy.int64)
+            self._write(rows, words, 1, value)
+            self.iptr[rows] += 2
+
+    def _output(self, rows: numpy.ndarray, words: numpy.ndarray) -> None:
+        value = self._read(rows, words, 1)
+        # lanes failed by the read (a bad address) output nothing
+        valid = self.status[rows] == LaneStatus.RUNNING
+        for lane, value in zip(rows[valid].tolist(), value[valid].tolist()):
+            self._stdout[lane].append(value)
+        self.iptr[rows] += 2
+
+    def _halt(self, rows: numpy.ndarray, words: numpy.ndarray) -> None:
+        self.status[rows] = LaneStatus.HALTED
@@ -0,0 +1,143 @@
+"""FIFOs carrying values into and out of a VM
+
+``queue.Empty`` signals that a channel has nothing to read, as it did when VMs
+used ``queue.Queue`` directly.
+"""
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import suppress
+from queue import Empty, Queue
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Tuple
+
+from .exceptions import InvalidState
+
+
+class Channel(ABC):
+    @abstractmethod
+    def put(self, value: int) -> None:
+        ...
+
+    def put_many(self, values: Iterable[int]) -> None:
+        for value in values:
+            self.put(value)
+
+    @abstractmethod
+    def get(self, block: bool = False) -> int:
+        """the next value, or ``Empty``; only waits for one if ``block`` and another
+        thread could still put it"""
+        ...
+
+    def drain(self, count: Optional[int] = None) -> List[int]:
+        """remove and return up to ``count`` values, or all of them"""
+        ret = []
+        with suppress(Empty):
+            while count is None or len(ret) < count:
+                ret.append(self.get())
+        return ret
+
+    @abstractmethod
+    def empty(self) -> bool:
+        ...
+
+    @abstractmethod
+    def values(self) -> Tuple[int, ...]:
+        """the queued values, without removing them"""
+        ...
+
+
+class DequeChannel(Channel):
+    """an unsynchronized deque, for VMs driven from a single thread
+
+    ``put_iter`` queues an iterable whose values are only pulled as they are read,
+    e.g. a generator computing each input from the outputs so far.
+    """
+
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        self._values: Deque[int] = deque(values)
+        self._sources: Deque[Iterator[int]] = deque()
+
+    def put(self, value: int) -> None:
+        if self._sources:
+            # keep it behind the values still to be pulled
+            self._sources.append(iter((value,)))
+        else:
+            self._values.append(value)
+
+    def put_many(self, values: Iterable[int]) -> None:
+        if self._sources:
+            self._sources.append(iter(list(values)))
+        else:
+            self._values.extend(values)
+
+    def put_iter(self, values: Iterable[int]) -> None:
+        self._sources.append(iter(values))
+
+    def get(self, block: bool = False) -> int:
+        if self._values:
+            return self._values.popleft()
+        while self._sources:
+            for value in self._sources[0]:
+                return value
+            self._sources.popleft()
+        raise Empty()
+
+    def drain(self, count: Optional[int] = None) -> List[int]:
+        if count is None and not self._sources:
+            ret = list(self._values)
+            self._values.clear()
+            return ret
+        return super().drain(count)
+
+    def empty(self) -> bool:
+        if self._values:
+            return False
+        try:
+            self._values.append(self.get())
+        except Empty:
+            return True
+        return False
+
+    def values(self) -> Tuple[int, ...]:
+        if self._sources:
+            raise InvalidState('Cannot list values that have not been pulled yet')
+        return tuple(self._values)
+
+
+class SynchronizedChannel(Channel):
+    """a ``queue.Queue``, for VMs fed or read from other threads; ``get`` can block"""
+
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        self._queue: Queue = Queue()
+        self.put_many(values)
+
+    def put(self, value: int) -> None:
+        self._queue.put(value)
+
+    def get(self, block: bool = False) -> int:
+        return self._queue.get(block)
+
+    def empty(self) -> bool:
+        return self._queue.empty()
+
+    def values(self) -> Tuple[int, ...]:
+        with self._queue.mutex:
+            return tuple(self._queue.queue)
+
+
+class CallbackChannel(Channel):
+    """hands every value straight to ``callback``, so nothing is ever buffered"""
+
+    def __init__(self, callback: Callable[[int], None]) -> None:
+        self.callback = callback
+
+    def put(self, value: int) -> None:
+        self.callback(value)
+
+    def get(self, block: bool = False) -> int:
+        raise Empty()
+
+    def empty(self) -> bool:
+        return True
+
+    def values(self) -> Tuple[int, ...]:
+        return ()
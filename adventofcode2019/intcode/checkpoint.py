@@ -0,0 +1,190 @@
+"""VM checkpoints on disk: a ``Snapshot`` in a compact binary file
+
+The file is a small header, JSON metadata (registers, queued I/O, the computer
+and instruction classes), then the program image and the memory pages that differ
+from it, each as raw little-endian int64 cells aligned to 8 bytes.  A section
+holding a value beyond int64 is written as comma-separated text instead.  Saving
+and loading cost O(pages touched) plus the image, which can be left out (and
+passed to ``load``) or memory-mapped rather than read.
+"""
+import importlib
+import json
+import logging
+import os
+import struct
+from typing import Any, BinaryIO, List, Mapping, Optional, Tuple, Union
+
+import numpy
+
+from .exceptions import InvalidState
+from .image import INT64_MAX, INT64_MIN, ProgramImage
+from .memory import PagedMemory
+from .snapshot import Snapshot
+
+LOG = logging.getLogger(__name__)
+
+HEADER = struct.Struct('<4sHI')
+MAGIC = b'ICVM'
+VERSION = 1
+CELL = numpy.dtype('<i8')
+
+
+def _class_path(cls: type) -> str:
+    return f'{cls.__module__}:{cls.__qualname__}'
+
+
+def _resolve(path: str) -> type:
+    module, _, qualname = path.partition(':')
+    obj: Any = importlib.import_module(module)
+    for name in qualname.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+
+def _encode_option(value: Any) -> Any:
+    if isinstance(value, type):
+        return {'class': _class_path(value)}
+    if isinstance(value, (list, tuple)):
+        return [_encode_option(item) for item in value]
+    return value
+
+
+def _decode_option(value: Any) -> Any:
+    if isinstance(value, dict) and value.keys() == {'class'}:
+        return _resolve(value['class'])
+    if isinstance(value, list):
+        return [_decode_option(item) for item in value]
+    return value
+
+
+def _encode_cells(cells: List[int]) -> Tuple[str, bytes]:
+    if all(INT64_MIN <= cell <= INT64_MAX for cell in cells):
+        return 'int64', numpy.array(cells, dtype=CELL).tobytes()
+    return 'text', ','.join(map(str, cells)).encode()
+
+
+def _decode_cells(encoding: str, data: bytes) -> List[int]:
+    if encoding == 'int64':
+        return numpy.frombuffer(data, dtype=CELL).tolist()
+    return [int(cell) for cell in data.decode().split(',')] if data else []
+
+
+def _padding(offset: int) -> bytes:
+    return bytes(-offset % CELL.itemsize)
+
+
+def dump(snapshot: Snapshot, file: Union[str, os.PathLike, BinaryIO],
+         embed_image: bool = True) -> None:
+    """write ``snapshot``; without ``embed_image``, ``load`` must be given the image"""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'wb') as fp:
+            return dump(snapshot, fp, embed_image)
+    image = snapshot.image
+    memory = snapshot.memory
+    if not isinstance(memory, PagedMemory):
+        memory = PagedMemory.from_memory(memory)
+    page_numbers, pages = [], []
+    for page_no, page in memory.dirty_pages(image):
+        page_numbers.append(page_no)
+        pages.extend(page)
+    pages_encoding, pages_data = _encode_cells(pages)
+    if embed_image:
+        image_encoding, image_data = _encode_cells(image.values())
+    else:
+        image_encoding, image_data = None, b''
+    metadata = {
+        'computer_class': _class_path(snapshot.computer_class),
+        'options': {key: _encode_option(value) for key, value in snapshot.options.items()},
+        'iptr': snapshot.iptr,
+        'rbptr': snapshot.rbptr,
+        'stdin': list(snapshot.stdin),
+        'stdout': list(snapshot.stdout),
+        'started': snapshot.started,
+        'alive': snapshot.alive,
+        'steps': snapshot.steps,
+        'settings': snapshot.settings,
+        'image': {
+            'digest': image.digest,
+            'length': len(image),
+            'encoding': image_encoding,
+            'size': len(image_data),
+        },
+        'pages': {
+            'page_bits': memory.page_bits,
+            'numbers': page_numbers,
+            'end': memory.end,
+            'encoding': pages_encoding,
+            'size': len(pages_data),
+        },
+    }
+    encoded = json.dumps(metadata, separators=(',', ':')).encode()
+    header = HEADER.pack(MAGIC, VERSION, len(encoded))
+    file.write(header)
+    file.write(encoded)
+    file.write(_padding(len(header) + len(encoded)))
+    file.write(image_data)
+    file.write(_padding(len(image_data)))
+    file.write(pages_data)
+    LOG.debug('Saved %s dirty pages', len(page_numbers))
+
+
+def load(file: Union[str, os.PathLike, BinaryIO], image: Optional[ProgramImage] = None,
+         mmap: bool = False) -> Snapshot:
+    """read a snapshot written by ``dump``
+
+    With ``mmap`` (only for paths), an embedded int64 image is memory-mapped, so that
+    only the pages the restored VM touches are ever read.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as fp:
+            return _load(fp, image, os.fspath(file) if mmap else None)
+    return _load(file, image, None)
+
+
+def _load(file: BinaryIO, image: Optional[ProgramImage], mmap_path: Optional[str]) -> Snapshot:
+    magic, version, size = HEADER.unpack(file.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'Not an Intcode checkpoint (version {VERSION}): {magic!r} {version}')
+    metadata: Mapping[str, Any] = json.loads(file.read(size))
+    file.read(len(_padding(HEADER.size + size)))
+    image_meta, pages_meta = metadata['image'], metadata['pages']
+
+    if image_meta['encoding'] is None:
+        if image is None:
+            raise InvalidState('The checkpoint was saved without its image; pass it to load()')
+    elif image_meta['encoding'] == 'int64' and mmap_path is not None:
+        offset = file.tell()
+        cells = numpy.memmap(mmap_path, dtype=CELL, mode='r', offset=offset,
+                             shape=(image_meta['length'],)) if image_meta['length'] else ()
+        image = ProgramImage(cells, image_meta['digest'])
+        file.seek(offset + image_meta['size'])
+    else:
+        data = file.read(image_meta['size'])
+        image = ProgramImage(_decode_cells(image_meta['encoding'], data), image_meta['digest'])
+    if image.digest != image_meta['digest'] or len(image) != image_meta['length']:
+        raise InvalidState(f'The checkpoint was saved from another program: '
+                           f'{image_meta["digest"]}, not {image.digest}')
+    file.read(len(_padding(image_meta['size'])))
+
+    cells = _decode_cells(pages_meta['encoding'], file.read(pages_meta['size']))
+    memory_class = PagedMemory
+    if memory_class.page_bits != pages_meta['page_bits']:
+        raise InvalidState(f'Pages of {1 << pages_meta["page_bits"]} cells are not supported')
+    page_size = 1 << memory_class.page_bits
+    pages = {page_no: cells[idx * page_size:(idx + 1) * page_size]
+             for idx, page_no in enumerate(pages_meta['numbers'])}
+    return Snapshot(
+        computer_class=_resolve(metadata['computer_class']),
+        options={key: _decode_option(value) for key, value in metadata['options'].items()},
+        memory=memory_class.over(image, pages, pages_meta['end']),
+        iptr=metadata['iptr'],
+        rbptr=metadata['rbptr'],
+        stdin=tuple(metadata['stdin']),
+        stdout=tuple(metadata['stdout']),
+        started=metadata['started'],
+        alive=metadata['alive'],
+        image=image,
+        # absent from checkpoints saved before they were recorded
+        steps=metadata.get('steps', 0),
+        settings=metadata.get('settings', {}),
+    )
@@ -0,0 +1,185 @@
+import functools
+import logging
+from types import CodeType
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from .exceptions import Halt
+from .instruction import AddInstruction, AdjustRelativeBaseInstruction, EqualsInstruction, \
+    HaltInstruction, Handler, JumpIfFalseInstruction, JumpIfTrueInstruction, LessThanInstruction, \
+    MultiplyInstruction, Operand, OutputInstruction, SaveInstruction
+from .opcode import Opcode
+from .parameter_mode import ParameterMode
+from .run_status import RunStatus
+
+if TYPE_CHECKING:
+    from .computer import IntcodeComputer
+
+LOG = logging.getLogger(__name__)
+
+STOCK_INSTRUCTIONS = {
+    instr_cls.opcode: instr_cls for instr_cls in (
+        AddInstruction,
+        MultiplyInstruction,
+        SaveInstruction,
+        OutputInstruction,
+        JumpIfTrueInstruction,
+        JumpIfFalseInstruction,
+        LessThanInstruction,
+        EqualsInstruction,
+        AdjustRelativeBaseInstruction,
+        HaltInstruction,
+    )
+}
+"""the semantics ``emit`` hard-codes; any other registered class is left to the interpreter"""
+
+TERMINATORS = {Opcode.JUMP_IF_TRUE, Opcode.JUMP_IF_FALSE, Opcode.HALT}
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_source(source: str) -> CodeType:
+    """generated blocks are shared between VMs running the same code"""
+    return compile(source, '<intcode block>', 'exec')
+
+
+class BlockCompiler:
+    """translates a basic block of Intcode into a Python function
+
+    A block starts at whatever address the VM enters it at (a jump target or a
+    fall-through) and runs until a jump, a halt, or an input instruction, which
+    always starts a block of its own so that waiting for input leaves ``iptr``
+    pointing at it.  Immediate operands are inlined as literals.  A write into
+    any decoded cell invalidates the blocks covering it and leaves the block early,
+    so self-modifying code sees its own writes; the VM then interprets those
+    addresses rather than compiling them again.
+    """
+    max_block_length = 64
+
+    def __init__(self, computer: 'IntcodeComputer') -> None:
+        self.computer = computer
+
+    def decode(self, address: int) -> Optional[Tuple[Opcode, List[Operand]]]:
+        """the opcode and operands at ``address``, or None if it cannot be compiled"""
+        memory = self.computer.memory
+        word = memory[address]
+        try:
+            opcode = Opcode(word % 100)
+            instr = self.computer.instructions[opcode]
+            operands = [(ParameterMode(word // 10 ** (idx + 1) % 10), memory[address + idx])
+                        for idx in range(1, instr.parameter_count + 1)]
+        except (ValueError, KeyError):
+            return None
+        if type(instr) is not STOCK_INSTRUCTIONS[opcode]:
+            return None
+        return opcode, operands
+
+    def compile(self, address: int) -> Optional[Tuple[Handler, int]]:
+        """a handler for the block at ``address`` and the address just past it"""
+        lines: List[str] = []
+        relative = False
+        iptr = address
+        for count in range(self.max_block_length):
+            decoded = self.decode(iptr)
+            if decoded is None or (decoded[0] == Opcode.SAVE and count):
+                break
+            opcode, operands = decoded
+            next_iptr = iptr + 1 + len(operands)
+            try:
+                lines.extend(self.emit(opcode, operands, next_iptr))
+            except ValueError:
+                # e.g. an immediate-mode write: fails if reached, which a write earlier
+                # in the block may still prevent, so leave it to the interpreter
+                break
+            relative |= (opcode == Opcode.ADJUST_RELATIVE_BASE
+                         or any(mode == ParameterMode.RELATIVE for mode, _ in operands))
+            iptr = next_iptr
+            if opcode in TERMINATORS:
+                break
+        if iptr == address:
+            return None
+        if not lines[-1].startswith(('return', 'raise')):
+            lines.append(f'return {iptr}')
+        source = self.render(address, lines, relative)
+        namespace = self.namespace()
+        exec(compile_source(source), namespace)
+        return namespace['block'], iptr
+
+    def namespace(self) -> dict:
+        computer = self.computer
+        return {
+            'c': computer,
+            'mem': computer.memory,
+            'cells': computer._decoded_cells,
+            'invalidate': computer.invalidate,
+            'get': computer.get_stdin,
+            'stdin': computer.stdin_channel,
+            'NEEDS_INPUT': RunStatus.NEEDS_INPUT,
+            'put': computer.put_stdout,
+            'Halt': Halt,
+        }
+
+    @staticmethod
+    def render(address: int, lines: List[str], relative: bool) -> str:
+        body = '\n'.join(f'    {line}' for line in lines)
+        prologue = '    rb = c.rbptr\n' if relative else ''
+        return f'def block():\n    # block at {address}\n{prologue}{body}\n'
+
+    @staticmethod
+    def read(operand: Operand) -> str:
+        mode, value = operand
+        if mode == ParameterMode.POSITION:
+            return f'mem[{value}]'
+        elif mode == ParameterMode.IMMEDIATE:
+            return f'{value}'
+        return f'mem[{value} + rb]'
+
+    @staticmethod
+    def write(operand: Operand, expr: str, next_iptr: int) -> List[str]:
+        mode, value = operand
+        if mode == ParameterMode.POSITION:
+            target = f'{value}'
+            lines = [f'mem[{target}] = {expr}']
+        elif mode == ParameterMode.RELATIVE:
+            target = 'addr'
+            lines = [f'addr = {value} + rb', f'mem[addr] = {expr}']
+        else:
+            raise ValueError(f'Invalid parameter mode for a write: {mode}')
+        return lines + [
+            f'if {target} in cells:',
+            f'    invalidate({target})',
+            f'    return {next_iptr}',
+        ]
+
+    def emit(self, opcode: Opcode, operands: List[Operand], next_iptr: int) -> List[str]:
+        read, write = self.read, self.write
+        if opcode == Opcode.ADD:
+            return write(operands[2], f'{read(operands[0])} + {read(operands[1])}', next_iptr)
+        elif opcode == Opcode.MULTIPLY:
+            return write(operands[2], f'{read(operands[0])} * {read(operands[1])}', next_iptr)
+        elif opcode == Opcode.LESS_THAN:
+            return write(operands[2], f'1 if {read(operands[0])} < {read(operands[1])} else 0',
+                         next_iptr)
+        elif opcode == Opcode.EQUALS:
+            return write(operands[2], f'1 if {read(operands[0])} == {read(operands[1])} else 0',
+                         next_iptr)
+        elif opcode == Opcode.SAVE:
+            return ['if not c.blocking and stdin.empty():',
+                    '    c.suspend(NEEDS_INPUT)',
+                    f'    return {next_iptr - 2}'] + write(operands[0], 'get()', next_iptr)
+        elif opcode == Opcode.OUTPUT:
+            # run_until may be waiting for this output
+            return [f'put({read(operands[0])})',
+                    'if c._stop is not None:',
+                    f'    return {next_iptr}']
+        elif opcode == Opcode.JUMP_IF_TRUE:
+            return [f'if {read(operands[0])} != 0:',
+                    f'    return {read(operands[1])}',
+                    f'return {next_iptr}']
+        elif opcode == Opcode.JUMP_IF_FALSE:
+            return [f'if {read(operands[0])} == 0:',
+                    f'    return {read(operands[1])}',
+                    f'return {next_iptr}']
+        elif opcode == Opcode.ADJUST_RELATIVE_BASE:
+            return [f'rb += {read(operands[0])}', 'c.rbptr = rb']
+        elif opcode == Opcode.HALT:
+            return ['c.kill()', 'raise Halt()']
+        raise ValueError(f'Cannot compile opcode: {opcode}')
@@ -1,60 +1,176 @@
 import logging
+import os
 from collections import defaultdict
 from contextlib import suppress
-from queue import Empty, Queue
-from typing import Iterable, List, MutableMapping, Optional, Type, Union
+from itertools import count
+from queue import Empty
+from typing import Any, BinaryIO, Iterable, List, Mapping, MutableMapping, MutableSet, \
+    Optional, Type, Union
 
-from .exceptions import Halt, ParameterError, WaitingForInput, InvalidState
+from . import checkpoint
+from .channel import Channel, DequeChannel
+from .compiler import BlockCompiler
+from .exceptions import Halt, InfiniteLoop, LimitExceeded, ParameterError, WaitingForInput, \
+    InvalidState
+from .fusion import Fuser
 from .instruction import AddInstruction, AdjustRelativeBaseInstruction, EqualsInstruction, \
-    HaltInstruction, Instruction, JumpIfFalseInstruction, JumpIfTrueInstruction, \
-    LessThanInstruction, MultiplyInstruction, OutputInstruction, SaveInstruction
+    Handler, HaltInstruction, Instruction, InstructionSet, JumpIfFalseInstruction, \
+    JumpIfTrueInstruction, LessThanInstruction, MultiplyInstruction, OutputInstruction, \
+    SaveInstruction, instruction_table
+from .image import ProgramImage
+from .memory import DictMemory, Memory
+from .metrics import VMMetrics
 from .opcode import Opcode
 from .parameter_mode import ParameterMode
+from .profiler import Profiler
+from .result import MemoryView, RunResult, serialize
+from .run_status import RunStatus
+from .snapshot import Snapshot
+from .trace import Tracer
+from .watchdog import Watchdog
 
 LOG = logging.getLogger(__name__)
 
 
 class IntcodeComputer:
+    __slots__ = ('_decoded', '_decoded_cells', 'image', '_memory', 'iptr', 'rbptr', '_stdin',
+                 '_stdout', 'jumped', 'instructions', 'blocking', '_alive', '_started',
+                 '_running', '_stop', '_outputs_left', '_status', 'steps', '_profiler',
+                 '_tracer', '_watchdog', '_metrics')
+
     default_instruction_classes: List[Type[Instruction]] = [
         AddInstruction,
         MultiplyInstruction,
         HaltInstruction,
     ]
+    default_instructions: InstructionSet = instruction_table(tuple(default_instruction_classes))
+    """the dispatch table of ``default_instruction_classes``, shared by every instance"""
+    default_memory_class: Type[Memory] = DictMemory
+    default_channel_class: Type[Channel] = DequeChannel
+    default_blocking = True
+    """whether reading empty stdin waits for another thread to put a value (which only
+    a ``SynchronizedChannel`` can do), or raises ``WaitingForInput`` straight away;
+    ``blocking`` overrides it per VM"""
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.default_instructions = instruction_table(tuple(cls.default_instruction_classes))
 
-    def __init__(self, initial: Union[str, Iterable[Union[int, str]]],
+    def __init__(self, initial: Union[ProgramImage, str, Iterable[Union[int, str]]],
                  instruction_classes: Iterable[Type[Instruction]] = None,
-                 stdin: Iterable[int] = None):
-        if hasattr(initial, 'split'):
-            initial = initial.split(',')
-        self.memory: MutableMapping[int, int] = defaultdict(int, enumerate(int(val) for val in initial))
+                 stdin: Union[Channel, Iterable[int]] = None,
+                 memory_class: Type[Memory] = None,
+                 stdout: Channel = None):
+        """``stdin`` and ``stdout`` default to unsynchronized channels; pass a
+        ``SynchronizedChannel`` to feed or read the VM from another thread.  Pass the
+        same ``ProgramImage`` to many VMs to parse the program only once."""
+        self._decoded: MutableMapping[int, Handler] = {}
+        self._decoded_cells: MutableMapping[int, MutableSet[int]] = defaultdict(set)
+        memory_class = memory_class or self.default_memory_class
+        self.image = ProgramImage.of(initial)
+        self.memory = self.image.memory(memory_class)
         self.iptr = 0
         self.rbptr = 0
-        self._stdin = Queue()
-        for item in stdin or []:
-            self.put_stdin(item)
-        self._stdout = Queue()
+        if not isinstance(stdin, Channel):
+            stdin = self.default_channel_class(stdin or ())
+        self._stdin = stdin
+        self._stdout = stdout if stdout is not None else self.default_channel_class()
         self.jumped: Optional[bool] = None
-        self.instructions: MutableMapping[Opcode, Instruction] = {}
+        self.instructions: InstructionSet = (
+            instruction_table(tuple(instruction_classes)) if instruction_classes
+            else self.default_instructions)
+        self.blocking = self.default_blocking
         self._alive = False
         self._started = False
-        for instruction in instruction_classes or self.default_instruction_classes:
-            self.register_instr(instruction)
+        self._running = False
+        self._stop: Optional[RunStatus] = None
+        self._outputs_left = 0
+        self._status: Optional[RunStatus] = None
+        self.steps = 0
+        """dispatches run so far, as ``max_steps`` counts them"""
+        self._profiler: Optional[Profiler] = None
+        self._tracer: Optional[Tracer] = None
+        self._watchdog: Optional[Watchdog] = None
+        self._metrics: Optional[VMMetrics] = None
+
+    @property
+    def memory(self) -> Memory:
+        return self._memory
+
+    @memory.setter
+    def memory(self, value: Memory) -> None:
+        # decoded handlers are bound to the memory they were decoded from
+        self._memory = value
+        self.invalidate()
+
+    @property
+    def profiler(self) -> Optional[Profiler]:
+        return self._profiler
+
+    @profiler.setter
+    def profiler(self, value: Optional[Profiler]) -> None:
+        # handlers are wrapped for the profiler as they are decoded
+        self._profiler = value
+        self.invalidate()
+
+    @property
+    def tracer(self) -> Optional[Tracer]:
+        return self._tracer
+
+    @tracer.setter
+    def tracer(self, value: Optional[Tracer]) -> None:
+        self._tracer = value
+        self.invalidate()
+
+    @property
+    def watchdog(self) -> Optional[Watchdog]:
+        return self._watchdog
+
+    @watchdog.setter
+    def watchdog(self, value: Optional[Watchdog]) -> None:
+        # loop heads are wrapped for the watchdog as they are decoded
+        self._watchdog = value
+        self.invalidate()
+
+    @property
+    def metrics(self) -> Optional[VMMetrics]:
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, value: Optional[VMMetrics]) -> None:
+        # updated once per run_until(), so no handler is wrapped
+        self._metrics = value
 
     @property
     def is_terminated(self) -> bool:
         return self._started and not self._alive
 
+    @property
+    def stdin_channel(self) -> Channel:
+        return self._stdin
+
+    @property
+    def stdout_channel(self) -> Channel:
+        return self._stdout
+
     def get_stdin(self) -> int:
-        return self._stdin.get()
+        try:
+            return self._stdin.get(self.blocking)
+        except Empty:
+            raise WaitingForInput() from None
 
     def get_stdout(self) -> int:
-        return self._stdout.get()
+        return self._stdout.get(block=True)
 
     def get_stdout_nowait(self) -> int:
-        return self._stdout.get_nowait()
+        return self._stdout.get()
 
     def put_stdout(self, value: int) -> None:
         self._stdout.put(value)
+        if self._outputs_left:
+            self._outputs_left -= 1
+            if not self._outputs_left:
+                self.suspend(RunStatus.OUTPUT_READY)
 
     def put_stdin(self, value: int) -> None:
         self._stdin.put(value)
@@ -63,18 +179,188 @@ class IntcodeComputer:
     def stdout(self) -> Iterable[int]:
         with suppress(Empty):
             while True:
-                yield self._stdout.get_nowait()
+                yield self._stdout.get()
+
+    def snapshot(self) -> Snapshot:
+        """capture memory, registers and queued I/O
+
+        Only valid while the VM is outside ``run()`` (e.g. after ``WaitingForInput``),
+        since ``iptr`` is not written back until ``run()`` returns.  Memory is copied in
+        the VM's backend, so that restored VMs behave (and print) as the original does:
+        O(cells), except for ``PagedMemory``, whose copies are copy-on-write, so that
+        every ``restore()`` costs O(pages) plus the pages the restored VM writes.
+        """
+        if self._running:
+            raise InvalidState("Cannot snapshot a computer while it is running")
+        return Snapshot(
+            computer_class=type(self),
+            options=self.options(),
+            memory=self.memory.copy(),
+            iptr=self.iptr,
+            rbptr=self.rbptr,
+            stdin=self._stdin.values(),
+            stdout=self._stdout.values(),
+            started=self._started,
+            alive=self._alive,
+            image=self.image,
+            steps=self.steps,
+            settings=self.settings(),
+        )
+
+    def fork(self) -> 'IntcodeComputer':
+        """a new VM continuing from the current state
+
+        To fork many children, take one ``snapshot()`` and ``restore()`` it repeatedly.
+        """
+        return self.snapshot().restore()
+
+    def save(self, file: Union[str, os.PathLike, BinaryIO], embed_image: bool = True) -> None:
+        """checkpoint the VM to disk, under the same conditions as ``snapshot()``
+
+        Memory is saved as the pages that differ from ``image``, which is saved too
+        unless ``embed_image`` is false.
+        """
+        checkpoint.dump(self.snapshot(), file, embed_image)
+
+    @staticmethod
+    def load(file: Union[str, os.PathLike, BinaryIO], image: Optional[ProgramImage] = None,
+             mmap: bool = False) -> 'IntcodeComputer':
+        """a VM resumed from a ``save()``d checkpoint, of the class that was saved
+
+        ``image`` is required if it was not saved; ``mmap`` maps a saved image from
+        the file rather than reading it.
+        """
+        return checkpoint.load(file, image, mmap).restore()
+
+    def options(self) -> Mapping[str, Any]:
+        """constructor keyword arguments that recreate this VM's configuration"""
+        return {
+            'instruction_classes': [type(instr) for instr in self.instructions.values()],
+            'memory_class': type(self.memory),
+        }
+
+    def settings(self) -> Mapping[str, Any]:
+        """attributes configuring this VM that its constructor does not take"""
+        return {'blocking': self.blocking}
 
     def register_instr(self, instr_cls: Type[Instruction]) -> None:
-        self.instructions[instr_cls.opcode] = instr_cls(self)
+        """switch this VM to its instruction set with ``instr_cls`` handling its opcode
+
+        Instruction sets are shared and never modified, so this swaps in another one.
+        """
+        classes = {opcode: type(instr) for opcode, instr in self.instructions.items()}
+        classes[instr_cls.opcode] = instr_cls
+        self.instructions = instruction_table(tuple(classes.values()))
+        self.invalidate()
 
     def kill(self) -> None:
         self._alive = False
+        self.suspend(RunStatus.HALTED)
+
+    def suspend(self, status: RunStatus) -> None:
+        """make ``run_until`` return ``status`` once the current instruction is done"""
+        self._stop = status
 
-    def run(self) -> None:
-        with suppress(Halt):
-            while not self.is_terminated:
-                self.tick()
+    def run(self, max_steps: Optional[int] = None) -> None:
+        """run until halted, using handlers decoded once per address
+
+        With ``max_steps``, return early after that many dispatches: one instruction
+        each, or one whole block in compiled mode.  Raises ``WaitingForInput`` if stdin
+        runs dry, and ``InfiniteLoop`` or ``LimitExceeded`` if a ``watchdog`` stops the
+        VM; ``run_until`` returns a status instead.
+        """
+        status = self.run_until(RunStatus.HALTED, max_steps)
+        if status is RunStatus.NEEDS_INPUT:
+            raise WaitingForInput()
+        if status is RunStatus.LOOPING:
+            raise InfiniteLoop(self._watchdog.cycle)
+        if status is RunStatus.LIMIT_EXCEEDED:
+            raise LimitExceeded()
+
+    def run_until(self, event: RunStatus = RunStatus.HALTED, max_steps: Optional[int] = None,
+                  outputs: int = 1) -> RunStatus:
+        """run until ``event`` happens and return what stopped the VM
+
+        Halting always stops it, and so does an input instruction finding stdin empty
+        (unless a blocking VM can wait on another thread), which returns
+        ``NEEDS_INPUT`` with ``iptr`` left at that instruction.  ``OUTPUT_READY``
+        also stops once ``outputs`` values have been written, and
+        ``BUDGET_EXHAUSTED`` means ``max_steps`` dispatches ran first.  A ``watchdog``
+        may also stop it with ``LOOPING`` or ``LIMIT_EXCEEDED``.
+        """
+        if self.is_terminated:
+            return RunStatus.HALTED
+        self._started = True
+        self._alive = True
+        self._stop = None
+        self._outputs_left = outputs if event is RunStatus.OUTPUT_READY else 0
+        decoded, profiler, tracer = self._decoded, self._profiler, self._tracer
+        watchdog, metrics = self._watchdog, self._metrics
+        if profiler is not None:
+            profiler.resumed()
+        if watchdog is not None:
+            max_steps = watchdog.resumed(self, max_steps)
+        if metrics is not None:
+            metrics.resumed(self)
+        iptr = self.iptr
+        steps = 0
+        # iptr lives in a local until run_until() returns, see snapshot()
+        self._running = True
+        try:
+            for steps in count(1) if max_steps is None else range(1, max_steps + 1):
+                if self._stop is not None:
+                    steps -= 1
+                    break
+                handler = decoded.get(iptr)
+                if handler is None:
+                    handler = self.decode(iptr)
+                    if tracer is not None:
+                        handler = decoded[iptr] = tracer.wrap(self, iptr, handler)
+                    if profiler is not None:
+                        handler = decoded[iptr] = profiler.wrap(self, iptr, handler)
+                    if watchdog is not None:
+                        handler = decoded[iptr] = watchdog.wrap(self, iptr, handler)
+                iptr = handler()
+        except Halt:
+            self.kill()
+        except WaitingForInput:
+            self.suspend(RunStatus.NEEDS_INPUT)
+        finally:
+            self.iptr = iptr
+            self.steps += steps
+            self._running = False
+            self._outputs_left = 0
+        status = RunStatus.BUDGET_EXHAUSTED if self._stop is None else self._stop
+        if watchdog is not None:
+            status = watchdog.stopped(self, status)
+        self._status = status
+        if profiler is not None:
+            profiler.stopped(status)
+        if metrics is not None:
+            metrics.stopped(self, status)
+        return status
+
+    def decode(self, address: int) -> Handler:
+        """decode and cache the instruction at ``address``"""
+        instr = self.instructions[Opcode(self.memory[address] % 100)]
+        handler = self._decoded[address] = instr.decode(self, address)
+        for cell in range(address, address + 1 + instr.parameter_count):
+            self._decoded_cells[cell].add(address)
+        return handler
+
+    def invalidate(self, cell: Optional[int] = None) -> None:
+        """drop decoded handlers covering ``cell``, or all of them"""
+        if cell is None:
+            self._decoded.clear()
+            self._decoded_cells.clear()
+            return
+        for address in self._decoded_cells.pop(cell, ()):
+            self._decoded.pop(address, None)
+
+    def write(self, address: int, value: int) -> None:
+        self.memory[address] = value
+        if address in self._decoded_cells:
+            self.invalidate(address)
 
     def tick(self) -> None:
         if not self._started:
@@ -88,7 +374,8 @@ class IntcodeComputer:
         # LOG.debug('Executing %s', opcode.name)
         instr = self.instructions[opcode]
         self.jumped = False
-        instr.execute()
+        instr.execute(self)
+        self.steps += 1
         if not self.jumped:
             self.iptr += 1 + instr.parameter_count
 
@@ -114,26 +401,24 @@ class IntcodeComputer:
     def set_parameter(self, idx: int, value: int) -> None:
         parameter_mode = self.get_parameter_mode(idx)
         if parameter_mode == ParameterMode.POSITION:
-            self.memory[self.memory[self.iptr + idx]] = value
+            self.write(self.memory[self.iptr + idx], value)
         elif parameter_mode == ParameterMode.RELATIVE:
-            self.memory[self.memory[self.iptr + idx] + self.rbptr] = value
+            self.write(self.memory[self.iptr + idx] + self.rbptr, value)
         else:
             raise ParameterError("Invalid parameter mode: %s", parameter_mode)
 
+    def result(self) -> RunResult:
+        """the state the VM stopped in, with a view of its memory rather than a copy"""
+        status = RunStatus.HALTED if self.is_terminated else self._status
+        return RunResult(MemoryView(self.memory), status, self.steps, self._stdout.values())
+
     def __str__(self) -> str:
-        ret = []
-        last_address = 0
-        for address, value in self.memory.items():
-            item = ''
-            if address > last_address + 1:
-                item += f'...{hex(address)}::'
-            item += str(value)
-            ret.append(item)
-            last_address = address
-        return ','.join(ret)
+        return ''.join(serialize(self.memory))
 
 
 class IntcodeComputerV5(IntcodeComputer):
+    __slots__ = ()
+
     default_instruction_classes = IntcodeComputer.default_instruction_classes + [
         SaveInstruction,
         OutputInstruction,
@@ -145,21 +430,97 @@ class IntcodeComputerV5(IntcodeComputer):
 
 
 class IntcodeComputerV9(IntcodeComputerV5):
+    __slots__ = ('hot_threshold', 'compiler', 'fuser', '_entries', '_uncompilable')
+
     default_instruction_classes = IntcodeComputerV5.default_instruction_classes + [
         AdjustRelativeBaseInstruction
     ]
 
+    default_hot_threshold = 8
+    """dispatches into an address before it is compiled as a block; ``hot_threshold``
+    overrides it per VM"""
+
+    def __init__(self, *args, compiled: bool = False, fused: bool = False, **kwargs) -> None:
+        """``compiled`` compiles hot basic blocks into Python functions; ``fused``
+        interprets common instruction sequences as superinstructions (see ``Fuser``)"""
+        super().__init__(*args, **kwargs)
+        self.hot_threshold = self.default_hot_threshold
+        self.compiler: Optional[BlockCompiler] = BlockCompiler(self) if compiled else None
+        self.fuser: Optional[Fuser] = Fuser(self) if fused else None
+        self._entries: MutableMapping[int, int] = defaultdict(int)
+        self._uncompilable: MutableSet[int] = set()
+
+    def options(self) -> Mapping[str, Any]:
+        return {**super().options(), 'compiled': self.compiler is not None,
+                'fused': self.fuser is not None}
+
+    def settings(self) -> Mapping[str, Any]:
+        return {**super().settings(), 'hot_threshold': self.hot_threshold}
+
+    def decode(self, address: int) -> Handler:
+        """in compiled mode, hot addresses are decoded into a whole generated basic block"""
+        if self._tracer is not None:
+            # traced VMs are interpreted one instruction at a time, so that every one
+            # of them is recorded
+            return super().decode(address)
+        if self.compiler is None or address in self._uncompilable:
+            return self._interpret(address)
+        if self._entries[address] < self.hot_threshold:
+            return self._count_entries(address, self._interpret(address))
+        compiled = self.compiler.compile(address)
+        if compiled is None:
+            # interpreted from now on, rather than retrying on every dispatch
+            self._uncompilable.add(address)
+            return self._interpret(address)
+        return self._cache(address, *compiled)
+
+    def invalidate(self, cell: Optional[int] = None) -> None:
+        if cell is not None:
+            rewritten = self._decoded_cells.get(cell, ())
+            if self.fuser is not None:
+                self.fuser.unstable.update(rewritten)
+            if self.compiler is not None:
+                # rewritten code tends to be rewritten again, and every recompile of
+                # a block costs more than the interpreter would spend on it
+                self._uncompilable.update(rewritten)
+        super().invalidate(cell)
+
+    def _interpret(self, address: int) -> Handler:
+        """the handler of the instruction at ``address``, or of a superinstruction there"""
+        fused = None if self.fuser is None else self.fuser.fuse(address)
+        if fused is None:
+            return super().decode(address)
+        return self._cache(address, *fused)
+
+    def _cache(self, address: int, handler: Handler, end: int) -> Handler:
+        """decode ``handler`` at ``address``, covering the cells up to ``end``"""
+        self._decoded[address] = handler
+        for cell in range(address, end):
+            self._decoded_cells[cell].add(address)
+        return handler
+
+    def _count_entries(self, address: int, handler: Handler) -> Handler:
+        entries, decoded, threshold = self._entries, self._decoded, self.hot_threshold
+
+        def counting_handler() -> int:
+            entries[address] += 1
+            if entries[address] >= threshold:
+                # re-decoded (and compiled) on the next dispatch
+                decoded.pop(address, None)
+            return handler()
+        self._decoded[address] = counting_handler
+        return counting_handler
+
 
 class IntcodeComputerV11(IntcodeComputerV9):
-    def get_stdin(self) -> int:
-        # overridden to raise an error when waiting for input
-        if self._stdin.empty():
-            raise WaitingForInput()
-        return super().get_stdin()
+    __slots__ = ()
+
+    default_blocking = False
 
 
 def run_intcode(input_data: Union[str, Iterable[int]],
-                comp_cls: Type[IntcodeComputer] = IntcodeComputer) -> str:
+                comp_cls: Type[IntcodeComputer] = IntcodeComputer) -> RunResult:
+    """run a program to the end; ``str()`` of the result renders its final memory"""
     vm = comp_cls(initial=input_data)
     vm.run()
-    return str(vm)
+    return vm.result()
@@ -16,3 +16,23 @@ class WaitingForInput(IntcodeException):
 
 class InvalidState(IntcodeException):
     """Invalid state"""
+
+
+class InfiniteLoop(IntcodeException):
+    """Raised when a watchdog finds a program repeating an earlier state"""
+
+    def __init__(self, cycle) -> None:
+        super().__init__(cycle)
+        self.cycle = cycle
+
+
+class LimitExceeded(IntcodeException):
+    """Raised when a program runs past a watchdog's step or wall-clock limit"""
+
+
+class NotSymbolic(IntcodeException):
+    """Raised when symbolic execution meets something it cannot follow"""
+
+
+class AssemblyError(IntcodeException):
+    """Raised when assembly source cannot be assembled"""
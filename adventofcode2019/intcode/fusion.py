@@ -0,0 +1,221 @@
+import logging
+import operator
+from typing import TYPE_CHECKING, Callable, List, MutableMapping, MutableSet, Optional, Tuple
+
+import attr
+
+from .compiler import STOCK_INSTRUCTIONS
+from .instruction import Handler, Instruction, Operand
+from .opcode import Opcode
+from .parameter_mode import ParameterMode
+
+if TYPE_CHECKING:
+    from .computer import IntcodeComputer
+
+LOG = logging.getLogger(__name__)
+
+Decoded = Tuple[Opcode, List[Operand]]
+Fused = Tuple[Handler, int, 'Superinstruction']
+
+COMPARISONS: MutableMapping[Opcode, Callable[[int, int], bool]] = {
+    Opcode.LESS_THAN: operator.lt,
+    Opcode.EQUALS: operator.eq,
+}
+ARITHMETIC = {Opcode.ADD, Opcode.MULTIPLY, Opcode.LESS_THAN, Opcode.EQUALS}
+BRANCHES = {
+    # branch: the flag it jumps on
+    Opcode.JUMP_IF_TRUE: 1,
+    Opcode.JUMP_IF_FALSE: 0,
+}
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class Superinstruction:
+    idiom: str
+    """e.g. ``rb_adjust+compare_branch`` for an idiom fused with the one following it"""
+    length: int
+    """the number of instructions it runs per dispatch"""
+
+
+class Fuser:
+    """a peephole pass fusing common instruction sequences into one handler
+
+    Idioms, each found at the address the VM dispatches to:
+
+    ``compare_branch``
+        ``lt``/``eq`` writing a cell, then ``jnz``/``jz`` testing that cell: the flag
+        is still written, but branched on without being read back.
+    ``increment_compare``
+        ``add`` of a constant to a cell in place, then ``lt``/``eq`` reading it, as
+        loop counters do; fused with a following branch where possible.
+    ``compute_output``
+        ``add``/``mul``/``lt``/``eq`` writing a cell, then ``out`` of that cell.
+    ``rb_adjust``
+        ``arb``, then an instruction addressing through the relative base, such as a
+        stack push or a return through the stack; fused with a following idiom
+        where possible.
+
+    An instruction is only fused ahead of others if it writes nothing or writes a
+    fixed cell outside the superinstruction, so no handler in it can go stale while
+    it runs, and never ahead of an ``in``, which may suspend the VM to wait for
+    input and be dispatched again.  Writes into a superinstruction's cells from
+    elsewhere invalidate it as a whole, like any decoded handler, and addresses
+    whose code has been written are not fused again: rewritten code tends to be
+    rewritten again (e.g. day11's input buffer inside its first instructions), and
+    each refusal would cost more than fusion saves.  Only the stock instruction classes are fused, since their
+    semantics are assumed.
+    """
+
+    def __init__(self, computer: 'IntcodeComputer') -> None:
+        self.computer = computer
+        self.superinstructions: MutableMapping[int, Superinstruction] = {}
+        """the superinstruction currently decoded at each address"""
+        self.unstable: MutableSet[int] = set()
+        """addresses whose decoded handlers were invalidated by writes"""
+
+    def decode(self, address: int) -> Optional[Decoded]:
+        """the opcode and operands at ``address``, or None if it cannot be fused"""
+        memory = self.computer.memory
+        word = memory[address]
+        try:
+            opcode = Opcode(word % 100)
+            instr = self.computer.instructions[opcode]
+            operands = [(ParameterMode(word // 10 ** (idx + 1) % 10), memory[address + idx])
+                        for idx in range(1, instr.parameter_count + 1)]
+        except (ValueError, KeyError):
+            return None
+        if type(instr) is not STOCK_INSTRUCTIONS[opcode]:
+            return None
+        return opcode, operands
+
+    def fuse(self, address: int) -> Optional[Tuple[Handler, int]]:
+        """a superinstruction at ``address`` and the address just past it, if one applies"""
+        self.superinstructions.pop(address, None)
+        if address in self.unstable:
+            return None
+        decoded = self.decode(address)
+        fused = None if decoded is None else self._fuse(address, *decoded)
+        if fused is None:
+            return None
+        handler, end, superinstruction = fused
+        self.superinstructions[address] = superinstruction
+        return handler, end
+
+    def _fuse(self, address: int, opcode: Opcode, operands: List[Operand]) -> Optional[Fused]:
+        if opcode == Opcode.ADJUST_RELATIVE_BASE:
+            return self._rb_adjust(address, operands)
+        if opcode not in ARITHMETIC:
+            return None
+        fused = None
+        if opcode in COMPARISONS:
+            fused = self._compare_branch(address, opcode, operands)
+        elif opcode == Opcode.ADD:
+            fused = self._increment_compare(address, operands)
+        return fused or self._compute_output(address, opcode, operands)
+
+    def _specialize(self, address: int, opcode: Opcode, operands: List[Operand]) -> Handler:
+        return self.computer.instructions[opcode].specialize(
+            self.computer, address + 1 + len(operands), *operands)
+
+    def _compare_branch(self, address: int, opcode: Opcode, operands: List[Operand]
+                        ) -> Optional[Fused]:
+        branch_address = address + 4
+        branch = self.decode(branch_address)
+        if branch is None or branch[0] not in BRANCHES:
+            return None
+        end = branch_address + 3
+        flag_mode, flag_cell = operands[2]
+        if flag_mode != ParameterMode.POSITION or branch[1][0] != operands[2] \
+                or address <= flag_cell < end:
+            return None
+        computer = self.computer
+        read_1, read_2, write = (Instruction.reader(computer, operands[0]),
+                                 Instruction.reader(computer, operands[1]),
+                                 Instruction.writer(computer, operands[2]))
+        compare, jump_on = COMPARISONS[opcode], BRANCHES[branch[0]]
+        target_mode, target = branch[1][1]
+        if target_mode == ParameterMode.IMMEDIATE:
+            def compare_branch_handler() -> int:
+                flag = 1 if compare(read_1(), read_2()) else 0
+                write(flag)
+                return target if flag == jump_on else end
+        else:
+            read_target = Instruction.reader(computer, branch[1][1])
+
+            def compare_branch_handler() -> int:
+                flag = 1 if compare(read_1(), read_2()) else 0
+                write(flag)
+                return read_target() if flag == jump_on else end
+        return compare_branch_handler, end, Superinstruction('compare_branch', 2)
+
+    def _increment_compare(self, address: int, operands: List[Operand]) -> Optional[Fused]:
+        counter = operands[2]
+        if counter[0] != ParameterMode.POSITION or counter not in operands[:2] \
+                or ParameterMode.IMMEDIATE not in (operands[0][0], operands[1][0]):
+            return None
+        compare_address = address + 4
+        compare = self.decode(compare_address)
+        if compare is None or compare[0] not in COMPARISONS or counter not in compare[1][:2]:
+            return None
+        fused = self._compare_branch(compare_address, *compare)
+        if fused is None:
+            rest, end = self._specialize(compare_address, *compare), compare_address + 4
+            idiom, length = 'increment_compare', 2
+        else:
+            rest, end, superinstruction = fused
+            idiom, length = 'increment_compare_branch', 3
+        if address <= counter[1] < end:
+            return None
+        increment = self._specialize(address, Opcode.ADD, operands)
+
+        def increment_compare_handler() -> int:
+            increment()
+            return rest()
+        return increment_compare_handler, end, Superinstruction(idiom, length)
+
+    def _compute_output(self, address: int, opcode: Opcode, operands: List[Operand]
+                        ) -> Optional[Fused]:
+        output_address = address + 4
+        output = self.decode(output_address)
+        end = output_address + 2
+        result_mode, result_cell = operands[2]
+        if output is None or output[0] != Opcode.OUTPUT or output[1][0] != operands[2] \
+                or result_mode != ParameterMode.POSITION or address <= result_cell < end:
+            return None
+        compute = self._specialize(address, opcode, operands)
+        put_output = self._specialize(output_address, *output)
+
+        def compute_output_handler() -> int:
+            compute()
+            return put_output()
+        return compute_output_handler, end, Superinstruction('compute_output', 2)
+
+    def _rb_adjust(self, address: int, operands: List[Operand]) -> Optional[Fused]:
+        next_address = address + 2
+        decoded = self.decode(next_address)
+        # an input finding stdin empty leaves iptr at the arb, which would run again
+        if decoded is None or decoded[0] == Opcode.SAVE \
+                or not any(mode == ParameterMode.RELATIVE for mode, _ in decoded[1]):
+            return None
+        fused = self._fuse(next_address, *decoded)
+        if fused is None:
+            rest = self._specialize(next_address, *decoded)
+            end, idiom, length = next_address + 1 + len(decoded[1]), 'rb_adjust', 2
+        else:
+            rest, end, superinstruction = fused
+            idiom = f'rb_adjust+{superinstruction.idiom}'
+            length = 1 + superinstruction.length
+        # writes no memory, so nothing fused after it can go stale
+        if operands[0][0] == ParameterMode.IMMEDIATE:
+            computer, offset = self.computer, operands[0][1]
+
+            def rb_adjust_handler() -> int:
+                computer.rbptr += offset
+                return rest()
+        else:
+            adjust = self._specialize(address, Opcode.ADJUST_RELATIVE_BASE, operands)
+
+            def rb_adjust_handler() -> int:
+                adjust()
+                return rest()
+        return rb_adjust_handler, end, Superinstruction(idiom, length)
@@ -0,0 +1,146 @@
+"""immutable parsed programs, shared read-only by every VM built from them"""
+import collections.abc
+import hashlib
+import logging
+import os
+import warnings
+from typing import Iterable, Iterator, List, Optional, Sequence, Type, Union
+
+import numpy
+
+from .memory import Memory, PagedMemory
+
+LOG = logging.getLogger(__name__)
+
+# plain ints, so that comparing them with Python ints of any size is exact
+INT64_MIN, INT64_MAX = -1 << 63, (1 << 63) - 1
+
+
+def program_hash(program: Iterable[int]) -> str:
+    """the SHA-1 of the program's canonical text, i.e. its values joined by commas"""
+    return hashlib.sha1(','.join(map(str, program)).encode()).hexdigest()
+
+
+class ProgramImage(collections.abc.Sequence):
+    """a parsed program, never modified once built
+
+    Cells are kept as a read-only int64 array when every value fits, or else as a
+    tuple of Python ints.  The memory of each VM built from an image is derived
+    from state cached on the image, so constructing many VMs (e.g. day7's
+    amplifiers) parses the program once.  With ``PagedMemory`` a VM reads through
+    to the image and only pays for the pages it touches.
+    """
+    __slots__ = ('_cells', '_values', '_digest')
+
+    def __init__(self, cells: Union[numpy.ndarray, Sequence[int]], digest: str = None) -> None:
+        if isinstance(cells, numpy.ndarray):
+            cells = cells.view()
+            cells.flags.writeable = False
+        else:
+            cells = tuple(cells)
+        self._cells = cells
+        self._values: Optional[List[int]] = None
+        self._digest = digest
+
+    @classmethod
+    def of(cls, program: Union['ProgramImage', str, Iterable[Union[int, str]]]
+           ) -> 'ProgramImage':
+        """``program`` itself if it is an image, or else parsed into one"""
+        if isinstance(program, ProgramImage):
+            return program
+        if hasattr(program, 'split'):
+            return cls.parse(program)
+        return cls([int(val) for val in program])
+
+    @classmethod
+    def parse(cls, text: str) -> 'ProgramImage':
+        """parse comma-separated text in bulk; raises ``ValueError`` if it is malformed"""
+        if not text.strip():
+            return cls(())
+        try:
+            with warnings.catch_warnings():
+                # numpy 1.x stops at malformed data with only a DeprecationWarning
+                warnings.simplefilter('error', DeprecationWarning)
+                cells = numpy.fromstring(text, dtype=numpy.int64, sep=',')
+        except (ValueError, DeprecationWarning):
+            cells = None
+        # fromstring also accepts a trailing comma
+        if cells is None or cells.size != text.count(',') + 1 \
+                or cells.max() == INT64_MAX or cells.min() == INT64_MIN:
+            # malformed, which int() reports, or saturated, or at least
+            # indistinguishable from a value that was
+            return cls([int(val) for val in text.split(',')])
+        return cls(cells)
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike], cache_dir: Union[str, os.PathLike] = None
+             ) -> 'ProgramImage':
+        """the program in a text file, parsed once and then memory-mapped from ``cache_dir``
+
+        Cached images are ``.npy`` files named after the hash of the file's text, so
+        an edited file is parsed afresh.  Programs with values beyond int64 are not
+        cached.
+        """
+        with open(path) as fp:
+            text = fp.read().strip()
+        if cache_dir is None:
+            return cls.parse(text)
+        digest = hashlib.sha1(text.encode()).hexdigest()
+        cached = os.path.join(cache_dir, f'{digest}.npy')
+        try:
+            return cls(numpy.load(cached, mmap_mode='r'))
+        except FileNotFoundError:
+            pass
+        image = cls.parse(text)
+        if isinstance(image._cells, numpy.ndarray):
+            os.makedirs(cache_dir, exist_ok=True)
+            # written aside and renamed, so that readers never see a partial file
+            partial = f'{cached}.{os.getpid()}.tmp'
+            with open(partial, 'wb') as fp:
+                numpy.save(fp, image._cells)
+            os.replace(partial, cached)
+            LOG.debug('Cached %s as %s', path, cached)
+        return image
+
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            self._digest = program_hash(self.values())
+        return self._digest
+
+    def values(self) -> List[int]:
+        """the cells as Python ints; shared, so never modify it"""
+        if self._values is None:
+            cells = self._cells
+            self._values = cells.tolist() if isinstance(cells, numpy.ndarray) else list(cells)
+        return self._values
+
+    def memory(self, memory_class: Type[Memory]) -> Memory:
+        """a fresh memory holding the program"""
+        if issubclass(memory_class, PagedMemory):
+            return memory_class.over(self)
+        return memory_class(self.values())
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice) and self._values is None \
+                and isinstance(self._cells, numpy.ndarray):
+            # e.g. one page, without converting (or, memory-mapped, reading) the whole image
+            return self._cells[idx].tolist()
+        return self.values()[idx]
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.values())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ProgramImage):
+            return NotImplemented
+        return self.values() == other.values()
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(<{len(self)} cells, {self.digest[:12]}>)'
@@ -1,129 +1,258 @@
-import re
+import functools
+import itertools
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Callable, Mapping, Tuple, Type
 
 from .exceptions import Halt, ParameterError
 from .opcode import Opcode
+from .parameter_mode import ParameterMode
+from .run_status import RunStatus
 
 if TYPE_CHECKING:
     from .computer import IntcodeComputer
 
+Handler = Callable[[], int]
+"""a decoded instruction: executes it and returns the next iptr"""
+Operand = Tuple[ParameterMode, int]
+Reader = Callable[[], int]
+Writer = Callable[[int], None]
+InstructionSet = Mapping[Opcode, 'Instruction']
+
 
 class Instruction(ABC):
+    """the semantics of one opcode, for any VM passed to it
+
+    Instructions hold no state, so ``instruction_table`` builds one instance of each
+    class per instruction set and every VM using that set shares it.
+    """
+    __slots__ = ()
+
     opcode: Opcode = ...
     parameter_count: int = ...
 
-    computer: 'IntcodeComputer' = ...
+    @abstractmethod
+    def execute(self, computer: 'IntcodeComputer') -> None:
+        """run the instruction at ``computer.iptr``, reading its parameters from memory"""
+        ...
 
     @abstractmethod
-    def execute(self) -> None:
+    def specialize(self, computer: 'IntcodeComputer', next_iptr: int,
+                   *operands: Operand) -> Handler:
+        """build a handler for this instruction with its parameter modes and operands fixed"""
         ...
 
-    def __init__(self, computer: 'IntcodeComputer') -> None:
-        self.computer = computer
-
-    def __getattr__(self, item: str) -> int:
-        """helper method for ``input_x``"""
-        if item.startswith('input_'):
-            input_idx = re.match(r'input_(\d*)$', item).group(1)
-            if input_idx:
-                input_idx = int(input_idx)
-                if input_idx > self.parameter_count:
-                    raise ParameterError('Invalid input index: %2', input_idx)
-                return self.computer.get_parameter(input_idx)
-        raise ParameterError('Invalid attribute: %s', item)
-
-    def __setattr__(self, key, value) -> None:
-        if key == 'result':
-            self.computer.set_parameter(self.parameter_count, value)
-        else:
-            super().__setattr__(key, value)
+    def decode(self, computer: 'IntcodeComputer', address: int) -> Handler:
+        """decode the full instruction word at ``address`` into a specialized handler"""
+        memory = computer.memory
+        word = memory[address]
+        operands = [(ParameterMode(word // 10 ** (idx + 1) % 10), memory[address + idx])
+                    for idx in range(1, self.parameter_count + 1)]
+        return self.specialize(computer, address + 1 + self.parameter_count, *operands)
+
+    @staticmethod
+    def reader(computer: 'IntcodeComputer', operand: Operand) -> Reader:
+        mode, value = operand
+        memory = computer.memory
+        if mode == ParameterMode.POSITION:
+            return memory.reader(value)
+        elif mode == ParameterMode.IMMEDIATE:
+            # a C-level callable that keeps returning ``value``
+            return itertools.repeat(value).__next__
+        elif mode == ParameterMode.RELATIVE:
+            return lambda: memory[value + computer.rbptr]
+        raise ParameterError("Invalid parameter mode: %s", mode)
+
+    @staticmethod
+    def writer(computer: 'IntcodeComputer', operand: Operand) -> Writer:
+        mode, value = operand
+        if mode == ParameterMode.POSITION:
+            return functools.partial(computer.write, value)
+        elif mode == ParameterMode.RELATIVE:
+            return lambda result: computer.write(value + computer.rbptr, result)
+        raise ParameterError("Invalid parameter mode: %s", mode)
+
+
+@functools.lru_cache(maxsize=None)
+def instruction_table(instruction_classes: Tuple[Type[Instruction], ...]) -> InstructionSet:
+    """the read-only dispatch table of one instance of each class, built once per set"""
+    return MappingProxyType({cls.opcode: cls() for cls in instruction_classes})
 
 
 class AddInstruction(Instruction):
     opcode = Opcode.ADD
     parameter_count = 3
 
-    def execute(self):
-        self.result = self.input_1 + self.input_2
+    def execute(self, computer):
+        computer.set_parameter(3, computer.get_parameter(1) + computer.get_parameter(2))
+
+    def specialize(self, computer, next_iptr, input_1, input_2, result):
+        read_1, read_2 = self.reader(computer, input_1), self.reader(computer, input_2)
+        write = self.writer(computer, result)
+
+        def handler():
+            write(read_1() + read_2())
+            return next_iptr
+        return handler
 
 
 class MultiplyInstruction(Instruction):
     opcode = Opcode.MULTIPLY
     parameter_count = 3
 
-    def execute(self):
-        self.result = self.input_1 * self.input_2
+    def execute(self, computer):
+        computer.set_parameter(3, computer.get_parameter(1) * computer.get_parameter(2))
+
+    def specialize(self, computer, next_iptr, input_1, input_2, result):
+        read_1, read_2 = self.reader(computer, input_1), self.reader(computer, input_2)
+        write = self.writer(computer, result)
+
+        def handler():
+            write(read_1() * read_2())
+            return next_iptr
+        return handler
 
 
 class HaltInstruction(Instruction):
     opcode = Opcode.HALT
     parameter_count = 0
 
-    def execute(self):
-        self.computer.kill()
+    def execute(self, computer):
+        computer.kill()
         raise Halt()
 
+    def specialize(self, computer, next_iptr):
+        def handler():
+            computer.kill()
+            raise Halt()
+        return handler
+
 
 class SaveInstruction(Instruction):
     opcode = Opcode.SAVE
     parameter_count = 1
 
-    def execute(self):
-        self.result = self.computer.get_stdin()
+    def execute(self, computer):
+        computer.set_parameter(1, computer.get_stdin())
+
+    def specialize(self, computer, next_iptr, result):
+        get_stdin, stdin = computer.get_stdin, computer.stdin_channel
+        write = self.writer(computer, result)
+        address = next_iptr - 2
+
+        def handler():
+            if not computer.blocking and stdin.empty():
+                # cheaper than unwinding WaitingForInput out of run_until()
+                computer.suspend(RunStatus.NEEDS_INPUT)
+                return address
+            write(get_stdin())
+            return next_iptr
+        return handler
 
 
 class OutputInstruction(Instruction):
     opcode = Opcode.OUTPUT
     parameter_count = 1
 
-    def execute(self):
-        self.computer.put_stdout(self.input_1)
+    def execute(self, computer):
+        computer.put_stdout(computer.get_parameter(1))
+
+    def specialize(self, computer, next_iptr, input_1):
+        put_stdout, read_1 = computer.put_stdout, self.reader(computer, input_1)
+
+        def handler():
+            put_stdout(read_1())
+            return next_iptr
+        return handler
 
 
 class JumpIfTrueInstruction(Instruction):
     opcode = Opcode.JUMP_IF_TRUE
     parameter_count = 2
 
-    def execute(self):
-        if self.input_1 != 0:
-            self.computer.jump(self.input_2)
+    def execute(self, computer):
+        if computer.get_parameter(1) != 0:
+            computer.jump(computer.get_parameter(2))
+
+    def specialize(self, computer, next_iptr, input_1, input_2):
+        read_1, read_2 = self.reader(computer, input_1), self.reader(computer, input_2)
+
+        def handler():
+            if read_1() != 0:
+                return read_2()
+            return next_iptr
+        return handler
 
 
 class JumpIfFalseInstruction(Instruction):
     opcode = Opcode.JUMP_IF_FALSE
     parameter_count = 2
 
-    def execute(self):
-        if self.input_1 == 0:
-            self.computer.jump(self.input_2)
+    def execute(self, computer):
+        if computer.get_parameter(1) == 0:
+            computer.jump(computer.get_parameter(2))
+
+    def specialize(self, computer, next_iptr, input_1, input_2):
+        read_1, read_2 = self.reader(computer, input_1), self.reader(computer, input_2)
+
+        def handler():
+            if read_1() == 0:
+                return read_2()
+            return next_iptr
+        return handler
 
 
 class LessThanInstruction(Instruction):
     opcode = Opcode.LESS_THAN
     parameter_count = 3
 
-    def execute(self):
-        if self.input_1 < self.input_2:
-            self.result = 1
+    def execute(self, computer):
+        if computer.get_parameter(1) < computer.get_parameter(2):
+            computer.set_parameter(3, 1)
         else:
-            self.result = 0
+            computer.set_parameter(3, 0)
+
+    def specialize(self, computer, next_iptr, input_1, input_2, result):
+        read_1, read_2 = self.reader(computer, input_1), self.reader(computer, input_2)
+        write = self.writer(computer, result)
+
+        def handler():
+            write(1 if read_1() < read_2() else 0)
+            return next_iptr
+        return handler
 
 
 class EqualsInstruction(Instruction):
     opcode = Opcode.EQUALS
     parameter_count = 3
 
-    def execute(self):
-        if self.input_1 == self.input_2:
-            self.result = 1
+    def execute(self, computer):
+        if computer.get_parameter(1) == computer.get_parameter(2):
+            computer.set_parameter(3, 1)
         else:
-            self.result = 0
+            computer.set_parameter(3, 0)
+
+    def specialize(self, computer, next_iptr, input_1, input_2, result):
+        read_1, read_2 = self.reader(computer, input_1), self.reader(computer, input_2)
+        write = self.writer(computer, result)
+
+        def handler():
+            write(1 if read_1() == read_2() else 0)
+            return next_iptr
+        return handler
 
 
 class AdjustRelativeBaseInstruction(Instruction):
     opcode = Opcode.ADJUST_RELATIVE_BASE
     parameter_count = 1
 
-    def execute(self):
-        self.computer.rbptr += self.input_1
+    def execute(self, computer):
+        computer.rbptr += computer.get_parameter(1)
+
+    def specialize(self, computer, next_iptr, input_1):
+        read_1 = self.reader(computer, input_1)
+
+        def handler():
+            computer.rbptr += read_1()
+            return next_iptr
+        return handler
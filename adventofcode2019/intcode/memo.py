@@ -0,0 +1,135 @@
+"""memoized runs of programs that depend on nothing but their stdin
+
+A run that halts, or stops for more input than it was given, is a pure function
+of the program, the instruction set and the stdin sequence, so its outputs can be
+reused whenever the same inputs come round again (e.g. day7, where permutations
+share prefixes of amplifier inputs).
+"""
+import json
+import logging
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import Iterable, MutableMapping, Optional, Tuple, Type, Union
+
+import attr
+
+from .computer import IntcodeComputer, IntcodeComputerV9
+from .image import ProgramImage
+from .run_status import RunStatus
+
+LOG = logging.getLogger(__name__)
+
+Key = Tuple[str, str, Tuple[int, ...]]
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class CachedRun:
+    outputs: Tuple[int, ...]
+    status: RunStatus
+    """``HALTED``, or ``NEEDS_INPUT`` if stdin ran out first"""
+
+
+class RunCache:
+    """an LRU cache of pure runs, keyed on instruction set, program hash and stdin
+
+    Entries are evicted once the in-process tier holds more than roughly
+    ``max_bytes`` (counted as 8 bytes per input or output value, plus a fixed
+    overhead per entry).  With ``path``, runs are also stored in an SQLite file,
+    which outlives the process and can be shared by several; it is never evicted.
+    """
+    entry_overhead = 256
+
+    def __init__(self, max_bytes: int = 16 << 20, path: Union[str, os.PathLike] = None) -> None:
+        self.max_bytes = max_bytes
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries: MutableMapping[Key, CachedRun] = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+
+    def run(self, program: Union[ProgramImage, str, Iterable[Union[int, str]]],
+            stdin: Iterable[int] = (),
+            computer_class: Type[IntcodeComputer] = IntcodeComputerV9) -> CachedRun:
+        """the outputs of running ``program`` on ``stdin``, computed once"""
+        image = ProgramImage.of(program)
+        stdin = tuple(stdin)
+        key = f'{computer_class.__module__}.{computer_class.__qualname__}', image.digest, stdin
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+        entry = self._load(key)
+        if entry is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            vm = computer_class(image, stdin=stdin)
+            vm.blocking = False
+            status = vm.run_until()
+            entry = CachedRun(tuple(vm.stdout), status)
+            self._store(key, entry)
+        self._remember(key, entry)
+        return entry
+
+    def stats(self) -> MutableMapping[str, int]:
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'bytes': self.size,
+        }
+
+    def clear(self) -> None:
+        """forget the in-process tier"""
+        self._entries.clear()
+        self.size = 0
+
+    def _cost(self, key: Key, entry: CachedRun) -> int:
+        return self.entry_overhead + 8 * (len(key[2]) + len(entry.outputs))
+
+    def _remember(self, key: Key, entry: CachedRun) -> None:
+        self._entries[key] = entry
+        self.size += self._cost(key, entry)
+        while self.size > self.max_bytes and self._entries:
+            old_key, old_entry = self._entries.popitem(last=False)
+            self.size -= self._cost(old_key, old_entry)
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            # connections must not cross a fork, e.g. into sweep workers
+            self._db = sqlite3.connect(os.fspath(self.path), timeout=30)
+            self._db_pid = os.getpid()
+            with self._db:
+                self._db.execute('CREATE TABLE IF NOT EXISTS runs ('
+                                 'key TEXT PRIMARY KEY, outputs TEXT, status TEXT)')
+        return self._db
+
+    @staticmethod
+    def _db_key(key: Key) -> str:
+        return json.dumps([key[0], key[1], key[2]])
+
+    def _load(self, key: Key) -> Optional[CachedRun]:
+        db = self._connection()
+        if db is None:
+            return None
+        row = db.execute('SELECT outputs, status FROM runs WHERE key = ?',
+                         (self._db_key(key),)).fetchone()
+        if row is None:
+            return None
+        return CachedRun(tuple(json.loads(row[0])), RunStatus[row[1]])
+
+    def _store(self, key: Key, entry: CachedRun) -> None:
+        db = self._connection()
+        if db is None:
+            return
+        with db:
+            db.execute('INSERT OR REPLACE INTO runs VALUES (?, ?, ?)',
+                       (self._db_key(key), json.dumps(entry.outputs), entry.status.name))
@@ -0,0 +1,275 @@
+import collections.abc
+import functools
+from abc import abstractmethod
+from array import array
+from collections import defaultdict
+from typing import Callable, Iterable, Iterator, List, Mapping, MutableMapping, MutableSet, \
+    Sequence, Tuple
+
+Reader = Callable[[], int]
+
+
+class Memory(collections.abc.MutableMapping):
+    """Intcode memory: every address reads as 0 until it is written
+
+    Negative addresses are invalid in Intcode; every backend raises ``IndexError``
+    for them.
+    """
+
+    @abstractmethod
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        ...
+
+    @abstractmethod
+    def copy(self) -> 'Memory':
+        ...
+
+    def reader(self, address: int) -> Reader:
+        """a callable reading the fixed ``address``; backends may return a faster one"""
+        return functools.partial(self.__getitem__, address)
+
+    def __delitem__(self, address: int) -> None:
+        self[address] = 0
+
+
+class DictMemory(defaultdict):
+    """the original ``defaultdict(int)`` memory; reads allocate the cell they touch"""
+
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        super().__init__(int, enumerate(values))
+
+    def __missing__(self, address: int) -> int:
+        if address < 0:
+            raise IndexError(f'Negative address: {address}')
+        return super().__missing__(address)
+
+    def __setitem__(self, address: int, value: int) -> None:
+        if address < 0:
+            raise IndexError(f'Negative address: {address}')
+        super().__setitem__(address, value)
+
+    def copy(self) -> 'DictMemory':
+        ret = DictMemory()
+        ret.update(self)
+        return ret
+
+    def reader(self, address: int) -> Reader:
+        return functools.partial(self.__getitem__, address)
+
+    def __reduce__(self):
+        return type(self), (), None, None, iter(self.items())
+
+
+Memory.register(DictMemory)
+
+
+class ListMemory(Memory):
+    """a dense list of cells, grown in place on writes past the end
+
+    Every cell up to the highest written address is allocated, so this only suits
+    programs that stay close to their image.
+    """
+
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        self._cells: List[int] = list(values)
+
+    def copy(self) -> 'ListMemory':
+        ret = type(self).__new__(type(self))
+        ret._cells = self._cells[:]
+        return ret
+
+    def reader(self, address: int) -> Reader:
+        if 0 <= address < len(self._cells):
+            # the list is only ever extended in place, so this stays valid
+            return functools.partial(self._cells.__getitem__, address)
+        return super().reader(address)
+
+    def __getitem__(self, address: int) -> int:
+        if address < 0:
+            raise IndexError(f'Negative address: {address}')
+        try:
+            return self._cells[address]
+        except IndexError:
+            return 0
+
+    def __setitem__(self, address: int, value: int) -> None:
+        if address < 0:
+            raise IndexError(f'Negative address: {address}')
+        try:
+            self._cells[address] = value
+        except IndexError:
+            self._grow(address)
+            self._cells[address] = value
+
+    def _grow(self, address: int) -> None:
+        self._cells.extend([0] * (address + 1 - len(self._cells)))
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self._cells)))
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+
+class ArrayMemory(ListMemory):
+    """int64 cells in an ``array('q')``; falls back to a list of Python ints on overflow"""
+
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        values = list(values)
+        try:
+            self._cells = array('q', values)
+        except OverflowError:
+            self._cells = values
+
+    def copy(self) -> 'ArrayMemory':
+        ret = type(self).__new__(type(self))
+        ret._cells = self._cells[:]
+        return ret
+
+    def reader(self, address: int) -> Reader:
+        # the backing store may be swapped for a list, so never bind to it directly
+        return Memory.reader(self, address)
+
+    def __setitem__(self, address: int, value: int) -> None:
+        try:
+            super().__setitem__(address, value)
+        except OverflowError:
+            self._cells = list(self._cells)
+            super().__setitem__(address, value)
+
+    def _grow(self, address: int) -> None:
+        self._cells.extend(array('q', bytes(8 * (address + 1 - len(self._cells)))))
+
+    @property
+    def is_int64(self) -> bool:
+        return isinstance(self._cells, array)
+
+
+class PagedMemory(Memory):
+    """sparse memory allocated in fixed-size pages, for programs touching far-off addresses
+
+    Copies share their pages copy-on-write, so ``copy()`` costs O(pages) rather than
+    O(cells), and each copy then pays only for the pages it writes.  Memory ``over``
+    a read-only base (e.g. a ``ProgramImage``) copies each page from it when first
+    touched, so it costs nothing to create.
+    """
+    page_bits = 10
+
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        self._pages: MutableMapping[int, List[int]] = {}
+        self._owned: MutableSet[int] = set()
+        self._page_size = 1 << self.page_bits
+        self._mask = self._page_size - 1
+        self._end = 0
+        self._base: Sequence[int] = ()
+        self._base_pages = 0
+        for address, value in enumerate(values):
+            self[address] = value
+
+    @classmethod
+    def over(cls, base: Sequence[int], pages: Mapping[int, List[int]] = None,
+             end: int = None) -> 'PagedMemory':
+        """memory reading as ``base`` (never written), except for the given ``pages``"""
+        ret = cls()
+        ret._base = base
+        ret._base_pages = (len(base) + ret._mask) >> cls.page_bits
+        ret._end = len(base) if end is None else end
+        for page_no, page in (pages or {}).items():
+            ret._pages[page_no] = page
+            ret._owned.add(page_no)
+        return ret
+
+    @classmethod
+    def from_memory(cls, memory: Memory) -> 'PagedMemory':
+        """a copy-on-write copy of ``memory``, converting other backends"""
+        if isinstance(memory, PagedMemory):
+            return memory.copy()
+        ret = cls()
+        for address, value in memory.items():
+            ret[address] = value
+        return ret
+
+    def copy(self) -> 'PagedMemory':
+        ret = type(self)()
+        ret._pages = self._pages.copy()
+        ret._end = self._end
+        ret._base, ret._base_pages = self._base, self._base_pages
+        # pages are now shared: whoever writes to one next gets its own copy
+        self._owned = set()
+        return ret
+
+    @property
+    def owned_pages(self) -> int:
+        return len(self._owned)
+
+    @property
+    def end(self) -> int:
+        """one past the highest address written, or of the base"""
+        return self._end
+
+    def dirty_pages(self, base: Sequence[int]) -> Iterator[Tuple[int, List[int]]]:
+        """``(page_no, cells)`` for every page that differs from ``base``"""
+        base_pages = (len(base) + self._mask) >> self.page_bits
+        for page_no in sorted(set(self._pages).union(range(max(self._base_pages, base_pages)))):
+            page = self._pages.get(page_no)
+            if page is None:
+                if base is self._base:
+                    # never touched, so still as in the base
+                    continue
+                page = self._page_of(self._base, page_no)
+            if page != self._page_of(base, page_no):
+                yield page_no, page
+
+    def _page_of(self, base: Sequence[int], page_no: int) -> List[int]:
+        start = page_no << self.page_bits
+        page = list(base[start:start + self._page_size])
+        if len(page) < self._page_size:
+            page.extend([0] * (self._page_size - len(page)))
+        return page
+
+    def __getitem__(self, address: int) -> int:
+        if address < 0:
+            raise IndexError(f'Negative address: {address}')
+        page_no = address >> self.page_bits
+        page = self._pages.get(page_no)
+        if page is None:
+            if page_no >= self._base_pages:
+                return 0
+            # shared with nobody, but left unowned: reading is no reason to copy it
+            page = self._pages[page_no] = self._page_of(self._base, page_no)
+        return page[address & self._mask]
+
+    def __setitem__(self, address: int, value: int) -> None:
+        if address < 0:
+            raise IndexError(f'Negative address: {address}')
+        page_no = address >> self.page_bits
+        if page_no in self._owned:
+            page = self._pages[page_no]
+        else:
+            page = self._pages.get(page_no)
+            if page is not None:
+                page = page[:]
+            elif page_no < self._base_pages:
+                page = self._page_of(self._base, page_no)
+            else:
+                page = [0] * self._page_size
+            self._pages[page_no] = page
+            self._owned.add(page_no)
+        page[address & self._mask] = value
+        if address >= self._end:
+            self._end = address + 1
+
+    def _page_numbers(self) -> List[int]:
+        return sorted(set(self._pages).union(range(self._base_pages)))
+
+    def __iter__(self) -> Iterator[int]:
+        """addresses of allocated pages, up to the highest address written"""
+        for page_no in self._page_numbers():
+            yield from range(page_no << self.page_bits,
+                             min((page_no + 1) << self.page_bits, self._end))
+
+    def __len__(self) -> int:
+        """agrees with ``__iter__``"""
+        return sum(max(0, min((page_no + 1) << self.page_bits, self._end)
+                       - (page_no << self.page_bits))
+                   for page_no in self._page_numbers())
@@ -0,0 +1,381 @@
+"""metrics for fleets of long-running Intcode VMs, in the Prometheus text format"""
+import bisect
+import math
+import os
+import re
+import threading
+import time
+from contextlib import suppress
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Dict, Iterator, Mapping, Optional, Sequence, Tuple, Type, \
+    TypeVar, Union
+
+from .channel import Channel
+from .exceptions import InvalidState
+from .image import ProgramImage
+from .run_status import RunStatus
+
+if TYPE_CHECKING:
+    from .computer import IntcodeComputer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+NAME = re.compile(r'[a-zA-Z_:][a-zA-Z0-9_:]*$')
+LABEL_NAME = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*$')
+DEFAULT_BUCKETS = (1e-5, 1e-4, 1e-3, 0.01, 0.1, 1.0, 10.0)
+"""seconds, from a slice of a few instructions to a long unattended run"""
+
+Labels = Tuple[str, ...]
+Sample = Tuple[str, Labels, Labels, float]
+"""a sample's name suffix, extra label names and values, and value"""
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def escape(value: str) -> str:
+    """a label value, escaped to go between double quotes"""
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+class Metric:
+    """a family of time series sharing a name, one per combination of label values
+
+    Children are created by ``labels``, and updated under the family's lock, which
+    is held only for the update, so VMs running in threads can share a family.
+    """
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        if not NAME.match(name):
+            raise ValueError(f'Invalid metric name: {name!r}')
+        for labelname in labelnames:
+            if not LABEL_NAME.match(labelname) or labelname.startswith('__'):
+                raise ValueError(f'Invalid label name: {labelname!r}')
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: Labels = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Labels, 'Child'] = {}
+
+    def labels(self, **labels: str) -> 'Child':
+        """the time series with these label values, created at 0 if new"""
+        key = self._key(labels)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._child()
+        return child
+
+    def remove(self, **labels: str) -> None:
+        """stop exporting the time series with these label values"""
+        key = self._key(labels)
+        with self._lock:
+            self._children.pop(key, None)
+
+    def _key(self, labels: Mapping[str, str]) -> Labels:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, not {tuple(labels)}')
+        return tuple(str(labels[labelname]) for labelname in self.labelnames)
+
+    def _child(self) -> 'Child':
+        raise NotImplementedError()
+
+    def expose(self) -> Iterator[str]:
+        """the lines of the family in the text format"""
+        documentation = self.documentation.replace('\\', r'\\').replace('\n', r'\n')
+        yield f'# HELP {self.name} {documentation}'
+        yield f'# TYPE {self.name} {self.kind}'
+        with self._lock:
+            samples = [(key, list(child.samples())) for key, child in self._children.items()]
+        for key, child_samples in samples:
+            for suffix, extra_names, extra_values, value in child_samples:
+                pairs = zip(self.labelnames + extra_names, key + extra_values)
+                labels = ','.join(f'{name}="{escape(value)}"' for name, value in pairs)
+                yield f'{self.name}{suffix}{{{labels}}} {format_value(value)}' if labels \
+                    else f'{self.name}{suffix} {format_value(value)}'
+
+
+class Child:
+    __slots__ = ('_lock',)
+
+    def __init__(self, lock: threading.Lock) -> None:
+        self._lock = lock
+
+    def samples(self) -> Iterator[Sample]:
+        raise NotImplementedError()
+
+
+class CounterChild(Child):
+    __slots__ = ('value',)
+
+    def __init__(self, lock: threading.Lock) -> None:
+        super().__init__(lock)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        if amount < 0:
+            raise ValueError(f'Counters only go up, not by {amount}')
+        with self._lock:
+            self.value += amount
+
+    def samples(self) -> Iterator[Sample]:
+        yield '', (), (), self.value
+
+
+class GaugeChild(Child):
+    __slots__ = ('value',)
+
+    def __init__(self, lock: threading.Lock) -> None:
+        super().__init__(lock)
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self) -> Iterator[Sample]:
+        yield '', (), (), self.value
+
+
+class HistogramChild(Child):
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, lock: threading.Lock, buckets: Sequence[float]) -> None:
+        super().__init__(lock)
+        self.buckets = buckets
+        # per bucket, not cumulative, with the last one for values above every bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.sum += value
+
+    def samples(self) -> Iterator[Sample]:
+        total = 0
+        for bound, count in zip((*self.buckets, math.inf), self.counts):
+            total += count
+            yield '_bucket', ('le',), (format_value(bound),), total
+        yield '_sum', (), (), self.sum
+        yield '_count', (), (), total
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _child(self) -> CounterChild:
+        return CounterChild(self._lock)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def _child(self) -> GaugeChild:
+        return GaugeChild(self._lock)
+
+
+class Histogram(Metric):
+    """counts observations into cumulative buckets, by upper bound"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        if 'le' in labelnames:
+            raise ValueError('le is reserved for the bucket bound')
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets if bound != math.inf))
+
+    def _child(self) -> HistogramChild:
+        return HistogramChild(self._lock, self.buckets)
+
+
+M = TypeVar('M', bound=Metric)
+
+
+class MetricsRegistry:
+    """the metrics of a process, exported together
+
+    ``counter``, ``gauge`` and ``histogram`` return the family already registered
+    under a name, so that every VM's ``VMMetrics`` shares one.  ``expose`` renders
+    them all in the Prometheus text format, which ``write`` saves for a textfile
+    collector and ``serve`` answers scrapes with.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()
+                ) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def _register(self, metric_class: Type[M], name: str, documentation: str,
+                  labelnames: Sequence[str], **kwargs) -> M:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, documentation, labelnames,
+                                                            **kwargs)
+            elif type(metric) is not metric_class or metric.labelnames != tuple(labelnames):
+                raise ValueError(f'{name} is already registered as a {metric.kind} '
+                                 f'with labels {metric.labelnames}')
+        return metric
+
+    def expose(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return ''.join(f'{line}\n' for metric in metrics for line in metric.expose())
+
+    def write(self, path: Union[str, os.PathLike]) -> None:
+        """save the metrics to ``path``, e.g. for node_exporter's textfile collector"""
+        # written aside and renamed, so that scrapes never see a partial file
+        partial = f'{os.fspath(path)}.{os.getpid()}.tmp'
+        with open(partial, 'w') as fp:
+            fp.write(self.expose())
+        os.replace(partial, path)
+
+    def handler(self) -> Type[BaseHTTPRequestHandler]:
+        """a request handler class answering every GET with the metrics"""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = registry.expose().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+        return MetricsHandler
+
+    def serve(self, port: int = 0, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """serve the metrics from a daemon thread; ``shutdown()`` the server to stop
+
+        Port 0 picks a free port, which is then in ``server_address``.
+        """
+        server = ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        return server
+
+
+class VMMetrics:
+    """records a VM's metrics in a registry once per ``run_until``, never per instruction
+
+    Set it as ``IntcodeComputer.metrics``.  Every series is labelled with ``vm`` and
+    with ``program``, the start of the program image's digest:
+
+    - ``intcode_steps_total``: dispatches run, as ``max_steps`` counts them, so its
+      ``rate()`` is instructions per second (blocks per second when compiled)
+    - ``intcode_run_duration_seconds``: a histogram of the time ``run_until`` runs
+    - ``intcode_blocked_seconds_total``: time from stopping for input to resuming
+    - ``intcode_stops_total``: ``run_until`` returns, by ``status``
+    - ``intcode_stdin_depth``, ``intcode_stdout_depth``: values queued when it stopped
+    - ``intcode_memory_cells``: cells held by its memory when it stopped
+
+    ``remove`` drops the VM's series, e.g. once it has been discarded.
+    """
+
+    def __init__(self, registry: MetricsRegistry, vm: str,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.registry = registry
+        self.vm = vm
+        labelnames = ('vm', 'program')
+        self._steps = registry.counter(
+            'intcode_steps_total', 'Dispatches run by the VM', labelnames)
+        self._duration = registry.histogram(
+            'intcode_run_duration_seconds', 'Time spent in each run_until call', labelnames,
+            buckets)
+        self._blocked = registry.counter(
+            'intcode_blocked_seconds_total', 'Time the VM spent waiting for input', labelnames)
+        self._stops = registry.counter(
+            'intcode_stops_total', 'run_until calls, by the status returned',
+            labelnames + ('status',))
+        self._stdin_depth = registry.gauge(
+            'intcode_stdin_depth', 'Values queued on stdin', labelnames)
+        self._stdout_depth = registry.gauge(
+            'intcode_stdout_depth', 'Values queued on stdout', labelnames)
+        self._memory_cells = registry.gauge(
+            'intcode_memory_cells', 'Cells held by the VM memory', labelnames)
+        self._image: Optional[ProgramImage] = None
+        self._program = ''
+        self._series: Dict[Metric, Child] = {}
+        self._stop_series: Dict[RunStatus, CounterChild] = {}
+        self._resumed_at = 0.0
+        self._steps_at = 0
+        self._blocked_at: Optional[float] = None
+
+    def resumed(self, computer: 'IntcodeComputer') -> None:
+        now = time.perf_counter()
+        if computer.image is not self._image:
+            self._bind(computer.image)
+        if self._blocked_at is not None:
+            self._series[self._blocked].inc(now - self._blocked_at)
+            self._blocked_at = None
+        self._resumed_at = now
+        self._steps_at = computer.steps
+
+    def stopped(self, computer: 'IntcodeComputer', status: RunStatus) -> None:
+        now = time.perf_counter()
+        series = self._series
+        series[self._steps].inc(computer.steps - self._steps_at)
+        series[self._duration].observe(now - self._resumed_at)
+        stops = self._stop_series.get(status)
+        if stops is None:
+            stops = self._stop_series[status] = self._stops.labels(
+                vm=self.vm, program=self._program, status=status.name.lower())
+        stops.inc()
+        series[self._stdin_depth].set(depth(computer.stdin_channel))
+        series[self._stdout_depth].set(depth(computer.stdout_channel))
+        series[self._memory_cells].set(len(computer.memory))
+        if status is RunStatus.NEEDS_INPUT:
+            self._blocked_at = now
+
+    def _bind(self, image: ProgramImage) -> None:
+        """look up the series for the VM running ``image``, once rather than per update"""
+        if self._image is not None:
+            self.remove()
+        self._image, self._program = image, image.digest[:12]
+        self._series = {metric: metric.labels(vm=self.vm, program=self._program)
+                        for metric in self._metrics()}
+        self._stop_series = {}
+
+    def remove(self) -> None:
+        """stop exporting the VM's series"""
+        for metric in self._metrics():
+            metric.remove(vm=self.vm, program=self._program)
+        for status in self._stop_series:
+            self._stops.remove(vm=self.vm, program=self._program, status=status.name.lower())
+        self._stop_series = {}
+
+    def _metrics(self) -> Tuple[Metric, ...]:
+        """the families with a single series per VM"""
+        return (self._steps, self._duration, self._blocked, self._stdin_depth,
+                self._stdout_depth, self._memory_cells)
+
+
+def depth(channel: Channel) -> int:
+    """the number of values queued on a channel, or 0 if it cannot tell without pulling"""
+    with suppress(InvalidState):
+        return len(channel.values())
+    return 0
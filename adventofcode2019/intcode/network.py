@@ -0,0 +1,361 @@
+"""networks of VMs declared as a graph, run in one process or partitioned across several
+
+Nodes are VMs, each running a program from some initial stdin, and an edge carries
+every output of its source to its destination's stdin.  ``run()`` runs the whole
+graph on a ``Scheduler`` in the calling process.  ``run(workers=n)`` splits the nodes,
+in the order they were added, into ``n`` contiguous blocks (so a ring or a chain is
+cut in as few places as possible) and runs each block on a ``Scheduler`` of its own
+in a worker process.  Edges between blocks go through ``ShmRing``s, single-producer
+single-consumer ring buffers of int64 in one ``multiprocessing.shared_memory``
+segment, so values crossing processes must fit in int64.
+
+A worker with nothing to run sleeps until a producer wakes it, or for at most
+``poll_interval``; a producer finding a ring full keeps draining its own inbound
+rings while it waits, so that full rings in a cycle cannot deadlock.  The network
+has finished once every worker is idle and every value sent has been received, as
+seen twice in a row.
+"""
+import gc
+import logging
+import multiprocessing
+import queue
+import traceback
+from multiprocessing import shared_memory
+from typing import Any, Callable, Hashable, Iterable, List, Mapping, MutableMapping, \
+    Optional, Sequence, Tuple, Type, Union
+
+import attr
+import numpy
+
+from .computer import IntcodeComputer, IntcodeComputerV11
+from .exceptions import IntcodeException
+from .image import ProgramImage
+from .run_status import RunStatus
+from .scheduler import Scheduler
+
+LOG = logging.getLogger(__name__)
+
+Name = Hashable
+CELL = numpy.dtype(numpy.int64)
+# columns of the per-worker state shared with the parent
+IDLE, EPOCH, SENT, RECEIVED = range(4)
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class NodeResult:
+    status: RunStatus
+    """``HALTED``, or ``NEEDS_INPUT`` if the node was left waiting"""
+    outputs: Tuple[int, ...]
+    """outputs not carried by any edge, i.e. all outputs of a node without edges"""
+    last_output: Optional[int]
+
+
+@attr.s(auto_attribs=True, slots=True)
+class _Node:
+    name: Name
+    image: ProgramImage
+    stdin: List[int]
+
+
+class ShmRing:
+    """a single-producer, single-consumer FIFO of int64 in a shared array
+
+    The first two cells count the values ever read (``head``) and written
+    (``tail``); the rest hold up to ``capacity`` values.  Each side only writes its
+    own counter, after the values it covers, so neither takes a lock.  This relies
+    on aligned 8-byte stores becoming visible in order, as on x86-64.
+    """
+    header = 2
+
+    def __init__(self, cells: numpy.ndarray) -> None:
+        self._counters = cells[:self.header]
+        self._values = cells[self.header:]
+        self.capacity = len(self._values)
+
+    @classmethod
+    def cells(cls, capacity: int) -> int:
+        """the array length a ring of ``capacity`` values needs"""
+        return cls.header + capacity
+
+    def put(self, value: int) -> bool:
+        """append ``value``, unless the ring is full"""
+        head, tail = self._counters
+        if tail - head >= self.capacity:
+            return False
+        self._values[tail % self.capacity] = value
+        self._counters[1] = tail + 1
+        return True
+
+    def drain(self) -> List[int]:
+        """remove and return every value in the ring"""
+        head, tail = self._counters.tolist()
+        if head == tail:
+            return []
+        values = self._values[numpy.arange(head, tail) % self.capacity].tolist()
+        self._counters[0] = tail
+        return values
+
+    def empty(self) -> bool:
+        return self._counters[0] == self._counters[1]
+
+
+@attr.s(auto_attribs=True, slots=True)
+class _Plan:
+    """what one worker runs: its nodes, and the edges that touch them"""
+    nodes: List[_Node]
+    edges: List[Tuple[Name, Name]]
+    outbound: List[Tuple[Name, int, int]]
+    """(source, ring, destination worker) for each edge leaving the block"""
+    inbound: List[Tuple[int, Name]]
+    """(ring, destination) for each edge entering the block"""
+
+
+class Network:
+    """a graph of VMs: nodes running programs, and edges carrying outputs to inputs
+
+    ``ring_capacity`` is the number of values each cross-process edge buffers, and
+    ``time_slice`` is passed on to each ``Scheduler``.
+    """
+    poll_interval = 0.01
+    """the longest an idle worker sleeps before checking its inputs anyway"""
+
+    def __init__(self, computer_class: Type[IntcodeComputer] = IntcodeComputerV11,
+                 time_slice: Optional[int] = 10000, ring_capacity: int = 4096) -> None:
+        self.computer_class = computer_class
+        self.time_slice = time_slice
+        self.ring_capacity = ring_capacity
+        self._nodes: MutableMapping[Name, _Node] = {}
+        self._edges: List[Tuple[Name, Name]] = []
+
+    def add(self, name: Name, program: Union[ProgramImage, str, Iterable[Union[int, str]]],
+            stdin: Iterable[int] = ()) -> Name:
+        """a node running ``program``; pass the same image to many nodes to parse it once"""
+        if name in self._nodes:
+            raise ValueError(f'Duplicate node: {name!r}')
+        self._nodes[name] = _Node(name, ProgramImage.of(program), list(stdin))
+        return name
+
+    def connect(self, source: Name, destination: Name) -> None:
+        """send every output of ``source`` to ``destination``'s stdin"""
+        for name in (source, destination):
+            if name not in self._nodes:
+                raise KeyError(f'Unknown node: {name!r}')
+        self._edges.append((source, destination))
+
+    def send(self, name: Name, value: int) -> None:
+        """queue input for ``name`` from outside the network, before it runs"""
+        self._nodes[name].stdin.append(value)
+
+    @classmethod
+    def ring(cls, program: Union[ProgramImage, str, Iterable[Union[int, str]]],
+             stdins: Sequence[Iterable[int]], **kwargs: Any) -> 'Network':
+        """nodes ``0`` to ``len(stdins) - 1`` running ``program``, each feeding the next
+        and the last feeding the first, as day7's amplifiers in feedback mode"""
+        network = cls(**kwargs)
+        image = ProgramImage.of(program)
+        for idx, stdin in enumerate(stdins):
+            network.add(idx, image, stdin)
+        for idx in range(len(stdins)):
+            network.connect(idx, (idx + 1) % len(stdins))
+        return network
+
+    def run(self, workers: int = 0) -> Mapping[Name, NodeResult]:
+        """run until every node has halted or waits for input no other node will send
+
+        With no ``workers``, the network runs in the calling process.
+        """
+        if not workers:
+            return self._run_local()
+        return self._run_workers(min(workers, len(self._nodes)) or 1)
+
+    def _run_local(self) -> Mapping[Name, NodeResult]:
+        scheduler, vms = self._build(list(self._nodes.values()), self._edges)
+        scheduler.run()
+        return _results(scheduler, vms)
+
+    def _build(self, nodes: List[_Node], edges: List[Tuple[Name, Name]]
+               ) -> Tuple[Scheduler, MutableMapping[Name, IntcodeComputer]]:
+        scheduler = Scheduler(self.time_slice)
+        vms = {node.name: scheduler.add(self.computer_class(node.image, stdin=node.stdin))
+               for node in nodes}
+        for source, destination in edges:
+            scheduler.connect(vms[source], vms[destination])
+        return scheduler, vms
+
+    def _plans(self, workers: int) -> List[_Plan]:
+        names = list(self._nodes)
+        block_size = -(-len(names) // workers)
+        worker_of = {name: idx // block_size for idx, name in enumerate(names)}
+        plans = [_Plan([], [], [], []) for _ in range(workers)]
+        for name, node in self._nodes.items():
+            plans[worker_of[name]].nodes.append(node)
+        rings = 0
+        for source, destination in self._edges:
+            source_worker, destination_worker = worker_of[source], worker_of[destination]
+            if source_worker == destination_worker:
+                plans[source_worker].edges.append((source, destination))
+            else:
+                plans[source_worker].outbound.append((source, rings, destination_worker))
+                plans[destination_worker].inbound.append((rings, destination))
+                rings += 1
+        return plans
+
+    def _run_workers(self, workers: int) -> Mapping[Name, NodeResult]:
+        plans = self._plans(workers)
+        rings = sum(len(plan.outbound) for plan in plans)
+        cells = 4 * workers + rings * ShmRing.cells(self.ring_capacity)
+        shm = shared_memory.SharedMemory(create=True, size=max(cells, 1) * CELL.itemsize)
+        context = multiprocessing.get_context()
+        wakes = [context.Event() for _ in range(workers)]
+        changed, stop = context.Event(), context.Event()
+        results = context.Queue()
+        processes = [context.Process(target=_run_worker, daemon=True,
+                                     args=(self, idx, plans[idx], shm.name, rings, wakes,
+                                           changed, stop, results))
+                     for idx in range(workers)]
+        outcome: MutableMapping[int, Mapping[Name, NodeResult]] = {}
+        state = numpy.ndarray((workers, 4), dtype=CELL, buffer=shm.buf)
+        try:
+            state[:] = 0
+            for process in processes:
+                process.start()
+            LOG.debug('Running %s nodes on %s workers over %s rings',
+                      len(self._nodes), workers, rings)
+            self._wait_until_finished(state, changed, processes, results, outcome)
+            stop.set()
+            for wake in wakes:
+                wake.set()
+            while len(outcome) < workers:
+                _collect(results.get(timeout=60), outcome)
+            for process in processes:
+                process.join()
+        finally:
+            del state
+            stop.set()
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            shm.close()
+            shm.unlink()
+        return {name: result for idx in range(workers) for name, result in outcome[idx].items()}
+
+    def _wait_until_finished(self, state: numpy.ndarray, changed: Any,
+                             processes: List[multiprocessing.Process], results: Any,
+                             outcome: MutableMapping[int, Mapping[Name, NodeResult]]) -> None:
+        previous = None
+        while True:
+            changed.wait(self.poll_interval)
+            changed.clear()
+            try:
+                _collect(results.get_nowait(), outcome)
+            except queue.Empty:
+                pass
+            for idx, process in enumerate(processes):
+                if process.exitcode is not None and idx not in outcome:
+                    raise IntcodeException(f'Worker {idx} died with exit code {process.exitcode}')
+            current = state.copy()
+            finished = bool(current[:, IDLE].all()) \
+                and current[:, SENT].sum() == current[:, RECEIVED].sum()
+            if finished and previous is not None and (current == previous).all():
+                return
+            previous = current if finished else None
+
+
+def _results(scheduler: Scheduler, vms: Mapping[Name, IntcodeComputer]
+             ) -> MutableMapping[Name, NodeResult]:
+    ret = {}
+    for name, vm in vms.items():
+        outputs = tuple(vm.stdout)
+        last_output = outputs[-1] if outputs else scheduler.last_output.get(vm)
+        status = RunStatus.HALTED if vm.is_terminated else RunStatus.NEEDS_INPUT
+        ret[name] = NodeResult(status, outputs, last_output)
+    return ret
+
+
+def _collect(message: Tuple[int, Union[str, Mapping[Name, NodeResult]]],
+             outcome: MutableMapping[int, Mapping[Name, NodeResult]]) -> None:
+    idx, result = message
+    if isinstance(result, str):
+        raise IntcodeException(f'Worker {idx} failed:\n{result}')
+    outcome[idx] = result
+
+
+class _Worker:
+    def __init__(self, network: Network, idx: int, plan: _Plan, buffer: memoryview, rings: int,
+                 wakes: List[Any], changed: Any, stop: Any) -> None:
+        workers = len(wakes)
+        self.state = numpy.ndarray((workers, 4), dtype=CELL, buffer=buffer)
+        ring_cells = ShmRing.cells(network.ring_capacity)
+        cells = numpy.ndarray((rings, ring_cells), dtype=CELL, buffer=buffer,
+                              offset=4 * workers * CELL.itemsize)
+        self.row = self.state[idx]
+        self.poll_interval = network.poll_interval
+        self.wake, self.changed, self.stop = wakes[idx], changed, stop
+        self.scheduler, self.vms = network._build(plan.nodes, plan.edges)
+        self.inbound = [(ShmRing(cells[ring]), self.vms[name]) for ring, name in plan.inbound]
+        for source, ring, destination in plan.outbound:
+            self.scheduler.forward(self.vms[source],
+                                   self._sink(ShmRing(cells[ring]), destination, wakes))
+
+    def _sink(self, ring: ShmRing, destination: int, wakes: List[Any]) -> Callable[[int], None]:
+        row, idle, wake = self.row, self.state[destination], wakes[destination]
+
+        def sink(value: int) -> None:
+            while not ring.put(value):
+                # the consumer may itself be waiting on a full ring of ours
+                wake.set()
+                self.receive()
+                self.wake.wait(self.poll_interval)
+                self.wake.clear()
+            row[SENT] += 1
+            if idle[IDLE]:
+                wake.set()
+        return sink
+
+    def receive(self) -> bool:
+        """deliver whatever the inbound rings hold"""
+        received = 0
+        for ring, vm in self.inbound:
+            for value in ring.drain():
+                self.scheduler.send(vm, value)
+                received += 1
+        self.row[RECEIVED] += received
+        return bool(received)
+
+    def run(self) -> None:
+        row = self.row
+        while True:
+            self.receive()
+            self.scheduler.run()
+            row[IDLE] = 1
+            if not all(ring.empty() for ring, _ in self.inbound):
+                row[EPOCH] += 1
+                row[IDLE] = 0
+                continue
+            self.changed.set()
+            self.wake.wait(self.poll_interval)
+            self.wake.clear()
+            if self.stop.is_set():
+                return
+            row[EPOCH] += 1
+            row[IDLE] = 0
+
+    def results(self) -> Mapping[Name, NodeResult]:
+        return _results(self.scheduler, self.vms)
+
+
+def _run_worker(network: Network, idx: int, plan: _Plan, shm_name: str, rings: int,
+                wakes: List[Any], changed: Any, stop: Any, results: Any) -> None:
+    shm = shared_memory.SharedMemory(shm_name)
+    try:
+        worker = _Worker(network, idx, plan, shm.buf, rings, wakes, changed, stop)
+        worker.run()
+        results.put((idx, worker.results()))
+    except BaseException:
+        results.put((idx, traceback.format_exc()))
+    finally:
+        # the arrays over the buffer must go before it can be closed, and the sinks
+        # hold the worker in a reference cycle
+        worker = None
+        gc.collect()
+        shm.close()
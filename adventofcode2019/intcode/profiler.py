@@ -0,0 +1,162 @@
+import json
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Any, List, Mapping, Optional
+
+import attr
+
+from .instruction import Handler
+from .opcode import Opcode
+from .run_status import RunStatus
+
+if TYPE_CHECKING:
+    from .computer import IntcodeComputer
+
+
+@attr.s(auto_attribs=True, slots=True)
+class Site:
+    """one decoded handler: an instruction word at an address"""
+    address: int
+    opcode: str
+    modes: str
+    instruction_class: str
+    count: int = 0
+    samples: int = 0
+    time_ns: int = 0
+    superinstruction: Optional[str] = None
+    """the idiom, if the handler is a superinstruction starting with this instruction"""
+    length: int = 1
+    """instructions run per dispatch (outside compiled mode)"""
+
+
+class Profiler:
+    """counts dispatches per opcode, parameter modes and address; samples wall time
+
+    Set it as ``IntcodeComputer.profiler`` to have every handler the VM decodes
+    wrapped in a counting one; without a profiler the run loop is untouched.  One
+    dispatch in ``sample_interval`` (a power of two) is timed, and every input and
+    output is, together with the time the VM spends suspended waiting for input.  In
+    compiled mode a dispatch runs a whole block, which is counted against its first
+    instruction, and so does a superinstruction, which is also counted per idiom.
+    """
+    sample_interval = 16
+
+    def __init__(self) -> None:
+        self.sites: List[Site] = []
+        self.io_wait_ns = 0
+        self._suspended_at: Optional[int] = None
+
+    def wrap(self, computer: 'IntcodeComputer', address: int, handler: Handler) -> Handler:
+        word = computer.memory[address]
+        opcode = Opcode(word % 100)
+        instr = computer.instructions[opcode]
+        # one digit per parameter, in parameter order
+        modes = ''.join(str(word // 10 ** (idx + 1) % 10)
+                        for idx in range(1, instr.parameter_count + 1))
+        site = Site(address, opcode.name, modes, type(instr).__name__)
+        fuser = getattr(computer, 'fuser', None)
+        superinstruction = None if fuser is None else fuser.superinstructions.get(address)
+        if superinstruction is not None:
+            site.superinstruction = superinstruction.idiom
+            site.length = superinstruction.length
+        self.sites.append(site)
+        perf_counter_ns = time.perf_counter_ns
+
+        if opcode in (Opcode.SAVE, Opcode.OUTPUT):
+            def timed_handler() -> int:
+                site.count += 1
+                site.samples += 1
+                start = perf_counter_ns()
+                try:
+                    return handler()
+                finally:
+                    elapsed = perf_counter_ns() - start
+                    site.time_ns += elapsed
+                    self.io_wait_ns += elapsed
+            return timed_handler
+
+        mask = self.sample_interval - 1
+
+        def profiled_handler() -> int:
+            site.count += 1
+            if site.count & mask:
+                return handler()
+            site.samples += 1
+            start = perf_counter_ns()
+            try:
+                return handler()
+            finally:
+                site.time_ns += perf_counter_ns() - start
+        return profiled_handler
+
+    def resumed(self) -> None:
+        if self._suspended_at is not None:
+            self.io_wait_ns += time.perf_counter_ns() - self._suspended_at
+            self._suspended_at = None
+
+    def stopped(self, status: RunStatus) -> None:
+        if status is RunStatus.NEEDS_INPUT:
+            self._suspended_at = time.perf_counter_ns()
+
+    def as_dict(self) -> Mapping[str, Any]:
+        opcodes, modes, addresses = Counter(), Counter(), Counter()
+        class_counts, class_samples, class_time = Counter(), Counter(), Counter()
+        fused_counts, fused_instructions = Counter(), Counter()
+        for site in self.sites:
+            if site.superinstruction is not None:
+                fused_counts[site.superinstruction] += site.count
+                fused_instructions[site.superinstruction] += site.count * site.length
+            opcodes[site.opcode] += site.count
+            modes[f'{site.opcode}/{site.modes}'] += site.count
+            addresses[site.address] += site.count
+            class_counts[site.instruction_class] += site.count
+            class_samples[site.instruction_class] += site.samples
+            class_time[site.instruction_class] += site.time_ns
+        mean_ns = {name: class_time[name] / class_samples[name]
+                   for name in class_samples if class_samples[name]}
+        return {
+            'dispatches': sum(opcodes.values()),
+            'opcodes': dict(opcodes.most_common()),
+            'modes': dict(modes.most_common()),
+            'addresses': {str(address): count for address, count in addresses.most_common()},
+            'instruction_classes': {
+                name: {
+                    'count': count,
+                    'mean_ns': mean_ns.get(name),
+                } for name, count in class_counts.most_common()
+            },
+            'superinstructions': {
+                idiom: {
+                    'count': count,
+                    'instructions': fused_instructions[idiom],
+                } for idiom, count in fused_counts.most_common()
+            },
+            'io_wait_ns': self.io_wait_ns,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict(), indent=2)
+
+    def report(self, top: int = 10) -> str:
+        """a text table of the counts, the sampled timings and the ``top`` hot addresses"""
+        data = self.as_dict()
+        lines = [f'{"instruction class":<32}{"count":>12}{"mean ns":>10}']
+        for name, entry in data['instruction_classes'].items():
+            mean = '' if entry['mean_ns'] is None else f'{entry["mean_ns"]:.0f}'
+            lines.append(f'{name:<32}{entry["count"]:>12}{mean:>10}')
+        lines.append('')
+        lines.append(f'{"opcode/modes":<32}{"count":>12}')
+        lines.extend(f'{key:<32}{count:>12}' for key, count in data['modes'].items())
+        if data['superinstructions']:
+            lines.append('')
+            lines.append(f'{"superinstruction":<32}{"count":>12}{"instructions":>14}')
+            lines.extend(f'{idiom:<32}{entry["count"]:>12}{entry["instructions"]:>14}'
+                         for idiom, entry in data['superinstructions'].items())
+        lines.append('')
+        lines.append(f'{"address":<32}{"count":>12}')
+        lines.extend(f'{address:<32}{count:>12}'
+                     for address, count in list(data['addresses'].items())[:top])
+        lines.append('')
+        lines.append(f'dispatches: {data["dispatches"]}, '
+                     f'I/O wait: {data["io_wait_ns"] / 1e6:.3f}ms')
+        return '\n'.join(lines)
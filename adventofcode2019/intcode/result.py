@@ -0,0 +1,119 @@
+"""what a finished run leaves behind: its memory, status, step count and outputs"""
+import collections.abc
+import itertools
+from typing import IO, Iterator, List, Optional, Tuple
+
+import attr
+import numpy
+
+from .memory import ArrayMemory, ListMemory, Memory, PagedMemory
+from .run_status import RunStatus
+
+
+def serialize(memory: Memory, chunk_size: int = 4096) -> Iterator[str]:
+    """the text of ``memory`` in pieces of up to ``chunk_size`` values
+
+    Values are comma-separated, in the backend's order; one at an address not
+    following the previous one is prefixed with that address, e.g. ``...0xa::2``.
+    """
+    last_address = 0
+    items = iter(memory.items())
+    separator = ''
+    while True:
+        pieces: List[str] = []
+        for address, value in itertools.islice(items, chunk_size):
+            if address > last_address + 1:
+                pieces.append(f'...{hex(address)}::{value}')
+            else:
+                pieces.append(str(value))
+            last_address = address
+        if not pieces:
+            return
+        yield separator + ','.join(pieces)
+        separator = ','
+
+
+class MemoryView(collections.abc.Sequence):
+    """a read-only view of a VM's memory, from address 0 up to the highest one in use
+
+    Reading a cell reads the backend directly and never allocates it.  ``len()`` is
+    O(1) for ``ListMemory`` and ``PagedMemory`` but O(cells) for ``DictMemory``,
+    which has to find its highest address; reading a cell it holds skips that, so
+    only negative indices and cells it does not hold pay for it.  The view follows
+    its memory, growing with it, so it should only be read while the VM is not
+    running.  ``numpy()`` shares the buffer of an int64 ``ArrayMemory`` with no
+    copy, and copies every other backend, including the default ``DictMemory``.
+    """
+    __slots__ = ('_memory',)
+
+    def __init__(self, memory: Memory) -> None:
+        self._memory = memory
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[address] for address in range(*idx.indices(len(self)))]
+        memory = self._memory
+        if idx < 0:
+            idx += len(self)
+            in_range = idx >= 0
+        elif isinstance(memory, (ListMemory, PagedMemory)):
+            in_range = idx < len(self)
+        else:
+            # a cell held is below the highest address, which is costly to find
+            in_range = idx in memory or idx < len(self)
+        if not in_range:
+            raise IndexError(f'Address out of range: {idx}')
+        # unlike indexing, get() leaves a DictMemory without the cells it did not hold
+        return memory.get(idx, 0)
+
+    def __len__(self) -> int:
+        memory = self._memory
+        if isinstance(memory, PagedMemory):
+            return memory.end
+        if isinstance(memory, ListMemory):
+            return len(memory)
+        return max(memory, default=-1) + 1
+
+    def __iter__(self) -> Iterator[int]:
+        get = self._memory.get
+        return (get(address, 0) for address in range(len(self)))
+
+    def numpy(self) -> numpy.ndarray:
+        """the cells as a read-only int64 array: the backend's own buffer where it has one
+
+        While an array shares an ``ArrayMemory``'s buffer, that memory cannot grow.
+        """
+        memory = self._memory
+        if isinstance(memory, ArrayMemory) and memory.is_int64:
+            cells = numpy.frombuffer(memory._cells, dtype=numpy.int64)
+        else:
+            cells = numpy.fromiter(self, dtype=numpy.int64, count=len(self))
+        cells.flags.writeable = False
+        return cells
+
+    def chunks(self, chunk_size: int = 4096) -> Iterator[str]:
+        """the text of memory, rendered lazily (see ``serialize``)"""
+        return serialize(self._memory, chunk_size)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(<{len(self)} cells of {type(self._memory).__name__}>)'
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class RunResult:
+    """the outcome of a run; ``str()`` renders memory as ``IntcodeComputer`` always did"""
+    memory: MemoryView
+    status: Optional[RunStatus]
+    """what stopped the last ``run_until``, or None if the VM was only ticked"""
+    steps: int
+    """dispatches run, as ``max_steps`` counts them"""
+    outputs: Tuple[int, ...]
+    """everything left in stdout"""
+
+    def write(self, file: IO[str]) -> None:
+        """stream the text of memory to ``file``, never holding all of it"""
+        for chunk in self.memory.chunks():
+            file.write(chunk)
+
+    def __str__(self) -> str:
+        return ''.join(self.memory.chunks())
@@ -0,0 +1,13 @@
+from enum import Enum
+
+
+class RunStatus(Enum):
+    """why ``IntcodeComputer.run_until`` returned"""
+    HALTED = 'halted'
+    NEEDS_INPUT = 'needs input'
+    OUTPUT_READY = 'output ready'
+    BUDGET_EXHAUSTED = 'budget exhausted'
+    LOOPING = 'looping'
+    """a watchdog found the VM in a state it has been in before"""
+    LIMIT_EXCEEDED = 'limit exceeded'
+    """the VM ran past a watchdog's step or wall-clock limit"""
@@ -0,0 +1,83 @@
+"""run networks of VMs cooperatively in the calling thread"""
+import logging
+from collections import defaultdict, deque
+from typing import Callable, Deque, List, MutableMapping, MutableSet, Optional, TypeVar
+
+from .computer import IntcodeComputer
+from .run_status import RunStatus
+
+LOG = logging.getLogger(__name__)
+
+C = TypeVar('C', bound=IntcodeComputer)
+
+
+class Scheduler:
+    """runs VMs round-robin in one thread, routing outputs along declared edges
+
+    A VM runs until it needs input that is not queued, halts, or uses up its
+    ``time_slice`` of dispatches (see ``IntcodeComputer.run``), so one busy VM cannot
+    starve the rest.  Its outputs are then delivered to every VM it is connected to,
+    waking those that were waiting, and passed to its sinks; outputs of a VM with neither
+    stay in its stdout.
+    VMs are switched to non-blocking input when added.
+    """
+
+    def __init__(self, time_slice: Optional[int] = 10000) -> None:
+        self.time_slice = time_slice
+        self.last_output: MutableMapping[IntcodeComputer, int] = {}
+        """the last value routed out of each connected VM"""
+        self._edges: MutableMapping[IntcodeComputer, List[IntcodeComputer]] = defaultdict(list)
+        self._sinks: MutableMapping[IntcodeComputer, List[Callable[[int], None]]] = \
+            defaultdict(list)
+        self._ready: Deque[IntcodeComputer] = deque()
+        self._waiting: MutableSet[IntcodeComputer] = set()
+
+    def add(self, vm: C) -> C:
+        vm.blocking = False
+        self._ready.append(vm)
+        return vm
+
+    def connect(self, source: IntcodeComputer, destination: IntcodeComputer) -> None:
+        """send every output of ``source`` to ``destination``'s stdin"""
+        self._edges[source].append(destination)
+
+    def forward(self, source: IntcodeComputer, sink: Callable[[int], None]) -> None:
+        """pass every output of ``source`` to ``sink``, e.g. to leave the network"""
+        self._sinks[source].append(sink)
+
+    def send(self, vm: IntcodeComputer, value: int) -> None:
+        """queue input from outside the network, waking ``vm`` if it was waiting"""
+        vm.put_stdin(value)
+        if vm in self._waiting:
+            self._waiting.discard(vm)
+            self._ready.append(vm)
+
+    @property
+    def waiting(self) -> MutableSet[IntcodeComputer]:
+        """VMs blocked on input; once ``run`` returns, input only ``send`` can provide"""
+        return self._waiting
+
+    def run(self) -> None:
+        """run until every VM has halted or waits for input no other VM will send"""
+        ready = self._ready
+        while ready:
+            vm = ready.popleft()
+            status = vm.run_until(RunStatus.NEEDS_INPUT, self.time_slice)
+            if status is RunStatus.NEEDS_INPUT:
+                self._waiting.add(vm)
+            elif status is RunStatus.BUDGET_EXHAUSTED:
+                ready.append(vm)
+            self._route(vm)
+        if self._waiting:
+            LOG.debug('%s VMs left waiting for input', len(self._waiting))
+
+    def _route(self, vm: IntcodeComputer) -> None:
+        destinations, sinks = self._edges.get(vm, ()), self._sinks.get(vm, ())
+        if not destinations and not sinks:
+            return
+        for value in vm.stdout:
+            self.last_output[vm] = value
+            for destination in destinations:
+                self.send(destination, value)
+            for sink in sinks:
+                sink(value)
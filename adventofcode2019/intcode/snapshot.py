@@ -0,0 +1,58 @@
+from typing import TYPE_CHECKING, Any, Mapping, Tuple, Type
+
+import attr
+
+from .image import ProgramImage
+from .memory import Memory
+
+if TYPE_CHECKING:
+    from .computer import IntcodeComputer
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class Snapshot:
+    """the full state of a VM at one point of its run; ``restore`` it as often as needed
+
+    The snapshot holds its own copy of memory, in the VM's backend, which is never
+    written.  Restoring copies it again: for ``PagedMemory`` that costs O(pages),
+    copy-on-write, and each restored VM copies only the pages it writes.
+    """
+    computer_class: Type['IntcodeComputer']
+    options: Mapping[str, Any]
+    memory: Memory
+    iptr: int
+    rbptr: int
+    stdin: Tuple[int, ...]
+    stdout: Tuple[int, ...]
+    started: bool
+    alive: bool
+    image: ProgramImage = ProgramImage(())
+    """the program the VM was built from, which ``memory`` is compared against when saved"""
+    steps: int = 0
+    settings: Mapping[str, Any] = attr.Factory(dict)
+    """per-VM attributes that are not constructor arguments, see ``settings()``"""
+
+    def restore(self) -> 'IntcodeComputer':
+        vm = self.computer_class((), **self.options)
+        vm.image = self.image
+        memory = self.memory.copy()
+        memory_class = self.options.get('memory_class', type(memory))
+        if type(memory) is not memory_class:
+            # e.g. loaded from a checkpoint, which keeps memory as pages
+            converted = memory_class()
+            for address, value in memory.items():
+                converted[address] = value
+            memory = converted
+        vm.memory = memory
+        vm.iptr = self.iptr
+        vm.rbptr = self.rbptr
+        for value in self.stdin:
+            vm.put_stdin(value)
+        for value in self.stdout:
+            vm.put_stdout(value)
+        vm._started = self.started
+        vm._alive = self.alive
+        vm.steps = self.steps
+        for name, value in self.settings.items():
+            setattr(vm, name, value)
+        return vm
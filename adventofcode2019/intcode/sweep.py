@@ -0,0 +1,154 @@
+"""parameter sweeps over one Intcode program, sharded across a process pool
+
+The parsed program is shipped to each worker once, through the pool initializer;
+tasks only carry chunks of candidates.  ``evaluate(program, candidate)`` runs one
+candidate inside a worker, and the predicate or objective is applied there too, so
+only matches or per-chunk bests travel back.  All callables must be picklable, i.e.
+defined at module level.
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing.synchronize import Event
+from typing import Any, Callable, Iterable, Iterator, List, Mapping, MutableSet, Optional, \
+    Sequence, Tuple, TypeVar, Union
+
+from .computer import IntcodeComputerV9
+from .image import ProgramImage
+from .memory import Memory
+
+LOG = logging.getLogger(__name__)
+
+C = TypeVar('C')
+R = TypeVar('R')
+Program = Sequence[int]
+Evaluate = Callable[[Program, C], R]
+
+_program: Program = ()
+_evaluate: Optional[Evaluate] = None
+_cancelled: Optional[Event] = None
+
+
+def outputs(program: Program, stdin: Iterable[int]) -> Tuple[int, ...]:
+    """evaluator: run with ``stdin`` and return everything written to stdout"""
+    vm = IntcodeComputerV9(program, stdin=stdin)
+    vm.run()
+    return tuple(vm.stdout)
+
+
+def patched_memory(program: Program, patch: Mapping[int, int]) -> Memory:
+    """evaluator: overwrite some cells (e.g. day2's noun/verb), run, return the final memory"""
+    vm = IntcodeComputerV9(program)
+    for address, value in patch.items():
+        vm.memory[address] = value
+    vm.run()
+    return vm.memory
+
+
+def _init_worker(program: Program, evaluate: Evaluate, cancelled: Event) -> None:
+    global _program, _evaluate, _cancelled
+    _program, _evaluate, _cancelled = program, evaluate, cancelled
+
+
+def _find_in_chunk(chunk: List[C], predicate: Callable[[R], bool]) -> Optional[Tuple[C, R]]:
+    for candidate in chunk:
+        if _cancelled.is_set():
+            break
+        result = _evaluate(_program, candidate)
+        if predicate(result):
+            return candidate, result
+    return None
+
+
+def _best_in_chunk(chunk: List[C], objective: Optional[Callable[[R], Any]]
+                   ) -> Optional[Tuple[C, Any]]:
+    best = None
+    for candidate in chunk:
+        result = _evaluate(_program, candidate)
+        value = result if objective is None else objective(result)
+        if best is None or value > best[1]:
+            best = candidate, value
+    return best
+
+
+def _parse(program: Union[str, Iterable[Union[int, str]]]) -> Program:
+    # parsed once here, so that each VM in the workers shares the image
+    return ProgramImage.of(program)
+
+
+def _chunks(candidates: Iterable[C], chunksize: int) -> Iterator[List[C]]:
+    candidates = iter(candidates)
+    while True:
+        chunk = list(itertools.islice(candidates, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _map_chunks(program: Union[str, Iterable[Union[int, str]]], candidates: Iterable[C],
+                evaluate: Evaluate, task: Callable, arg: Any,
+                workers: Optional[int], chunksize: int) -> Iterator[Any]:
+    """results of ``task(chunk, arg)`` in completion order, keeping the pool busy but bounded"""
+    workers = workers or os.cpu_count() or 1
+    cancelled = multiprocessing.Event()
+    chunks = _chunks(candidates, chunksize)
+    first = list(itertools.islice(chunks, 2 * workers))
+    # a small sweep does not pay for starting processes that would have nothing to do
+    workers = max(1, min(workers, len(first)))
+    pending: MutableSet[Future] = set()
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(_parse(program), evaluate, cancelled)) as pool:
+        try:
+            for chunk in first:
+                pending.add(pool.submit(task, chunk, arg))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for chunk in itertools.islice(chunks, len(done)):
+                    pending.add(pool.submit(task, chunk, arg))
+                for future in done:
+                    yield future.result()
+        finally:
+            # reached early when the consumer stops, e.g. once a match is found
+            cancelled.set()
+            for future in pending:
+                future.cancel()
+
+
+def find(program: Union[str, Iterable[Union[int, str]]], candidates: Iterable[C],
+         predicate: Callable[[R], bool], evaluate: Evaluate = outputs,
+         workers: Optional[int] = None, chunksize: int = 64) -> Optional[Tuple[C, R]]:
+    """a candidate whose result satisfies ``predicate`` (not necessarily the first in order)
+
+    Remaining work is cancelled as soon as any worker finds a match.
+    """
+    for match in _map_chunks(program, candidates, evaluate, _find_in_chunk, predicate,
+                             workers, chunksize):
+        if match is not None:
+            return match
+    return None
+
+
+def stream_max(program: Union[str, Iterable[Union[int, str]]], candidates: Iterable[C],
+               objective: Optional[Callable[[R], Any]] = None, evaluate: Evaluate = outputs,
+               workers: Optional[int] = None, chunksize: int = 8) -> Iterator[Tuple[C, Any]]:
+    """yields ``(candidate, value)`` every time a better value comes back from the pool
+
+    ``objective`` maps a result to the value to maximize; by default the result itself.
+    """
+    best = None
+    for chunk_best in _map_chunks(program, candidates, evaluate, _best_in_chunk, objective,
+                                  workers, chunksize):
+        if chunk_best is not None and (best is None or chunk_best[1] > best[1]):
+            best = chunk_best
+            yield best
+
+
+def arg_max(program: Union[str, Iterable[Union[int, str]]], candidates: Iterable[C],
+            objective: Optional[Callable[[R], Any]] = None, evaluate: Evaluate = outputs,
+            workers: Optional[int] = None, chunksize: int = 8) -> Optional[Tuple[C, Any]]:
+    best = None
+    for best in stream_max(program, candidates, objective, evaluate, workers, chunksize):
+        pass
+    return best
@@ -0,0 +1,266 @@
+"""symbolic execution of straight-line Intcode, for day2-style searches over inputs
+
+Chosen cells start out as symbols and every value computed from them becomes an
+expression tree.  When control flow never depends on a symbol, one symbolic run
+describes the final memory for every assignment at once; if the cell of interest
+is affine in the symbols, the search for a target value is solved arithmetically.
+"""
+import itertools
+import logging
+import operator
+from typing import Callable, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import attr
+import numpy
+
+from .batch import BatchIntcodeComputer, LaneStatus
+from .exceptions import NotSymbolic
+from .opcode import Opcode
+from .parameter_mode import ParameterMode
+
+LOG = logging.getLogger(__name__)
+
+MAX_ADDRESS = 1 << 20
+
+Linear = Tuple[int, Mapping[int, int]]
+"""a constant and a coefficient per symbol"""
+
+OPERATIONS: Mapping[Opcode, Callable[[int, int], int]] = {
+    Opcode.ADD: operator.add,
+    Opcode.MULTIPLY: operator.mul,
+    Opcode.LESS_THAN: lambda left, right: 1 if left < right else 0,
+    Opcode.EQUALS: lambda left, right: 1 if left == right else 0,
+}
+
+
+class Expr:
+    def evaluate(self, values: Mapping[int, int]) -> int:
+        """the value for the given assignment of symbols"""
+        raise NotImplementedError()
+
+    def linear(self) -> Optional[Linear]:
+        """the expression as an affine function of the symbols, if it is one"""
+        return None
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class Const(Expr):
+    value: int
+
+    def evaluate(self, values: Mapping[int, int]) -> int:
+        return self.value
+
+    def linear(self) -> Optional[Linear]:
+        return self.value, {}
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class Symbol(Expr):
+    address: int
+    """the cell whose initial value this is"""
+
+    def evaluate(self, values: Mapping[int, int]) -> int:
+        return values[self.address]
+
+    def linear(self) -> Optional[Linear]:
+        return 0, {self.address: 1}
+
+    def __str__(self) -> str:
+        return f'${self.address}'
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class Operation(Expr):
+    opcode: Opcode
+    left: Expr
+    right: Expr
+
+    def evaluate(self, values: Mapping[int, int]) -> int:
+        return OPERATIONS[self.opcode](self.left.evaluate(values), self.right.evaluate(values))
+
+    def linear(self) -> Optional[Linear]:
+        left, right = self.left.linear(), self.right.linear()
+        if left is None or right is None:
+            return None
+        if self.opcode == Opcode.ADD:
+            coefficients = dict(left[1])
+            for symbol, coefficient in right[1].items():
+                coefficients[symbol] = coefficients.get(symbol, 0) + coefficient
+            return left[0] + right[0], coefficients
+        if self.opcode == Opcode.MULTIPLY and not (left[1] and right[1]):
+            (factor, _), (constant, coefficients) = sorted((left, right),
+                                                           key=lambda lin: bool(lin[1]))
+            return factor * constant, {symbol: factor * coefficient
+                                       for symbol, coefficient in coefficients.items()}
+        return None
+
+    def __str__(self) -> str:
+        return f'({self.left} {self.opcode.name} {self.right})'
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class Load(Expr):
+    """a read through an address that depends on the symbols"""
+    address: Expr
+    cells: Tuple[Expr, ...]
+    """memory as it was when read"""
+
+    def evaluate(self, values: Mapping[int, int]) -> int:
+        address = self.address.evaluate(values)
+        if address < 0:
+            raise NotSymbolic(f'Read from negative address {address}')
+        return self.cells[address].evaluate(values) if address < len(self.cells) else 0
+
+    def __str__(self) -> str:
+        return f'[{self.address}]'
+
+
+def combine(opcode: Opcode, left: Expr, right: Expr) -> Expr:
+    """``left <opcode> right``, folding constants and identities"""
+    if isinstance(left, Const) and isinstance(right, Const):
+        return Const(OPERATIONS[opcode](left.value, right.value))
+    if opcode in (Opcode.ADD, Opcode.MULTIPLY):
+        identity = 0 if opcode == Opcode.ADD else 1
+        for expr, other in ((left, right), (right, left)):
+            if isinstance(expr, Const):
+                if expr.value == identity:
+                    return other
+                if opcode == Opcode.MULTIPLY and expr.value == 0:
+                    return expr
+    return Operation(opcode, left, right)
+
+
+def _concrete(expr: Expr, what: str) -> int:
+    if not isinstance(expr, Const):
+        raise NotSymbolic(f'{what} depends on the input: {expr}')
+    return expr.value
+
+
+def execute(program: Union[str, Iterable[Union[int, str]]], symbols: Iterable[int],
+            max_steps: int = 1 << 16) -> List[Expr]:
+    """the final memory of ``program`` with ``symbols`` left unknown
+
+    Raises ``NotSymbolic`` on input or output, on a jump, write or instruction
+    depending on a symbol, and after ``max_steps`` instructions without halting.
+    """
+    if hasattr(program, 'split'):
+        program = program.split(',')
+    memory: List[Expr] = [Const(int(val)) for val in program]
+    for address in symbols:
+        memory[address] = Symbol(address)
+    iptr = rbptr = 0
+
+    def address_of(mode: ParameterMode, operand: Expr) -> Expr:
+        if mode == ParameterMode.RELATIVE:
+            return combine(Opcode.ADD, operand, Const(rbptr))
+        return operand
+
+    def read(address: int) -> Expr:
+        if address < 0:
+            raise NotSymbolic(f'Read from negative address {address}')
+        return memory[address] if address < len(memory) else Const(0)
+
+    def parameter(idx: int) -> Expr:
+        mode = ParameterMode(word // 10 ** (idx + 1) % 10)
+        operand = read(iptr + idx)
+        if mode == ParameterMode.IMMEDIATE:
+            return operand
+        address = address_of(mode, operand)
+        if isinstance(address, Const):
+            return read(address.value)
+        return Load(address, tuple(memory))
+
+    for _ in range(max_steps):
+        word = _concrete(read(iptr), f'Instruction at {iptr}')
+        opcode = Opcode(word % 100)
+        if opcode in OPERATIONS:
+            value = combine(opcode, parameter(1), parameter(2))
+            mode = ParameterMode(word // 10000 % 10)
+            address = _concrete(address_of(mode, read(iptr + 3)), f'Write at {iptr}')
+            if not 0 <= address < MAX_ADDRESS:
+                raise NotSymbolic(f'Write to address {address}')
+            memory.extend(Const(0) for _ in range(address + 1 - len(memory)))
+            memory[address] = value
+            iptr += 4
+        elif opcode in (Opcode.JUMP_IF_TRUE, Opcode.JUMP_IF_FALSE):
+            condition = _concrete(parameter(1), f'Jump at {iptr}')
+            if bool(condition) == (opcode == Opcode.JUMP_IF_TRUE):
+                iptr = _concrete(parameter(2), f'Jump target at {iptr}')
+            else:
+                iptr += 3
+        elif opcode == Opcode.ADJUST_RELATIVE_BASE:
+            rbptr += _concrete(parameter(1), f'Relative base adjustment at {iptr}')
+            iptr += 2
+        elif opcode == Opcode.HALT:
+            return memory
+        else:
+            raise NotSymbolic(f'{opcode.name} at {iptr}')
+    raise NotSymbolic(f'No halt after {max_steps} steps')
+
+
+def solve(program: Union[str, Iterable[Union[int, str]]], target: int,
+          symbols: Sequence[int] = (1, 2), domain: Sequence[int] = range(100),
+          address: int = 0, max_steps: int = 1 << 16) -> Optional[Tuple[int, ...]]:
+    """the first values for ``symbols`` from ``domain``, in lexicographic order, for
+    which ``program`` halts with ``target`` at ``address``
+
+    An affine result is solved for directly, any other expression is evaluated over
+    the candidates, and if the program cannot be run symbolically the candidates are
+    run concretely on a ``BatchIntcodeComputer`` for up to ``max_steps`` steps.
+    """
+    if hasattr(program, 'split'):
+        program = program.split(',')
+    program = [int(val) for val in program]
+    try:
+        result = execute(program, symbols, max_steps)[address]
+    except NotSymbolic as exc:
+        LOG.debug('Sweeping concretely: %s', exc)
+        return _sweep(program, target, symbols, domain, address, max_steps)
+    linear = result.linear()
+    if linear is None:
+        LOG.debug('Sweeping %s', result)
+        for values in itertools.product(domain, repeat=len(symbols)):
+            try:
+                if result.evaluate(dict(zip(symbols, values))) == target:
+                    return values
+            except NotSymbolic:
+                continue
+        return None
+    LOG.debug('Solving %s', result)
+    return _solve_linear(linear, target, symbols, domain)
+
+
+def _solve_linear(linear: Linear, target: int, symbols: Sequence[int],
+                  domain: Sequence[int]) -> Optional[Tuple[int, ...]]:
+    constant, coefficients = linear
+    solved = [idx for idx, symbol in enumerate(symbols) if coefficients.get(symbol)]
+    if not solved:
+        return tuple(domain[0] for _ in symbols) if domain and constant == target else None
+    # every other symbol is enumerated; the last one that matters follows from them
+    last = solved[-1]
+    coefficient = coefficients[symbols[last]]
+    others = [symbol for idx, symbol in enumerate(symbols) if idx != last]
+    for values in itertools.product(domain, repeat=len(others)):
+        remainder = target - constant - sum(coefficients.get(symbol, 0) * value
+                                            for symbol, value in zip(others, values))
+        if remainder % coefficient == 0 and remainder // coefficient in domain:
+            return values[:last] + (remainder // coefficient,) + values[last:]
+    return None
+
+
+def _sweep(program: Sequence[int], target: int, symbols: Sequence[int],
+           domain: Sequence[int], address: int, max_steps: int) -> Optional[Tuple[int, ...]]:
+    candidates = numpy.array(list(itertools.product(domain, repeat=len(symbols))),
+                             dtype=numpy.int64).reshape(-1, len(symbols))
+    batch = BatchIntcodeComputer(program, lanes=len(candidates))
+    for column, symbol in enumerate(symbols):
+        batch.memory[:, symbol] = candidates[:, column]
+    batch.run(max_steps)
+    matches = numpy.flatnonzero((batch.status == LaneStatus.HALTED)
+                                & (batch.memory[:, address] == target))
+    if matches.size:
+        return tuple(int(value) for value in candidates[matches[0]])
+    return None
@@ -0,0 +1,198 @@
+"""fixed-width binary instruction traces, recorded into a ring buffer
+
+Each record is seven little-endian int64s: ``iptr``, the instruction word, the
+three resolved parameters (the value read, or for the written parameter the
+address), the address written (-1 if none) and the value written.  Values outside
+int64 are recorded as ``INT64_MIN``.
+"""
+import itertools
+import operator
+import struct
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterator, List, NamedTuple, Union
+
+from .analysis import WRITE_PARAMETER
+from .compiler import STOCK_INSTRUCTIONS
+from .image import INT64_MAX, INT64_MIN
+from .instruction import Handler, Instruction, Operand
+from .opcode import Opcode
+from .parameter_mode import ParameterMode
+
+if TYPE_CHECKING:
+    from .computer import IntcodeComputer
+
+RECORD = struct.Struct('<7q')
+HEADER = struct.Struct('<4sHQ')
+MAGIC = b'ICTR'
+VERSION = 1
+
+OPERATIONS = {
+    Opcode.ADD: operator.add,
+    Opcode.MULTIPLY: operator.mul,
+    Opcode.LESS_THAN: lambda left, right: 1 if left < right else 0,
+    Opcode.EQUALS: lambda left, right: 1 if left == right else 0,
+}
+"""the stock three-parameter instructions, which the tracer executes itself"""
+
+
+class TraceRecord(NamedTuple):
+    iptr: int
+    word: int
+    arg_1: int
+    arg_2: int
+    arg_3: int
+    written_address: int
+    written_value: int
+
+    @property
+    def opcode(self) -> Opcode:
+        return Opcode(self.word % 100)
+
+
+class Tracer:
+    """records every instruction a VM executes into a ring of ``capacity`` records
+
+    Set it as ``IntcodeComputer.tracer``; as with the profiler, only handlers
+    decoded afterwards are traced, and a compiled VM interprets while traced so
+    that every instruction is recorded.  Once full, the oldest records are
+    overwritten.
+    """
+
+    def __init__(self, capacity: int = 1 << 16) -> None:
+        if capacity & (capacity - 1):
+            raise ValueError(f'Trace capacity must be a power of two: {capacity}')
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * RECORD.size)
+        # a one-item list is cheaper to bump from the handlers than an attribute
+        self._count = [0]
+
+    @property
+    def count(self) -> int:
+        """records written so far, including overwritten ones"""
+        return self._count[0]
+
+    def wrap(self, computer: 'IntcodeComputer', address: int, handler: Handler) -> Handler:
+        memory = computer.memory
+        word = memory[address]
+        opcode = Opcode(word % 100)
+        instr = computer.instructions[opcode]
+        write_parameter = WRITE_PARAMETER.get(opcode)
+        resolvers = [self.resolver(computer, (ParameterMode(word // 10 ** (idx + 1) % 10),
+                                           memory[address + idx]), idx == write_parameter)
+                     for idx in range(1, instr.parameter_count + 1)]
+        resolvers += [itertools.repeat(0).__next__] * (3 - len(resolvers))
+        resolve_1, resolve_2, resolve_3 = resolvers
+        count, buffer, mask, size = self._count, self.buffer, self.capacity - 1, RECORD.size
+        pack_into = RECORD.pack_into
+
+        def overflowed(offset: int, *fields: int) -> None:
+            pack_into(buffer, offset, *(
+                field if INT64_MIN <= field <= INT64_MAX else INT64_MIN for field in fields))
+
+        if write_parameter is None:
+            def traced_handler() -> int:
+                arg_1, arg_2, arg_3 = resolve_1(), resolve_2(), resolve_3()
+                idx = count[0]
+                count[0] = idx + 1
+                offset = (idx & mask) * size
+                # recorded before running, so that a HALT raising Halt is traced too
+                try:
+                    pack_into(buffer, offset, address, word, arg_1, arg_2, arg_3, -1, 0)
+                except struct.error:
+                    overflowed(offset, address, word, arg_1, arg_2, arg_3, -1, 0)
+                return handler()
+            return traced_handler
+
+        if write_parameter == 1:
+            def traced_input_handler() -> int:
+                written = resolve_1()
+                next_iptr = handler()
+                if next_iptr != address:
+                    # returning its own address, the instruction is still waiting for input
+                    value = memory[written]
+                    idx = count[0]
+                    count[0] = idx + 1
+                    offset = (idx & mask) * size
+                    try:
+                        pack_into(buffer, offset, address, word, written, 0, 0, written, value)
+                    except struct.error:
+                        overflowed(offset, address, word, written, 0, 0, written, value)
+                return next_iptr
+            return traced_input_handler
+
+        operation = OPERATIONS.get(opcode)
+        if operation is not None and type(instr) is STOCK_INSTRUCTIONS[opcode]:
+            # executed here from the resolved operands, rather than read twice
+            write, next_iptr = computer.write, address + 4
+
+            def traced_operation_handler() -> int:
+                arg_1, arg_2, written = resolve_1(), resolve_2(), resolve_3()
+                value = operation(arg_1, arg_2)
+                write(written, value)
+                idx = count[0]
+                count[0] = idx + 1
+                offset = (idx & mask) * size
+                try:
+                    pack_into(buffer, offset, address, word, arg_1, arg_2, written, written, value)
+                except struct.error:
+                    overflowed(offset, address, word, arg_1, arg_2, written, written, value)
+                return next_iptr
+            return traced_operation_handler
+
+        def traced_write_handler() -> int:
+            arg_1, arg_2, written = resolve_1(), resolve_2(), resolve_3()
+            next_iptr = handler()
+            value = memory[written]
+            idx = count[0]
+            count[0] = idx + 1
+            offset = (idx & mask) * size
+            try:
+                pack_into(buffer, offset, address, word, arg_1, arg_2, written, written, value)
+            except struct.error:
+                overflowed(offset, address, word, arg_1, arg_2, written, written, value)
+            return next_iptr
+        return traced_write_handler
+
+    @staticmethod
+    def resolver(computer: 'IntcodeComputer', operand: Operand, write: bool
+                 ) -> Callable[[], int]:
+        """reads the parameter's value, or for a written one resolves its address"""
+        if not write:
+            return Instruction.reader(computer, operand)
+        mode, value = operand
+        if mode == ParameterMode.RELATIVE:
+            return lambda: value + computer.rbptr
+        return itertools.repeat(value).__next__
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def __iter__(self) -> Iterator[TraceRecord]:
+        """the records still in the ring, oldest first"""
+        view = memoryview(self.buffer)
+        start = self.count % self.capacity if self.count > self.capacity else 0
+        for idx in range(len(self)):
+            offset = (start + idx) % self.capacity * RECORD.size
+            yield TraceRecord(*RECORD.unpack_from(view, offset))
+
+    def dump(self, file: Union[str, BinaryIO]) -> None:
+        """write the records, oldest first, behind a small header"""
+        if isinstance(file, str):
+            with open(file, 'wb') as fp:
+                return self.dump(fp)
+        file.write(HEADER.pack(MAGIC, VERSION, len(self)))
+        start = self.count % self.capacity if self.count > self.capacity else 0
+        view = memoryview(self.buffer)
+        file.write(view[start * RECORD.size:len(self) * RECORD.size])
+        file.write(view[:start * RECORD.size])
+
+
+def load(file: Union[str, BinaryIO]) -> List[TraceRecord]:
+    """the records of a trace written by ``Tracer.dump``"""
+    if isinstance(file, str):
+        with open(file, 'rb') as fp:
+            return load(fp)
+    magic, version, count = HEADER.unpack(file.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'Not an Intcode trace (version {VERSION}): {magic!r} {version}')
+    data = file.read(count * RECORD.size)
+    return [TraceRecord(*fields) for fields in RECORD.iter_unpack(data)]
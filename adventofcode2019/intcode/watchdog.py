@@ -0,0 +1,225 @@
+"""a watchdog stopping Intcode runs that loop forever or run for too long"""
+import logging
+import time
+from typing import TYPE_CHECKING, FrozenSet, Hashable, List, Optional, Set, Tuple
+
+import attr
+
+from .analysis import Analysis, analyze
+from .image import ProgramImage
+from .instruction import Handler
+from .memory import PagedMemory
+from .run_status import RunStatus
+
+if TYPE_CHECKING:
+    from .computer import IntcodeComputer
+
+LOG = logging.getLogger(__name__)
+
+State = Tuple[int, int, Hashable, Tuple[int, ...]]
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class Cycle:
+    address: int
+    """the iptr of the state found repeating"""
+    length: int
+    """dispatches from one occurrence of the state to the next, as ``max_steps`` counts them"""
+
+
+def memory_state(computer: 'IntcodeComputer') -> Hashable:
+    """the contents of memory, in a form equal between VMs exactly when their memory is
+
+    For ``PagedMemory`` only the pages differing from the program image are read;
+    other backends are read whole.
+    """
+    memory = computer.memory
+    if isinstance(memory, PagedMemory):
+        return tuple((page_no, tuple(page))
+                     for page_no, page in memory.dirty_pages(computer.image))
+    # cells never written read as 0 whether or not the backend holds them
+    return frozenset((address, value) for address, value in memory.items() if value)
+
+
+def indirect_spans(analysis: Analysis) -> FrozenSet[int]:
+    """instructions from which execution falls through to a jump with a target in memory"""
+    preceding = {instr.next_address: instr for instr in analysis.instructions.values()}
+    spans = set()
+    for address in analysis.indirect_jumps:
+        instr = analysis.instructions[address]
+        while instr is not None:
+            spans.add(instr.address)
+            instr = preceding.get(instr.address)
+            if instr is not None and instr.next_address not in instr.successors():
+                break
+    return frozenset(spans)
+
+
+class Watchdog:
+    """stops a VM that returns to an earlier state, or runs past a step or time limit
+
+    Set it as ``IntcodeComputer.watchdog``.  ``run_until`` then returns ``LOOPING``,
+    with the cycle found in ``cycle``, or ``LIMIT_EXCEEDED``; ``run`` raises
+    ``InfiniteLoop`` or ``LimitExceeded`` instead.  ``max_steps`` counts the VM's
+    ``steps`` and ``timeout`` the seconds it has spent running while watched.
+
+    A state is ``iptr``, ``rbptr``, memory and the input still queued, so a program
+    consuming input never repeats one.  States are only taken at loop heads, which
+    the control flow graph of the program image identifies: the targets of jumps
+    backwards, and after jumps through memory (returns) that go backwards.  Any
+    infinite run passes one of them forever; handlers elsewhere run unwrapped, so
+    code outside loops costs nothing.  Code only reached through memory is analyzed
+    from where it is first dispatched to, and rewritten code is checked after every
+    dispatch that goes backwards.  Only one visit in ``check_interval`` hashes the
+    state, and Brent's algorithm compares the hashes, keeping one.  A match is then
+    confirmed by counting dispatches until the exact state comes back, which gives
+    the cycle's length.  A compiled block containing rewritten code may hide a jump
+    backwards, so detection is only guaranteed for interpreted VMs; limits always
+    apply.
+    """
+    check_interval = 1024
+
+    def __init__(self, max_steps: Optional[int] = None, timeout: Optional[float] = None,
+                 check_interval: Optional[int] = None) -> None:
+        self.max_steps = max_steps
+        self.timeout = timeout
+        if check_interval is not None:
+            self.check_interval = check_interval
+        self.cycle: Optional[Cycle] = None
+        """the last cycle found"""
+        self.elapsed = 0.0
+        """seconds spent running while watched"""
+        self._resumed_at = 0.0
+        self._image: Optional[ProgramImage] = None
+        self._analysis: Optional[Analysis] = None
+        self._entry_points: Set[int] = set()
+        self._loop_heads: FrozenSet[int] = frozenset()
+        self._indirect_spans: FrozenSet[int] = frozenset()
+        self._countdown = self.check_interval
+        self._tortoise: Optional[int] = None
+        self._power = self._lam = 1
+        # a state being confirmed, the dispatches since it and the visits left to find it in
+        self._target: Optional[State] = None
+        self._count: List[int] = [0]
+        self._budget = 0
+
+    def resumed(self, computer: 'IntcodeComputer', max_steps: Optional[int]) -> Optional[int]:
+        """the ``max_steps`` for ``run_until`` to run with, within the step limit"""
+        self._resumed_at = time.perf_counter()
+        if self.max_steps is None:
+            return max_steps
+        remaining = max(0, self.max_steps - computer.steps)
+        return remaining if max_steps is None else min(max_steps, remaining)
+
+    def stopped(self, computer: 'IntcodeComputer', status: RunStatus) -> RunStatus:
+        """the status for ``run_until`` to return"""
+        self.elapsed += time.perf_counter() - self._resumed_at
+        if status is RunStatus.BUDGET_EXHAUSTED and self.max_steps is not None \
+                and computer.steps >= self.max_steps:
+            return RunStatus.LIMIT_EXCEEDED
+        return status
+
+    def wrap(self, computer: 'IntcodeComputer', address: int, handler: Handler) -> Handler:
+        if computer.image is not self._image:
+            self._image, self._entry_points = computer.image, {0}
+            self._analyze()
+        if address not in self._analysis.instructions and address not in self._entry_points \
+                and address < len(self._image):
+            # e.g. a return address, which control flow from 0 does not reach
+            self._entry_points.add(address)
+            self._analyze()
+            # handlers decoded so far may now be in loops, or be known not to be
+            computer.invalidate()
+        if self._target is not None:
+            count, counted = self._count, handler
+
+            def handler() -> int:
+                count[0] += 1
+                return counted()
+        visit = self._visit
+        if address in self._indirect_spans or not self._is_static(computer, address):
+            inner = handler
+
+            def handler() -> int:
+                next_iptr = inner()
+                if next_iptr <= address:
+                    visit(computer, next_iptr, 0)
+                return next_iptr
+        if address in self._loop_heads:
+            body = handler
+
+            def loop_head_handler() -> int:
+                if visit(computer, address, 1):
+                    # stopped before running it, so that the state is the one reported
+                    return address
+                return body()
+            return loop_head_handler
+        return handler
+
+    def _analyze(self) -> None:
+        self._analysis = analyze(self._image, self._entry_points)
+        self._loop_heads = self._analysis.loop_heads
+        self._indirect_spans = indirect_spans(self._analysis)
+
+    def _is_static(self, computer: 'IntcodeComputer', address: int) -> bool:
+        """whether the instruction at ``address`` is in the analysis, and unchanged"""
+        instr = self._analysis.instructions.get(address)
+        memory, image = computer.memory, self._image
+        return instr is not None and all(memory[cell] == image[cell]
+                                         for cell in range(address, instr.next_address))
+
+    def _visit(self, computer: 'IntcodeComputer', iptr: int, dispatching: int) -> bool:
+        """check the state at a loop head; true if the VM has been suspended
+
+        ``dispatching`` is 1 if the dispatch at ``iptr`` is still to run.
+        """
+        if self._target is not None:
+            return self._confirm(computer, iptr)
+        self._countdown -= 1
+        if self._countdown > 0:
+            return False
+        self._countdown = self.check_interval
+        if self.timeout is not None \
+                and self.elapsed + time.perf_counter() - self._resumed_at > self.timeout:
+            computer.suspend(RunStatus.LIMIT_EXCEEDED)
+            return True
+        state = self._state(computer, iptr)
+        digest = hash(state)
+        if digest == self._tortoise:
+            # the same state, unless the hashes collide: count the dispatches until it
+            # comes back, which it must within the samples since the tortoise
+            LOG.debug('State at %s seen %s checks ago', iptr, self._lam)
+            self._target, self._count[0] = state, dispatching
+            self._budget = self._lam * self.check_interval
+            computer.invalidate()
+            return False
+        if self._power == self._lam:
+            self._tortoise, self._power, self._lam = digest, self._power * 2, 0
+        self._lam += 1
+        return False
+
+    def _confirm(self, computer: 'IntcodeComputer', iptr: int) -> bool:
+        target = self._target
+        self._budget -= 1
+        if iptr == target[0] and computer.rbptr == target[1] \
+                and self._state(computer, iptr) == target:
+            self.cycle = Cycle(iptr, self._count[0])
+            LOG.debug('Looping from %s every %s dispatches', iptr, self._count[0])
+            self._reset(computer)
+            computer.suspend(RunStatus.LOOPING)
+            return True
+        if self._budget < 0:
+            LOG.debug('State at %s did not repeat: a hash collision', target[0])
+            self._reset(computer)
+        return False
+
+    def _reset(self, computer: 'IntcodeComputer') -> None:
+        """back to sampling, dropping the handlers counting dispatches"""
+        self._target = self._tortoise = None
+        self._power = self._lam = 1
+        self._countdown = self.check_interval
+        computer.invalidate()
+
+    @staticmethod
+    def _state(computer: 'IntcodeComputer', iptr: int) -> State:
+        return iptr, computer.rbptr, memory_state(computer), computer.stdin_channel.values()
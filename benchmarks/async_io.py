@@ -0,0 +1,50 @@
+"""time input/output round trips to a VM from asyncio code
+
+Without ``AsyncIntcodeComputer``, a service has to run each VM on an executor thread
+and await its blocking ``get_stdout`` through the executor as well.
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from adventofcode2019.intcode.async_computer import AsyncIntcodeComputer
+from adventofcode2019.intcode.channel import SynchronizedChannel
+from adventofcode2019.intcode.computer import IntcodeComputerV9
+
+# echoes every input it reads, forever
+ECHO = '3,100,4,100,1105,1,0'
+
+
+async def executor_round_trips(count: int) -> float:
+    loop = asyncio.get_running_loop()
+    vm = IntcodeComputerV9(ECHO, stdin=SynchronizedChannel(), stdout=SynchronizedChannel())
+    threading.Thread(target=vm.run, daemon=True).start()
+    start = time.perf_counter()
+    for value in range(count):
+        vm.put_stdin(value)
+        assert await loop.run_in_executor(None, vm.get_stdout) == value
+    return time.perf_counter() - start
+
+
+async def async_round_trips(count: int) -> float:
+    vm = AsyncIntcodeComputer(ECHO)
+    task = asyncio.ensure_future(vm.run())
+    start = time.perf_counter()
+    for value in range(count):
+        vm.put_stdin(value)
+        assert await vm.get_stdout() == value
+    elapsed = time.perf_counter() - start
+    task.cancel()
+    return elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args()
+    executor_time = asyncio.run(executor_round_trips(args.count))
+    async_time = asyncio.run(async_round_trips(args.count))
+    print(f'executor thread:      {1e6 * executor_time / args.count:8.2f} us/round trip')
+    print(f'AsyncIntcodeComputer: {1e6 * async_time / args.count:8.2f} us/round trip '
+          f'({executor_time / async_time:.1f}x)')
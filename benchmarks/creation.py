@@ -0,0 +1,56 @@
+"""time creating VMs from a shared ProgramImage, as sweeps and networks do by the thousand"""
+import argparse
+import time
+import tracemalloc
+from typing import Any, Callable, List, Mapping, Tuple
+
+from adventofcode2019.intcode.computer import IntcodeComputer, IntcodeComputerV5, \
+    IntcodeComputerV9, IntcodeComputerV11
+from adventofcode2019.intcode.image import ProgramImage
+from adventofcode2019.intcode.memory import PagedMemory
+
+CONFIGURATIONS: Mapping[str, Tuple[type, Mapping[str, Any]]] = {
+    'V2': (IntcodeComputer, {}),
+    'V5': (IntcodeComputerV5, {}),
+    'V9': (IntcodeComputerV9, {}),
+    'V9 compiled+fused': (IntcodeComputerV9, {'compiled': True, 'fused': True}),
+    'V11': (IntcodeComputerV11, {}),
+    # copy-on-write memory, so that the cost of the VM object itself shows
+    'V2 paged': (IntcodeComputer, {'memory_class': PagedMemory}),
+    'V11 paged': (IntcodeComputerV11, {'memory_class': PagedMemory}),
+}
+
+
+def create(make: Callable[[], Any], count: int) -> float:
+    """seconds to create ``count`` VMs, dropping each one"""
+    start = time.perf_counter()
+    for _ in range(count):
+        make()
+    return time.perf_counter() - start
+
+
+def footprint(make: Callable[[], Any], count: int) -> float:
+    """bytes allocated per VM while ``count`` of them are alive"""
+    tracemalloc.start()
+    vms: List[Any] = [make() for _ in range(count)]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del vms
+    return allocated / count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('infile', type=argparse.FileType('r'), nargs='?',
+                        default='inputs/day9.txt')
+    parser.add_argument('--count', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    image = ProgramImage.of(args.infile.read())
+    for name, (computer_class, options) in CONFIGURATIONS.items():
+        def make(computer_class=computer_class, options=options):
+            return computer_class(image, **options)
+        # best of several runs, since a single one is dominated by noise
+        seconds = min(create(make, args.count) for _ in range(args.repeat))
+        print(f'{name:18}  {1e6 * seconds / args.count:7.2f} us/VM  '
+              f'{footprint(make, 1000):9.0f} bytes/VM')
@@ -0,0 +1,44 @@
+"""compare the legacy ``tick`` loop against the decoded-handler ``run`` loop"""
+import argparse
+import time
+from contextlib import suppress
+from typing import Tuple, Type
+
+from adventofcode2019.intcode.computer import IntcodeComputerV9
+from adventofcode2019.intcode.exceptions import Halt
+from adventofcode2019.intcode.memory import ArrayMemory, DictMemory, ListMemory, Memory, PagedMemory
+
+MEMORY_CLASSES = {cls.__name__: cls for cls in (DictMemory, ListMemory, ArrayMemory, PagedMemory)}
+
+
+def tick_loop(code: str, stdin: int) -> Tuple[int, float]:
+    vm = IntcodeComputerV9(code, stdin=[stdin])
+    steps = 0
+    start = time.perf_counter()
+    with suppress(Halt):
+        while not vm.is_terminated:
+            vm.tick()
+            steps += 1
+    return steps, time.perf_counter() - start
+
+
+def decoded_loop(code: str, stdin: int, memory_class: Type[Memory] = None) -> float:
+    vm = IntcodeComputerV9(code, stdin=[stdin], memory_class=memory_class)
+    start = time.perf_counter()
+    vm.run()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('infile', type=argparse.FileType('r'), nargs='?',
+                        default='inputs/day9.txt')
+    parser.add_argument('--stdin', type=int, default=2)
+    args = parser.parse_args()
+    code = args.infile.read()
+    steps, tick_time = tick_loop(code, args.stdin)
+    print(f'instructions: {steps}')
+    print(f'tick: {steps / tick_time:12.0f} instr/s')
+    for name, memory_class in MEMORY_CLASSES.items():
+        run_time = decoded_loop(code, args.stdin, memory_class)
+        print(f'run ({name}): {steps / run_time:12.0f} instr/s ({tick_time / run_time:.1f}x)')
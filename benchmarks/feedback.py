@@ -0,0 +1,54 @@
+"""compare day7's original thread-per-amplifier feedback loop against the scheduler"""
+import argparse
+import itertools
+import queue
+import threading
+import time
+from contextlib import suppress
+from time import sleep
+from typing import Iterable, Sequence
+
+from adventofcode2019.day7 import feedback_for_phase_settings
+from adventofcode2019.intcode.channel import SynchronizedChannel
+from adventofcode2019.intcode.computer import IntcodeComputerV5
+
+
+def threaded_feedback(code: Sequence[int], phase_settings: Iterable[int]) -> int:
+    """the thread-per-VM implementation day7 used before the scheduler"""
+    vms = [IntcodeComputerV5(code, stdin=SynchronizedChannel([int(phase_setting)]),
+                             stdout=SynchronizedChannel())
+           for phase_setting in phase_settings]
+    threads = []
+    for vm in vms:
+        threads.append(threading.Thread(target=vm.run))
+        threads[-1].start()
+
+    vms[0].put_stdin(0)
+
+    while any(thread.is_alive() for thread in threads):
+        for idx in range(len(vms)):
+            vm = vms[idx]
+            with suppress(queue.Empty):
+                vms[(idx + 1) % len(vms)].put_stdin(vm.get_stdout_nowait())
+        sleep(0)  # ensure we rotate threads
+
+    return vms[-1].get_stdout()
+
+
+def timed(feedback, code: Sequence[int]) -> float:
+    start = time.perf_counter()
+    best = max(feedback(code, phases) for phases in itertools.permutations(range(5, 10)))
+    elapsed = time.perf_counter() - start
+    print(f'{feedback.__name__}: {best} in {elapsed:.3f}s')
+    return elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('infile', type=argparse.FileType('r'), nargs='?',
+                        default='inputs/day7.txt')
+    args = parser.parse_args()
+    code = [int(val) for val in args.infile.read().split(',')]
+    threaded_time = timed(threaded_feedback, code)
+    scheduled_time = timed(feedback_for_phase_settings, code)
+    print(f'scheduler: {threaded_time / scheduled_time:.1f}x faster')
@@ -0,0 +1,34 @@
+"""time messages through a ring of hundreds of VMs, in one process and across workers"""
+import argparse
+import os
+import time
+
+from adventofcode2019.intcode.image import ProgramImage
+from adventofcode2019.intcode.network import Network
+
+# reads a hop count; passes it on less one, or drops it once it reaches 0
+HOP = ProgramImage.of('3,14,1006,14,0,1001,14,-1,14,4,14,1105,1,0,0')
+
+
+def ring_messages(nodes: int, hops: int, workers: int) -> float:
+    """messages per second, with one token per node circulating for ``hops`` hops"""
+    network = Network.ring(HOP, [[hops]] * nodes)
+    start = time.perf_counter()
+    network.run(workers)
+    return nodes * hops / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, default=256)
+    parser.add_argument('--hops', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, nargs='*',
+                        default=sorted({0, 1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+    print(f'{os.cpu_count()} CPUs')
+    for workers in args.workers:
+        # best of several runs, since a single one is dominated by noise
+        rate = max(ring_messages(args.nodes, args.hops, workers) for _ in range(args.repeat))
+        label = 'in-process' if not workers else f'{workers} workers'
+        print(f'{label:12}  {rate:10.0f} messages/s')
@@ -0,0 +1,48 @@
+"""time one input/output event handled by catching WaitingForInput against run_until"""
+import argparse
+import time
+
+from adventofcode2019.intcode.computer import IntcodeComputerV11
+from adventofcode2019.intcode.exceptions import WaitingForInput
+from adventofcode2019.intcode.run_status import RunStatus
+
+# echoes every input it reads, forever
+ECHO = '3,100,4,100,1105,1,0'
+
+
+def exception_events(count: int, compiled: bool) -> float:
+    vm = IntcodeComputerV11(ECHO, compiled=compiled)
+    start = time.perf_counter()
+    for value in range(count):
+        vm.put_stdin(value)
+        try:
+            vm.run()
+        except WaitingForInput:
+            pass
+        assert vm.get_stdout_nowait() == value
+    return time.perf_counter() - start
+
+
+def run_until_events(count: int, compiled: bool) -> float:
+    vm = IntcodeComputerV11(ECHO, compiled=compiled)
+    start = time.perf_counter()
+    for value in range(count):
+        vm.put_stdin(value)
+        assert vm.run_until(RunStatus.NEEDS_INPUT) is RunStatus.NEEDS_INPUT
+        assert vm.get_stdout_nowait() == value
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    for compiled in (False, True):
+        # best of several runs, since a single one is dominated by noise
+        exception_time = min(exception_events(args.count, compiled) for _ in range(args.repeat))
+        run_until_time = min(run_until_events(args.count, compiled) for _ in range(args.repeat))
+        label = 'compiled' if compiled else 'decoded'
+        print(f'{label:8}  WaitingForInput: {1e6 * exception_time / args.count:6.2f} us/event  '
+              f'run_until: {1e6 * run_until_time / args.count:6.2f} us/event '
+              f'({exception_time / run_until_time:.2f}x)')
@@ -0,0 +1,325 @@
+"""run the real puzzle inputs and synthetic stress programs against every engine
+
+Reports instructions per second, peak memory and time per I/O event for each
+workload and engine, optionally writes them to JSON, and with ``--baseline``
+exits with status 1 when a metric regressed by more than ``--threshold`` against a
+stored run::
+
+    python benchmarks/suite.py --output baseline.json
+    python benchmarks/suite.py --baseline baseline.json --threshold 0.15
+
+Timings are the best of ``--repeat`` runs.  Instructions and I/O events are
+counted once per workload, in a separate interpreted run.
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Mapping, MutableMapping, NamedTuple, \
+    Sequence
+
+from adventofcode2019.day11 import PaintingRobot
+from adventofcode2019.intcode.asm import assemble, fib, loop, memory_sweep
+from adventofcode2019.intcode.computer import IntcodeComputer, IntcodeComputerV11
+from adventofcode2019.intcode.exceptions import Halt
+from adventofcode2019.intcode.image import ProgramImage
+from adventofcode2019.intcode.instruction import Handler
+from adventofcode2019.intcode.memory import ArrayMemory, DictMemory, PagedMemory
+from adventofcode2019.intcode.opcode import Opcode
+from adventofcode2019.intcode.scheduler import Scheduler
+
+INPUTS = Path(__file__).parent.parent / 'inputs'
+
+Make = Callable[[ProgramImage, Sequence[int]], IntcodeComputer]
+Results = Mapping[str, Mapping[str, Any]]
+
+
+class Engine(NamedTuple):
+    name: str
+    make: Make
+    run: Callable[[IntcodeComputer], None] = IntcodeComputer.run
+    interactive: bool = True
+    """whether VMs can be suspended for input, which networks and robots need"""
+    dense: bool = False
+    """whether memory is allocated up to the highest address, ruling out sparse writes"""
+
+
+class Workload(NamedTuple):
+    name: str
+    run: Callable[[Engine], None]
+    interactive: bool = False
+    sparse: bool = False
+
+
+def tick_run(vm: IntcodeComputer) -> None:
+    """the legacy interpreter loop"""
+    with suppress(Halt):
+        while not vm.is_terminated:
+            vm.tick()
+
+
+def maker(memory_class: type = DictMemory, compiled: bool = False, fused: bool = False
+          ) -> Make:
+    def make(image: ProgramImage, stdin: Sequence[int]) -> IntcodeComputer:
+        return IntcodeComputerV11(image, stdin=list(stdin), memory_class=memory_class,
+                                  compiled=compiled, fused=fused)
+    return make
+
+
+ENGINES = [
+    Engine('tick', maker(), tick_run, interactive=False),
+    Engine('decoded', maker()),
+    Engine('decoded-array', maker(ArrayMemory), dense=True),
+    Engine('decoded-paged', maker(PagedMemory)),
+    Engine('decoded-fused', maker(fused=True)),
+    Engine('compiled', maker(compiled=True)),
+]
+
+
+class InstructionCounter:
+    """counts executed instructions and I/O events, installed in place of a tracer"""
+
+    def __init__(self) -> None:
+        self.instructions = 0
+        self.io_events = 0
+
+    def wrap(self, computer: IntcodeComputer, address: int, handler: Handler) -> Handler:
+        opcode = computer.memory[address] % 100
+        is_input = opcode == Opcode.SAVE.value
+        is_io = is_input or opcode == Opcode.OUTPUT.value
+
+        def counted_handler() -> int:
+            next_iptr = handler()
+            # an input instruction returning its own address is still waiting
+            if next_iptr != address or not is_input:
+                self.instructions += 1
+                self.io_events += is_io
+            return next_iptr
+        return counted_handler
+
+    def engine(self) -> Engine:
+        make = maker()
+
+        def counted_make(image: ProgramImage, stdin: Sequence[int]) -> IntcodeComputer:
+            vm = make(image, stdin)
+            vm.tracer = self
+            return vm
+        return Engine('count', counted_make)
+
+
+def recursion(depth: int) -> ProgramImage:
+    """outputs 1 + 2 + ... + ``depth``, computed by a recursive function
+
+    A frame is two cells on the relative-base stack: the return address at
+    ``[rb+0]`` and the argument at ``[rb+1]``, which the callee replaces with its
+    result.
+    """
+    return assemble(f'''
+            arb stack
+            mov {depth}, [rb+1]
+            mov done, [rb]
+            jmp sum
+    done:   out [rb+1]
+            halt
+    sum:    jz [rb+1], return           ; sum(0) == 0
+            arb 2
+            add [rb-1], -1, [rb+1]      ; the callee's argument: n - 1
+            mov resume, [rb]
+            jmp sum
+    resume: arb -2
+            add [rb+1], [rb+3], [rb+1]  ; n + sum(n - 1)
+    return: jnz 1, [rb]
+    stack:
+    ''')
+
+
+def sparse_writes(count: int, stride: int = 1 << 20) -> ProgramImage:
+    """writes ``count`` cells ``stride`` apart, through the relative base"""
+    return assemble(f'''
+            mov {count}, [counter]
+            arb end
+    loop:   add [counter], 0, [rb]
+            arb {stride}
+            add [counter], -1, [counter]
+            jnz [counter], loop
+            halt
+    counter: data 0
+    end:
+    ''')
+
+
+def ping_pong() -> ProgramImage:
+    """passes on what it reads, less one, until 0, which it passes on before halting"""
+    return assemble('''
+    loop:   in [value]
+            jz [value], end
+            add [value], -1, [value]
+            out [value]
+            jmp loop
+    end:    out [value]
+            halt
+    value:  data 0
+    ''')
+
+
+def run_program(image: ProgramImage, stdin: Sequence[int] = ()) -> Callable[[Engine], None]:
+    def workload(engine: Engine) -> None:
+        engine.run(engine.make(image, stdin))
+    return workload
+
+
+def ring(image: ProgramImage, stdins: Sequence[Sequence[int]], signal: int
+         ) -> Callable[[Engine], None]:
+    """VMs connected in a ring by the scheduler, the first one sent ``signal``"""
+    def workload(engine: Engine) -> None:
+        scheduler = Scheduler()
+        vms = [scheduler.add(engine.make(image, stdin)) for stdin in stdins]
+        for source, destination in zip(vms, vms[1:] + vms[:1]):
+            scheduler.connect(source, destination)
+        scheduler.send(vms[0], signal)
+        scheduler.run()
+    return workload
+
+
+def painting_robot(image: ProgramImage) -> Callable[[Engine], None]:
+    def workload(engine: Engine) -> None:
+        robot = PaintingRobot(())
+        robot.computer = engine.make(image, ())
+        robot.run()
+    return workload
+
+
+def workloads(scale: float) -> List[Workload]:
+    day2 = ProgramImage.load(INPUTS / 'day2.txt').values()[:]
+    day2[1:3] = 12, 2
+    return [
+        Workload('day2', run_program(ProgramImage(day2))),
+        Workload('day5', run_program(ProgramImage.load(INPUTS / 'day5.txt'), [5])),
+        Workload('day7', ring(ProgramImage.load(INPUTS / 'day7.txt'), [[9], [8], [7], [6], [5]],
+                              0), interactive=True),
+        Workload('day9', run_program(ProgramImage.load(INPUTS / 'day9.txt'), [2])),
+        Workload('day11', painting_robot(ProgramImage.load(INPUTS / 'day11.txt')),
+                 interactive=True),
+        Workload('tight-loop', run_program(loop(int(200000 * scale)))),
+        Workload('recursion', run_program(recursion(int(20000 * scale)))),
+        Workload('sparse-writes', run_program(sparse_writes(int(20000 * scale))), sparse=True),
+        Workload('ping-pong', ring(ping_pong(), [[], []], int(20000 * scale)), interactive=True),
+        # naive recursion makes about 1.618 ** n calls
+        Workload('fib', run_program(fib(max(1, round(18 + math.log(scale, 1.618)))))),
+        Workload('memory-sweep',
+                 run_program(memory_sweep(max(1, int(4096 * scale)), passes=20))),
+    ]
+
+
+def measure(workload: Workload, engine: Engine, counter: InstructionCounter,
+            repeat: int) -> MutableMapping[str, Any]:
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        workload.run(engine)
+        seconds = min(seconds, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        workload.run(engine)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'instructions': counter.instructions,
+        'seconds': seconds,
+        'instructions_per_second': counter.instructions / seconds,
+        'peak_kib': peak / 1024,
+        'io_events': counter.io_events,
+        'us_per_io': 1e6 * seconds / counter.io_events if counter.io_events else None,
+    }
+
+
+def run_suite(engines: Iterable[Engine], selected: Iterable[Workload], repeat: int
+              ) -> MutableMapping[str, MutableMapping[str, Any]]:
+    results = {}
+    engines = list(engines)
+    for workload in selected:
+        counter = InstructionCounter()
+        workload.run(counter.engine())
+        for engine in engines:
+            if (workload.interactive and not engine.interactive) \
+                    or (workload.sparse and engine.dense):
+                continue
+            key = f'{workload.name}/{engine.name}'
+            results[key] = measure(workload, engine, counter, repeat)
+            print(format_row(key, results[key]), flush=True)
+    return results
+
+
+def format_row(key: str, result: Mapping[str, Any]) -> str:
+    us_per_io = '' if result['us_per_io'] is None else f'{result["us_per_io"]:.2f}'
+    return (f'{key:<30}{result["instructions"]:>10}{result["instructions_per_second"]:>14.0f}'
+            f'{result["peak_kib"]:>12.0f}{us_per_io:>10}')
+
+
+METRICS = {
+    # metric: whether bigger is better
+    'instructions_per_second': True,
+    'peak_kib': False,
+    'us_per_io': False,
+}
+
+
+def compare(results: Results, baseline: Results, threshold: float) -> List[str]:
+    """the metrics of ``results`` more than ``threshold`` (a fraction) worse than ``baseline``"""
+    regressions = []
+    for key in sorted(results.keys() & baseline.keys()):
+        for metric, bigger_is_better in METRICS.items():
+            new, old = results[key].get(metric), baseline[key].get(metric)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            if (-change if bigger_is_better else change) > threshold:
+                regressions.append(f'{key} {metric}: {old:.6g} -> {new:.6g} ({change:+.1%})')
+    return regressions
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--engines', nargs='*', choices=[engine.name for engine in ENGINES])
+    parser.add_argument('--workloads', nargs='*')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='size of the synthetic workloads')
+    parser.add_argument('--output', type=Path, help='write the results to this JSON file')
+    parser.add_argument('--baseline', type=Path, help='compare against this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='largest tolerated regression, as a fraction')
+    args = parser.parse_args(argv)
+
+    engines = [engine for engine in ENGINES if not args.engines or engine.name in args.engines]
+    selected = [workload for workload in workloads(args.scale)
+                if not args.workloads or workload.name in args.workloads]
+    print(f'{"workload/engine":<30}{"instr":>10}{"instr/s":>14}{"peak KiB":>12}{"us/io":>10}')
+    results = run_suite(engines, selected, args.repeat)
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            'python': sys.version,
+            'platform': platform.platform(),
+            'scale': args.scale,
+            'results': results,
+        }, indent=2))
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline['results'], args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+        print(f'no regression beyond {args.threshold:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
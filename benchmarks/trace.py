@@ -0,0 +1,28 @@
+"""overhead of recording a binary trace, against the same interpreted run untraced"""
+import argparse
+import time
+from typing import Optional
+
+from adventofcode2019.intcode.computer import IntcodeComputerV9
+from adventofcode2019.intcode.trace import Tracer
+
+
+def timed_run(code: str, stdin: int, tracer: Optional[Tracer]) -> float:
+    vm = IntcodeComputerV9(code, stdin=[stdin])
+    vm.tracer = tracer
+    start = time.perf_counter()
+    vm.run()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('infile', type=argparse.FileType('r'), nargs='?',
+                        default='inputs/day9.txt')
+    parser.add_argument('--stdin', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    code = args.infile.read()
+    plain = min(timed_run(code, args.stdin, None) for _ in range(args.repeat))
+    traced = min(timed_run(code, args.stdin, Tracer()) for _ in range(args.repeat))
+    print(f'untraced: {plain:.3f}s  traced: {traced:.3f}s  ({traced / plain:.2f}x)')
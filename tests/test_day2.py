@@ -16,4 +16,4 @@ from adventofcode2019.intcode.computer import run_intcode
 )
 def test_parta(initial, final, caplog):
     caplog.set_level(logging.DEBUG)
-    assert run_intcode(initial) == final
+    assert str(run_intcode(initial)) == final
@@ -13,7 +13,7 @@ LOG = logging.getLogger(__name__)
 )
 def test_parta(initial, final, caplog):
     caplog.set_level(logging.DEBUG)
-    assert run_intcode(initial, comp_cls=IntcodeComputerV5) == final
+    assert str(run_intcode(initial, comp_cls=IntcodeComputerV5)) == final
 
 
 @pytest.mark.parametrize(
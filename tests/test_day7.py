@@ -2,8 +2,8 @@ import logging
 
 import pytest
 
-from adventofcode2019.day7 import feedback_for_phase_settings, output_for_phase_settings, parta, \
-    partb
+from adventofcode2019.day7 import AMPLIFIER_RUNS, feedback_for_phase_settings, \
+    output_for_phase_settings, parta, partb
 
 LOG = logging.getLogger(__name__)
 
@@ -32,7 +32,13 @@ def test_output_for_phase_settings(code, phase_settings, signal, caplog):
 )
 def test_parta(code, signal, caplog):
     caplog.set_level(logging.DEBUG)
+    AMPLIFIER_RUNS.clear()
+    before = AMPLIFIER_RUNS.stats()
     assert parta(code) == signal
+    after = AMPLIFIER_RUNS.stats()
+    # 120 permutations of 5 amplifiers, sharing the runs of common prefixes
+    assert after['hits'] - before['hits'] + after['misses'] - before['misses'] == 600
+    assert after['misses'] - before['misses'] < 600
 
 
 @pytest.mark.parametrize(
@@ -0,0 +1,73 @@
+import logging
+
+from adventofcode2019.intcode import analysis
+from adventofcode2019.intcode.analysis import analyze, decode
+from adventofcode2019.intcode.opcode import Opcode
+from adventofcode2019.intcode.parameter_mode import ParameterMode
+
+LOG = logging.getLogger(__name__)
+
+
+def test_decode():
+    instr = decode([1002, 4, 3, 4, 33], 0)
+    assert instr.opcode == Opcode.MULTIPLY
+    assert instr.operands == ((ParameterMode.POSITION, 4), (ParameterMode.IMMEDIATE, 3),
+                              (ParameterMode.POSITION, 4))
+    assert str(instr) == 'mul [4], 3, [4]'
+    assert str(decode([204, -3], 0)) == 'out [rb-3]'
+    assert str(decode([99], 0)) == 'halt'
+    # writing to an immediate, a bad mode, a truncated instruction
+    assert decode([11101, 1, 1, 0], 0) is None
+    assert decode([301, 1, 1, 0], 0) is None
+    assert decode([1, 1], 0) is None
+    assert decode([199], 0) is None
+
+
+def test_blocks_and_cfg(caplog):
+    caplog.set_level(logging.DEBUG)
+    # is the input 8? output 1000 for yes and 999 for no
+    program = '3,12,1008,12,8,13,1005,13,17,104,999,99,0,0,0,0,0,104,1000,99'
+    result = analyze(program)
+    LOG.debug('\n%s', result.disassemble())
+    assert sorted(result.blocks) == [0, 9, 17]
+    assert result.blocks[0].successors == (9, 17)
+    assert [str(instr) for instr in result.blocks[0].instructions] == [
+        'in [12]', 'eq [12], 8, [13]', 'jnz [13], 17']
+    assert result.blocks[9].successors == result.blocks[17].successors == ()
+    # the data between the blocks is never decoded
+    assert 12 not in result.instructions
+    assert not (result.indirect_jumps or result.self_modifying or result.dynamic_writes
+                or result.invalid or result.overlapping)
+    assert all(result.is_safe(start) for start in result.blocks)
+
+
+def test_constant_conditions():
+    # an always-taken jump has no fall-through, a never-taken one no target
+    result = analyze('1105,1,7,104,0,104,1,1106,1,3,99')
+    assert result.blocks[0].successors == (7,)
+    assert result.blocks[7].successors == (10,)
+    assert 3 not in result.instructions
+
+
+def test_hazards():
+    # patches the HALT at 10 into an output, and jumps through [rb+12]
+    result = analyze('1101,4,0,10,1005,14,10,2105,1,12,99,0,0,0,0')
+    assert result.self_modifying == ((0, 10),)
+    assert result.indirect_jumps == (7,)
+    assert sorted(result.blocks) == [0, 7, 10]
+    assert not result.is_safe(10)
+    assert result.is_safe(0) and result.is_safe(7)
+    result = analyze('3,0,1005,0,13,99,0,0,0,0,0,0,0,21101,1,1,0,1106,1,4')
+    assert result.self_modifying == ((0, 0),)
+    assert result.dynamic_writes == (13,)
+    assert result.indirect_jumps == ()
+    # 1106 at 17 with a true condition never jumps, so 20 is reachable and empty
+    assert result.invalid == (20,)
+
+
+def test_cache():
+    program = [1, 0, 0, 0, 99]
+    result = analyze(program)
+    assert analyze('1,0,0,0,99') is result
+    assert result.program_hash == analysis.program_hash(program)
+    assert analyze(program, entry_points=(0, 4)) is not result
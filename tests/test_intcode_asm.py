@@ -0,0 +1,114 @@
+import logging
+
+import pytest
+
+from adventofcode2019.intcode.asm import assemble, fib, loop, memory_sweep
+from adventofcode2019.intcode.computer import IntcodeComputerV9
+from adventofcode2019.intcode.exceptions import AssemblyError
+
+
+def run(image, stdin=()):
+    vm = IntcodeComputerV9(image, stdin=list(stdin))
+    vm.run()
+    return list(vm.stdout)
+
+
+def test_assemble(caplog):
+    caplog.set_level(logging.DEBUG)
+    image = assemble('''
+    ; counts [counter] down from 3
+            add 3, 0, [counter]
+    loop:   add [counter], -1, [counter]
+            jnz [counter], loop
+            out [rb+data]
+            halt
+    counter: data 0
+    data:   data 7, counter + 1
+            zero 2
+    ''')
+    assert list(image) == [1101, 3, 0, 14, 1001, 14, -1, 14, 1005, 14, 4, 204, 15, 99,
+                           0, 7, 15, 0, 0]
+    assert run(image) == [7]
+
+
+def test_macros(caplog):
+    caplog.set_level(logging.DEBUG)
+    # doubles its input in a function, and swaps two stack elements
+    image = assemble('''
+            arb stack
+            in [rb]
+            arb 1
+            call double
+            pop [result]
+            push 1
+            push 2
+            pop [a]
+            pop [b]
+            out [result]
+            out [a]
+            out [b]
+            halt
+    double: mul [rb-2], 2, [rb-2]
+            ret
+    result: data 0
+    a:      data 0
+    b:      data 0
+    stack:
+    ''')
+    assert run(image, [21]) == [42, 2, 1]
+
+
+def test_rep(caplog):
+    caplog.set_level(logging.DEBUG)
+    image = assemble('''
+            rep 3, i
+            out i
+            out [rb+i]
+            end
+            rep 2
+            out 9
+            end
+            halt
+    ''')
+    assert run(image) == [0, 104, 1, 0, 2, 204, 9, 9]
+
+
+@pytest.mark.parametrize(
+    ('source', 'message'), [
+        ('frob 1', "line 1: Unknown mnemonic: 'frob'"),
+        ('halt\njmp nowhere', "line 2: Undefined label: 'nowhere'"),
+        ('a: halt\na: halt', "line 2: Duplicate label: 'a'"),
+        ('add 1, 2, 3', 'line 1: add cannot write to an immediate operand'),
+        ('add 1, 2', 'line 1: add takes 3 operands, not 2'),
+        ('jmp', 'line 1: Wrong number of operands for jmp: 0'),
+        ('out [rb-x]', "line 1: Invalid expression: '-x'"),
+        ('rep 2\nout 1', 'line 1: rep without end'),
+        ('rep 2\na: out 1\nend', 'line 2: Labels cannot be repeated'),
+    ],
+)
+def test_errors(source, message, caplog):
+    caplog.set_level(logging.DEBUG)
+    with pytest.raises(AssemblyError) as excinfo:
+        assemble(source)
+    assert str(excinfo.value).startswith(message)
+
+
+@pytest.mark.parametrize(('n', 'expected'), [(0, 0), (1, 1), (2, 1), (10, 55)])
+def test_fib(n, expected, caplog):
+    caplog.set_level(logging.DEBUG)
+    assert run(fib(n)) == [expected]
+
+
+@pytest.mark.parametrize('unrolled', [False, True])
+def test_memory_sweep(unrolled, caplog):
+    caplog.set_level(logging.DEBUG)
+    assert run(memory_sweep(100, passes=3, unrolled=unrolled)) == [300]
+    with pytest.raises(ValueError):
+        memory_sweep(0)
+
+
+def test_loop(caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV9(loop(100))
+    vm.run()
+    assert vm.steps == 202
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+
+import pytest
+
+from adventofcode2019.intcode.async_computer import AsyncIntcodeComputer
+from adventofcode2019.intcode.exceptions import Halt, InfiniteLoop, LimitExceeded
+from adventofcode2019.intcode.watchdog import Watchdog
+
+LOG = logging.getLogger(__name__)
+
+# reads one value, outputs it plus one and halts
+RELAY = '3,9,1001,9,1,9,4,9,99,0'
+FEEDBACK = '3,26,1001,26,-4,26,3,27,1002,27,2,27,1,27,26,27,4,27,1001,28,-1,28,1005,28,6,99,0,0,5'
+
+
+async def pipe(source: AsyncIntcodeComputer, destination: AsyncIntcodeComputer) -> None:
+    while True:
+        try:
+            destination.put_stdin(await source.get_stdout())
+        except Halt:
+            return
+
+
+def test_chain(caplog):
+    caplog.set_level(logging.DEBUG)
+
+    async def chain() -> int:
+        vms = [AsyncIntcodeComputer(RELAY) for _ in range(1000)]
+        vms[0].put_stdin(0)
+        await asyncio.gather(*(vm.run() for vm in vms),
+                             *(pipe(source, destination)
+                               for source, destination in zip(vms, vms[1:])))
+        return await vms[-1].get_stdout()
+
+    assert asyncio.run(chain()) == 1000
+
+
+def test_feedback_loop(caplog):
+    caplog.set_level(logging.DEBUG)
+
+    async def feedback() -> int:
+        vms = [AsyncIntcodeComputer(FEEDBACK, stdin=[phase]) for phase in (9, 8, 7, 6, 5)]
+        vms[0].put_stdin(0)
+        pipes = [asyncio.ensure_future(pipe(source, destination))
+                 for source, destination in zip(vms, vms[1:])]
+        signal = None
+        runs = asyncio.gather(*(vm.run() for vm in vms), *pipes)
+        with pytest.raises(Halt):
+            while True:
+                signal = await vms[-1].get_stdout()
+                vms[0].put_stdin(signal)
+        await runs
+        return signal
+
+    assert asyncio.run(feedback()) == 139629729
+
+
+def test_batches_share_the_loop(caplog):
+    caplog.set_level(logging.DEBUG)
+
+    async def race() -> list:
+        # counts [20] down from 1000 and outputs 1; the other outputs 2 straight away
+        busy = AsyncIntcodeComputer('1001,20,-1,20,1005,20,0,104,1,99' + ',0' * 10 + ',1000')
+        busy.batch_size = 10
+        quick = AsyncIntcodeComputer('104,2,99')
+        order = []
+
+        async def collect(vm: AsyncIntcodeComputer) -> None:
+            order.append(await vm.get_stdout())
+        await asyncio.gather(busy.run(), quick.run(), collect(busy), collect(quick))
+        return order
+
+    assert asyncio.run(race()) == [2, 1]
+
+
+def test_watchdog(caplog):
+    caplog.set_level(logging.DEBUG)
+
+    async def run(vm: AsyncIntcodeComputer) -> None:
+        # the VM stops instead of running batches forever
+        await asyncio.wait_for(vm.run(), 5)
+
+    vm = AsyncIntcodeComputer('1105,1,0')
+    vm.watchdog = Watchdog()
+    with pytest.raises(InfiniteLoop):
+        asyncio.run(run(vm))
+
+    # counts [20] up forever
+    vm = AsyncIntcodeComputer('1001,20,1,20,1105,1,0')
+    vm.watchdog = Watchdog(max_steps=50000)
+    with pytest.raises(LimitExceeded):
+        asyncio.run(run(vm))
+    assert vm.steps == 50000
@@ -0,0 +1,83 @@
+import logging
+
+import pytest
+
+from adventofcode2019.intcode.batch import BatchIntcodeComputer, LaneStatus
+from adventofcode2019.intcode.computer import IntcodeComputerV9
+
+LOG = logging.getLogger(__name__)
+
+COMPARE_TO_8 = ('3,21,1008,21,8,20,1005,20,22,107,8,21,20,1006,20,31,1106,0,36,98,0,0,1002,21,'
+                '125,20,4,20,1105,1,46,104,999,1105,1,46,1101,1000,1,20,4,20,1105,1,46,98,99')
+
+
+@pytest.mark.parametrize(
+    ('code', 'stdin'), [
+        (COMPARE_TO_8, [[7], [8], [9], [-3]]),
+        ('3,9,8,9,10,9,4,9,99,-1,8', [[8], [7]]),
+        ('3,3,1105,-1,9,1101,0,0,12,4,12,99,1', [[0], [1]]),
+        ('109,1,204,-1,1001,100,1,100,1008,100,16,101,1006,101,0,99', [[], []]),
+    ],
+)
+def test_lanes_match_scalar(code, stdin, caplog):
+    caplog.set_level(logging.DEBUG)
+    batch = BatchIntcodeComputer(code, lanes=len(stdin), stdin=stdin)
+    batch.run()
+    for lane, lane_stdin in enumerate(stdin):
+        vm = IntcodeComputerV9(code, stdin=lane_stdin)
+        vm.run()
+        assert batch.stdout(lane) == list(vm.stdout)
+        assert batch.status[lane] == LaneStatus.HALTED
+        assert batch.memory[lane].tolist() == [vm.memory[address]
+                                               for address in range(batch.memory.shape[1])]
+
+
+def test_waiting_and_failed(caplog):
+    caplog.set_level(logging.DEBUG)
+    batch = BatchIntcodeComputer('3,5,4,5,99,0', lanes=3, stdin=[[1], [], [2]])
+    batch.memory[2, 2] = 55
+    batch.run()
+    assert batch.status.tolist() == [LaneStatus.HALTED, LaneStatus.WAITING, LaneStatus.FAILED]
+    batch.put_stdin(1, 42)
+    batch.run()
+    assert batch.status[1] == LaneStatus.HALTED
+    assert batch.stdout(1) == [42]
+
+
+@pytest.mark.parametrize(
+    'code', [
+        # jumps to a negative address
+        '1105,1,-1,99',
+        # writes far beyond max_address
+        '1101,1,1,10000000000,99',
+        # overflows int64
+        '1102,4611686018427387904,2,0,99',
+        '1101,9223372036854775807,1,0,99',
+        '1102,-1,-9223372036854775808,0,99',
+    ],
+)
+def test_failed_lanes(code, caplog):
+    caplog.set_level(logging.DEBUG)
+    batch = BatchIntcodeComputer(code, lanes=2)
+    batch.run()
+    assert batch.status.tolist() == [LaneStatus.FAILED, LaneStatus.FAILED]
+    assert batch.memory.shape[1] < 1000
+
+
+def test_failed_output(caplog):
+    caplog.set_level(logging.DEBUG)
+    # outputs the cell its operand addresses, which is out of range in the second lane
+    batch = BatchIntcodeComputer('4,5,99,0,0,0', lanes=2)
+    batch.memory[1, 1] = 10000000000
+    batch.run()
+    assert batch.status.tolist() == [LaneStatus.HALTED, LaneStatus.FAILED]
+    assert batch.stdout(0) == [0]
+    assert batch.stdout(1) == []
+
+
+def test_no_false_overflow(caplog):
+    caplog.set_level(logging.DEBUG)
+    batch = BatchIntcodeComputer('1102,-3037000499,3037000499,0,1101,-5,-9,1,99', lanes=1)
+    batch.run()
+    assert batch.status[0] == LaneStatus.HALTED
+    assert batch.memory[0, :2].tolist() == [-3037000499 * 3037000499, -14]
@@ -0,0 +1,59 @@
+import logging
+from queue import Empty
+
+import pytest
+
+from adventofcode2019.intcode.channel import CallbackChannel, DequeChannel, SynchronizedChannel
+from adventofcode2019.intcode.computer import IntcodeComputerV9
+from adventofcode2019.intcode.exceptions import InvalidState, WaitingForInput
+
+LOG = logging.getLogger(__name__)
+
+# echoes every input it reads, forever
+ECHO = '3,100,4,100,1105,1,0'
+
+
+@pytest.mark.parametrize('channel_class', [DequeChannel, SynchronizedChannel])
+def test_bulk(channel_class, caplog):
+    caplog.set_level(logging.DEBUG)
+    channel = channel_class([1, 2])
+    channel.put_many(range(3, 6))
+    assert channel.values() == (1, 2, 3, 4, 5)
+    assert channel.drain(2) == [1, 2]
+    assert channel.drain() == [3, 4, 5]
+    assert channel.empty()
+    with pytest.raises(Empty):
+        channel.get()
+
+
+def test_put_iter_is_lazy(caplog):
+    caplog.set_level(logging.DEBUG)
+    pulled = []
+
+    def source():
+        for value in (2, 3):
+            pulled.append(value)
+            yield value
+
+    channel = DequeChannel([1])
+    channel.put_iter(source())
+    channel.put(4)
+    assert channel.get() == 1
+    assert not pulled
+    with pytest.raises(InvalidState):
+        channel.values()
+    assert not channel.empty()
+    assert pulled == [2]
+    assert channel.drain() == [2, 3, 4]
+
+
+def test_inputs_from_outputs(caplog):
+    caplog.set_level(logging.DEBUG)
+    outputs = []
+    vm = IntcodeComputerV9(ECHO, stdout=CallbackChannel(outputs.append))
+    # every input after the first is computed from the previous output
+    vm.stdin_channel.put_iter(outputs[-1] + 1 if outputs else 0 for _ in range(5))
+    with pytest.raises(WaitingForInput):
+        vm.run()
+    assert outputs == [0, 1, 2, 3, 4]
+    assert vm.stdout_channel.empty()
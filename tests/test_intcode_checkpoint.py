@@ -0,0 +1,75 @@
+import io
+import logging
+from pathlib import Path
+
+import numpy
+import pytest
+
+from adventofcode2019.intcode import checkpoint
+from adventofcode2019.intcode.computer import IntcodeComputer, IntcodeComputerV9, \
+    IntcodeComputerV11
+from adventofcode2019.intcode.exceptions import InvalidState
+from adventofcode2019.intcode.image import ProgramImage
+from adventofcode2019.intcode.memory import ListMemory, PagedMemory
+
+# reads two numbers and outputs their sum
+ADDER = '3,11,3,12,1,11,12,13,4,13,99,0,0,0'
+
+
+@pytest.mark.parametrize('memory_class', [ListMemory, PagedMemory])
+def test_save_and_resume(memory_class, tmp_path, caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV11(ADDER, stdin=[40], memory_class=memory_class)
+    vm.run_until()
+    vm.memory[5000] = 1 << 70
+    vm.put_stdout(3)
+    vm.save(tmp_path / 'vm.ckpt')
+    restored = IntcodeComputer.load(tmp_path / 'vm.ckpt')
+    assert type(restored) is IntcodeComputerV11
+    assert restored.iptr == 2
+    assert restored.memory[11] == 40
+    assert restored.memory[5000] == 1 << 70
+    assert restored.image == vm.image
+    assert type(restored.memory) is memory_class
+    assert restored.steps == vm.steps == 2
+    assert restored.blocking is False
+    restored.put_stdin(2)
+    restored.run()
+    assert list(restored.stdout) == [3, 42]
+
+
+def test_dirty_pages_only():
+    vm = IntcodeComputerV9(list(range(4096)), memory_class=PagedMemory)
+    vm.memory[1500] = -1
+    full, dirty = io.BytesIO(), io.BytesIO()
+    vm.save(full)
+    vm.save(dirty, embed_image=False)
+    # the image, and one 1024-cell page besides it
+    assert 4096 * 8 <= len(full.getvalue()) - len(dirty.getvalue()) < 4096 * 8 + 16
+    assert 1024 * 8 < len(dirty.getvalue()) < 1024 * 8 + 2048
+    with pytest.raises(InvalidState):
+        IntcodeComputer.load(io.BytesIO(dirty.getvalue()))
+    with pytest.raises(InvalidState):
+        IntcodeComputer.load(io.BytesIO(dirty.getvalue()), image=ProgramImage.parse('99'))
+    restored = IntcodeComputer.load(io.BytesIO(dirty.getvalue()), image=vm.image)
+    assert [restored.memory[address] for address in (0, 1499, 1500, 1501, 4095)] == \
+        [0, 1499, -1, 1501, 4095]
+    assert checkpoint.load(io.BytesIO(dirty.getvalue()), vm.image).memory.owned_pages == 1
+
+
+def test_mmap(tmp_path):
+    path = tmp_path / 'vm.ckpt'
+    IntcodeComputerV9('1101,2,3,0,99', compiled=True).save(path)
+    restored = IntcodeComputer.load(path, mmap=True)
+    assert isinstance(restored.image._cells, numpy.memmap)
+    assert restored.options()['compiled']
+    restored.run()
+    assert restored.memory[0] == 5
+    assert restored.image[0] == 1101
+
+
+def test_not_a_checkpoint(tmp_path):
+    path = Path(tmp_path / 'trace.bin')
+    path.write_bytes(b'ICTR' + bytes(16))
+    with pytest.raises(ValueError):
+        checkpoint.load(path)
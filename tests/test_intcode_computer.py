@@ -0,0 +1,206 @@
+import logging
+from contextlib import suppress
+
+import pytest
+
+from adventofcode2019.intcode.computer import IntcodeComputerV9
+from adventofcode2019.intcode.exceptions import Halt
+from adventofcode2019.intcode.instruction import OutputInstruction
+from adventofcode2019.intcode.run_status import RunStatus
+
+LOG = logging.getLogger(__name__)
+
+
+@pytest.mark.parametrize(
+    ('code', 'stdout'), [
+        # rewrites the operand of an already-executed output instruction, then loops back to it
+        ('104,1,1008,1,2,20,1005,20,16,1101,0,2,1,1105,1,0,99', [1, 2]),
+        ('109,1,204,-1,1001,100,1,100,1008,100,16,101,1006,101,0,99',
+         [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]),
+    ],
+)
+def test_run_matches_tick(code, stdout, caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV9(code)
+    vm.run()
+    assert list(vm.stdout) == stdout
+
+    stepped = IntcodeComputerV9(code)
+    with suppress(Halt):
+        while not stepped.is_terminated:
+            stepped.tick()
+    assert list(stepped.stdout) == stdout
+    assert str(stepped) == str(vm)
+
+
+@pytest.mark.parametrize('hot_threshold', [0, 1, 8])
+@pytest.mark.parametrize(
+    ('code', 'stdin', 'stdout'), [
+        ('104,1,1008,1,2,20,1005,20,16,1101,0,2,1,1105,1,0,99', [], [1, 2]),
+        # writes 99 over the instruction that follows it in the same block
+        ('1101,0,99,8,104,7,104,8,104,5,99', [], [7, 8]),
+        # patches an immediate-mode write later in the block into an output
+        ('1101,0,104,4,11101,5,99,0,99', [], [5]),
+        ('3,9,8,9,10,9,4,9,99,-1,8', [8], [1]),
+        ('3,12,6,12,15,1,13,14,13,4,13,99,-1,0,1,9', [0], [0]),
+        ('109,1,204,-1,1001,100,1,100,1008,100,16,101,1006,101,0,99', [],
+         [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]),
+        ('1102,34915192,34915192,7,4,7,99,0', [], [1219070632396864]),
+    ],
+)
+def test_compiled(hot_threshold, code, stdin, stdout, caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV9(code, stdin=stdin, compiled=True)
+    vm.hot_threshold = hot_threshold
+    vm.run()
+    assert list(vm.stdout) == stdout
+
+    interpreted = IntcodeComputerV9(code, stdin=stdin)
+    interpreted.run()
+    assert str(interpreted) == str(vm)
+
+
+@pytest.mark.parametrize(
+    ('code', 'stdin', 'stdout', 'superinstructions'), [
+        # counts [20] up to 5: increment, compare and branch
+        ('1001,20,1,20,1007,20,5,21,1005,21,0,4,20,99' + ',0' * 7, [], [5],
+         {0: 'increment_compare_branch'}),
+        # the flag is written over the branch's own condition operand, which then reads [1]
+        ('1107,0,1,5,1005,5,11,104,1,99,0,104,2,99', [], [1], {}),
+        # outputs a comparison, then writes a halt over it and jumps back
+        ('1008,13,7,14,4,14,1101,0,99,0,1105,1,0,7,0', [], [1], {}),
+        ('3,9,8,9,10,9,4,9,99,-1,8', [8], [1], {2: 'compute_output'}),
+        # pushes to and pops from the relative-base stack
+        ('109,1,204,-1,1001,100,1,100,1008,100,16,101,1006,101,0,99', [],
+         [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99],
+         {0: 'rb_adjust', 4: 'increment_compare_branch'}),
+    ],
+)
+def test_fused(code, stdin, stdout, superinstructions, caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV9(code, stdin=stdin, fused=True)
+    vm.run()
+    assert list(vm.stdout) == stdout
+    assert {address: superinstruction.idiom for address, superinstruction
+            in vm.fuser.superinstructions.items()} == superinstructions
+
+    interpreted = IntcodeComputerV9(code, stdin=stdin)
+    interpreted.run()
+    assert str(interpreted) == str(vm)
+
+
+def test_fused_suspended(caplog):
+    caplog.set_level(logging.DEBUG)
+    # adjusts the relative base, then waits for input saved through it
+    vm = IntcodeComputerV9('109,10,203,0,204,0,99', fused=True)
+    assert vm.run_until() is RunStatus.NEEDS_INPUT
+    vm.put_stdin(42)
+    assert vm.run_until() is RunStatus.HALTED
+    assert vm.rbptr == 10
+    assert vm.memory[10] == 42
+    assert list(vm.stdout) == [42]
+
+
+class DoublingOutputInstruction(OutputInstruction):
+    def execute(self, computer):
+        computer.put_stdout(2 * computer.get_parameter(1))
+
+    def specialize(self, computer, next_iptr, input_1):
+        put_stdout, read_1 = computer.put_stdout, self.reader(computer, input_1)
+
+        def handler():
+            put_stdout(2 * read_1())
+            return next_iptr
+        return handler
+
+
+def test_compiled_custom_instruction(caplog):
+    caplog.set_level(logging.DEBUG)
+    instruction_classes = [DoublingOutputInstruction if cls is OutputInstruction else cls
+                           for cls in IntcodeComputerV9.default_instruction_classes]
+    vm = IntcodeComputerV9('1101,1,2,9,104,3,1105,1,10,0,99', compiled=True,
+                           instruction_classes=instruction_classes)
+    vm.hot_threshold = 0
+    vm.run()
+    assert list(vm.stdout) == [6]
+    assert 4 in vm._uncompilable
+
+
+def test_compiled_self_modifying(caplog):
+    caplog.set_level(logging.DEBUG)
+    # counts [20] up to 100, writing to its first block's code on every iteration
+    vm = IntcodeComputerV9('1001,20,1,20,1001,2,0,2,1008,20,100,21,1006,21,0,4,20,99'
+                           + ',0' * 4, compiled=True)
+    vm.hot_threshold = 0
+    compile_block, compiled = vm.compiler.compile, []
+
+    def counting_compile(address):
+        compiled.append(address)
+        return compile_block(address)
+    vm.compiler.compile = counting_compile
+    vm.run()
+    assert list(vm.stdout) == [100]
+    # the rewritten block is interpreted from then on, not recompiled each time
+    assert compiled.count(0) == 1
+    assert 0 in vm._uncompilable
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_run_max_steps(compiled, caplog):
+    caplog.set_level(logging.DEBUG)
+    # counts [20] down from 1000, then outputs 1
+    vm = IntcodeComputerV9('1001,20,-1,20,1005,20,0,104,1,99' + ',0' * 10 + ',1000',
+                           compiled=compiled)
+    vm.hot_threshold = 0
+    assert vm.run_until(RunStatus.HALTED, max_steps=10) is RunStatus.BUDGET_EXHAUSTED
+    assert not vm.is_terminated
+    assert 0 < vm.memory[20] < 1000
+    vm.run()
+    assert vm.is_terminated
+    assert list(vm.stdout) == [1]
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_run_until(compiled, caplog):
+    caplog.set_level(logging.DEBUG)
+    # reads [20], outputs it and then it plus one, reads [21], halts
+    code = '3,20,4,20,1001,20,1,20,4,20,3,21,99'
+    vm = IntcodeComputerV9(code, compiled=compiled)
+    vm.hot_threshold = 0
+    assert vm.run_until(RunStatus.NEEDS_INPUT) is RunStatus.NEEDS_INPUT
+    assert vm.iptr == 0
+    vm.put_stdin(5)
+    assert vm.run_until(RunStatus.OUTPUT_READY) is RunStatus.OUTPUT_READY
+    assert list(vm.stdout) == [5]
+    assert vm.run_until(RunStatus.OUTPUT_READY) is RunStatus.OUTPUT_READY
+    assert list(vm.stdout) == [6]
+    assert vm.run_until(RunStatus.OUTPUT_READY) is RunStatus.NEEDS_INPUT
+    assert vm.iptr == 10
+    vm.put_stdin(7)
+    assert vm.run_until(RunStatus.NEEDS_INPUT) is RunStatus.HALTED
+    assert vm.memory[21] == 7
+    assert vm.run_until(RunStatus.NEEDS_INPUT) is RunStatus.HALTED
+
+    vm = IntcodeComputerV9(code, stdin=[5], compiled=compiled)
+    assert vm.run_until(RunStatus.OUTPUT_READY, outputs=2) is RunStatus.OUTPUT_READY
+    assert list(vm.stdout) == [5, 6]
+    assert vm.run_until(RunStatus.HALTED, max_steps=1) is RunStatus.NEEDS_INPUT
+
+
+def test_shared_instruction_table():
+    vm, other = IntcodeComputerV9('99'), IntcodeComputerV9('99')
+    assert vm.instructions is other.instructions is IntcodeComputerV9.default_instructions
+    with pytest.raises(TypeError):
+        vm.instructions[OutputInstruction.opcode] = OutputInstruction()
+    assert not hasattr(vm, '__dict__')
+
+    instruction_classes = [DoublingOutputInstruction if cls is OutputInstruction else cls
+                           for cls in IntcodeComputerV9.default_instruction_classes]
+    custom = IntcodeComputerV9('104,3,99', instruction_classes=instruction_classes)
+    assert custom.instructions is IntcodeComputerV9('99', instruction_classes=instruction_classes
+                                                    ).instructions
+    vm.register_instr(DoublingOutputInstruction)
+    assert vm.instructions is custom.instructions
+    assert other.instructions is IntcodeComputerV9.default_instructions
+    custom.run()
+    assert list(custom.stdout) == [6]
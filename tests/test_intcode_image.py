@@ -0,0 +1,71 @@
+import logging
+import pickle
+
+import numpy
+import pytest
+
+from adventofcode2019.intcode import analysis
+from adventofcode2019.intcode.computer import IntcodeComputerV9
+from adventofcode2019.intcode.image import ProgramImage
+from adventofcode2019.intcode.memory import ArrayMemory, PagedMemory
+
+
+def test_parse():
+    image = ProgramImage.parse('1,9,10,3,2,3,11,0,99,30,40,50\n')
+    assert len(image) == 12
+    assert list(image) == [1, 9, 10, 3, 2, 3, 11, 0, 99, 30, 40, 50]
+    assert image[8] == 99 and type(image[8]) is int
+    assert image == ProgramImage.of([1, 9, 10, 3, 2, 3, 11, 0, 99, 30, 40, 50])
+    assert image.digest == analysis.program_hash(image)
+    assert ProgramImage.of(image) is image
+    assert len(ProgramImage.parse('')) == 0
+    for malformed in ('1,x,3', '1,2,', '1,,3', '1 2,3', '1.5,2'):
+        with pytest.raises(ValueError):
+            ProgramImage.parse(malformed)
+
+
+def test_big_numbers():
+    image = ProgramImage.parse('104,1125899906842624,99,-9223372036854775808')
+    assert list(image) == [104, 1125899906842624, 99, -9223372036854775808]
+    image = ProgramImage.parse('104,99999999999999999999,99')
+    assert image[1] == 99999999999999999999
+    vm = IntcodeComputerV9(image)
+    vm.run()
+    assert list(vm.stdout) == [99999999999999999999]
+
+
+def test_shared_image():
+    image = ProgramImage.parse('1101,2,3,0,99')
+    vms = [IntcodeComputerV9(image, memory_class=PagedMemory) for _ in range(3)]
+    assert all(vm.memory.owned_pages == 0 for vm in vms)
+    vms[0].run()
+    assert vms[0].memory.owned_pages == 1
+    assert vms[0].memory[0] == 5
+    assert vms[1].memory[0] == image[0] == 1101
+    vm = IntcodeComputerV9(image, memory_class=ArrayMemory)
+    vm.run()
+    assert vm.memory[0] == 5 and image[0] == 1101
+
+
+def test_load_cache(tmp_path, caplog):
+    caplog.set_level(logging.DEBUG)
+    source = tmp_path / 'program.txt'
+    source.write_text('1,0,0,0,99\n')
+    cache = tmp_path / 'cache'
+    image = ProgramImage.load(source, cache)
+    cached = list(cache.iterdir())
+    assert len(cached) == 1
+    again = ProgramImage.load(source, cache)
+    assert isinstance(again._cells, numpy.memmap)
+    assert again == image
+    source.write_text('1,0,0,0,98,99\n')
+    assert len(ProgramImage.load(source, cache)) == 6
+    assert len(list(cache.iterdir())) == 2
+    assert ProgramImage.load(source) == ProgramImage.parse('1,0,0,0,98,99')
+
+
+def test_pickle():
+    image = ProgramImage.parse('1,0,0,0,99')
+    restored = pickle.loads(pickle.dumps(image))
+    assert restored == image
+    assert restored.digest == image.digest
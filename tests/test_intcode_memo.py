@@ -0,0 +1,40 @@
+import logging
+
+from adventofcode2019.intcode.computer import IntcodeComputerV5
+from adventofcode2019.intcode.memo import CachedRun, RunCache
+from adventofcode2019.intcode.run_status import RunStatus
+
+# reads two numbers and outputs their sum
+ADDER = '3,11,3,12,1,11,12,13,4,13,99,0,0,0'
+
+
+def test_hits_and_misses(caplog):
+    caplog.set_level(logging.DEBUG)
+    cache = RunCache()
+    assert cache.run(ADDER, [1, 2]) == CachedRun((3,), RunStatus.HALTED)
+    assert cache.run(ADDER.split(','), (1, 2)) == CachedRun((3,), RunStatus.HALTED)
+    assert cache.run(ADDER, [1]) == CachedRun((), RunStatus.NEEDS_INPUT)
+    # another instruction set is another function
+    cache.run(ADDER, [1, 2], IntcodeComputerV5)
+    assert cache.stats() == {'hits': 1, 'disk_hits': 0, 'misses': 3, 'entries': 3,
+                             'bytes': 3 * RunCache.entry_overhead + 8 * (3 + 1 + 3)}
+
+
+def test_eviction():
+    cache = RunCache(max_bytes=2 * (RunCache.entry_overhead + 24))
+    for value in range(3):
+        cache.run(ADDER, [value, 1])
+    assert cache.stats()['entries'] == 2
+    cache.run(ADDER, [2, 1])
+    cache.run(ADDER, [1, 1])
+    cache.run(ADDER, [0, 1])
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_disk_tier(tmp_path):
+    path = tmp_path / 'runs.sqlite'
+    RunCache(path=path).run(ADDER, [40, 2])
+    cache = RunCache(path=path)
+    assert cache.run(ADDER, [40, 2]).outputs == (42,)
+    assert cache.run(ADDER, [40, 2]).outputs == (42,)
+    assert (cache.hits, cache.disk_hits, cache.misses) == (1, 1, 0)
@@ -0,0 +1,99 @@
+import logging
+
+import pytest
+
+from adventofcode2019.intcode.computer import IntcodeComputer, IntcodeComputerV9, run_intcode
+from adventofcode2019.intcode.memory import ArrayMemory, DictMemory, ListMemory, PagedMemory
+
+LOG = logging.getLogger(__name__)
+
+BACKENDS = [DictMemory, ListMemory, ArrayMemory, PagedMemory]
+
+
+@pytest.mark.parametrize('memory_class', BACKENDS)
+@pytest.mark.parametrize(
+    ('initial', 'final'), [
+        ('1,9,10,3,2,3,11,0,99,30,40,50', '3500,9,10,70,2,3,11,0,99,30,40,50'),
+        ('1,1,1,4,99,5,6,0,99', '30,1,1,4,2,5,6,0,99'),
+    ],
+)
+def test_str(memory_class, initial, final, caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputer(initial, memory_class=memory_class)
+    vm.run()
+    assert str(vm) == final
+
+
+@pytest.mark.parametrize('memory_class', BACKENDS)
+def test_relative_mode(memory_class, caplog):
+    caplog.set_level(logging.DEBUG)
+    code = '109,1,204,-1,1001,100,1,100,1008,100,16,101,1006,101,0,99'
+    vm = IntcodeComputerV9(code, memory_class=memory_class)
+    vm.run()
+    assert list(vm.stdout) == [int(val) for val in code.split(',')]
+
+
+def test_array_overflow():
+    memory = ArrayMemory([1, 2])
+    assert memory.is_int64
+    memory[5] = 2 ** 70
+    assert not memory.is_int64
+    assert list(memory.values()) == [1, 2, 0, 0, 0, 2 ** 70]
+
+
+def test_paged_far_address():
+    memory = PagedMemory([1, 2])
+    memory[10 ** 12] = 7
+    assert memory[10 ** 12] == 7
+    assert memory[10 ** 12 - 1] == 0
+    assert len(memory) == len(list(memory))
+    assert len(PagedMemory([1, 2])) == 2
+
+
+@pytest.mark.parametrize('memory_class', BACKENDS)
+def test_negative_address(memory_class):
+    memory = memory_class([1, 2])
+    with pytest.raises(IndexError):
+        memory[-1] = 3
+    with pytest.raises(IndexError):
+        memory[-1]
+
+
+@pytest.mark.parametrize(
+    ('initial', 'final'), [
+        # written past the end of the image
+        ('1,0,0,10,99', '1,0,0,10,99,...0xa::2'),
+        # read past the end of the image
+        ('1,20,0,0,99', '1,20,0,0,99,...0x14::0'),
+    ],
+)
+def test_str_past_image(initial, final):
+    assert str(run_intcode(initial)) == final
+
+
+def test_far_address():
+    vm = IntcodeComputerV9('1101,1,1,10000000000,4,10000000000,99')
+    vm.run()
+    assert list(vm.stdout) == [2]
+
+
+def test_list_reader_follows_growth():
+    memory = ListMemory([1, 2])
+    read = memory.reader(1)
+    memory[100] = 3
+    memory[1] = 4
+    assert read() == 4
+
+
+def test_paged_over_base():
+    base = list(range(2500))
+    memory = PagedMemory.over(base)
+    assert memory[2048] == 2048 and memory[2500] == 0
+    assert memory.owned_pages == 0
+    memory[1030] = -1
+    assert memory.owned_pages == 1
+    assert base[1030] == 1030
+    assert len(memory) == 2500
+    assert list(memory.dirty_pages(base)) == [(1, [-1 if cell == 1030 else cell
+                                                   for cell in range(1024, 2048)])]
+    assert [page_no for page_no, _ in PagedMemory.from_memory(memory).dirty_pages(base)] == [1]
@@ -0,0 +1,107 @@
+import logging
+import urllib.request
+
+import pytest
+
+from adventofcode2019.intcode.computer import IntcodeComputerV9
+from adventofcode2019.intcode.image import ProgramImage
+from adventofcode2019.intcode.metrics import CONTENT_TYPE, MetricsRegistry, VMMetrics
+from adventofcode2019.intcode.run_status import RunStatus
+
+
+def samples(registry):
+    """the samples exposed, by name and labels"""
+    return {line.rpartition(' ')[0]: float(line.rpartition(' ')[2])
+            for line in registry.expose().splitlines() if not line.startswith('#')}
+
+
+def test_expose(caplog):
+    caplog.set_level(logging.DEBUG)
+    registry = MetricsRegistry()
+    registry.counter('jobs_total', 'Jobs run').labels().inc(3)
+    registry.gauge('queue_depth', 'Queued "jobs"\nnow', ['queue']).labels(queue='a\\b"').set(2)
+    histogram = registry.histogram('latency_seconds', 'Latency', buckets=[1, 0.1])
+    for value in (0.05, 0.1, 0.5, 5):
+        histogram.labels().observe(value)
+    assert registry.expose() == '''\
+# HELP jobs_total Jobs run
+# TYPE jobs_total counter
+jobs_total 3
+# HELP queue_depth Queued "jobs"\\nnow
+# TYPE queue_depth gauge
+queue_depth{queue="a\\\\b\\""} 2
+# HELP latency_seconds Latency
+# TYPE latency_seconds histogram
+latency_seconds_bucket{le="0.1"} 2
+latency_seconds_bucket{le="1"} 3
+latency_seconds_bucket{le="+Inf"} 4
+latency_seconds_sum 5.65
+latency_seconds_count 4
+'''
+
+
+def test_register(caplog):
+    caplog.set_level(logging.DEBUG)
+    registry = MetricsRegistry()
+    counter = registry.counter('jobs_total', 'Jobs run', ['queue'])
+    assert registry.counter('jobs_total', 'Jobs run', ['queue']) is counter
+    with pytest.raises(ValueError):
+        registry.gauge('jobs_total', 'Jobs run', ['queue'])
+    with pytest.raises(ValueError):
+        registry.counter('jobs_total', 'Jobs run')
+    with pytest.raises(ValueError):
+        registry.counter('jobs-total', 'Jobs run')
+    with pytest.raises(ValueError):
+        counter.labels(worker='a')
+    with pytest.raises(ValueError):
+        counter.labels(queue='a').inc(-1)
+
+
+def test_vm_metrics(tmp_path, caplog):
+    caplog.set_level(logging.DEBUG)
+    # counts [20] down from 3, then reads [21] and outputs it
+    image = ProgramImage.of('1001,20,-1,20,1005,20,0,3,21,4,21,99' + ',0' * 8 + ',3')
+    program = image.digest[:12]
+    registry = MetricsRegistry()
+    vm = IntcodeComputerV9(image)
+    vm.metrics = metrics = VMMetrics(registry, 'vm-1')
+    assert vm.run_until() is RunStatus.NEEDS_INPUT
+    vm.put_stdin(5)
+    assert vm.run_until(RunStatus.OUTPUT_READY) is RunStatus.OUTPUT_READY
+    assert vm.run_until() is RunStatus.HALTED
+
+    labels = f'vm="vm-1",program="{program}"'
+    data = samples(registry)
+    assert data[f'intcode_steps_total{{{labels}}}'] == vm.steps == 10
+    assert data[f'intcode_run_duration_seconds_count{{{labels}}}'] == 3
+    assert data[f'intcode_blocked_seconds_total{{{labels}}}'] > 0
+    assert data[f'intcode_stops_total{{{labels},status="needs_input"}}'] == 1
+    assert data[f'intcode_stops_total{{{labels},status="halted"}}'] == 1
+    assert data[f'intcode_stdout_depth{{{labels}}}'] == 1
+    # the input was saved just past the program
+    assert data[f'intcode_memory_cells{{{labels}}}'] == len(image) + 1
+
+    path = tmp_path / 'intcode.prom'
+    registry.write(path)
+    assert path.read_text() == registry.expose()
+    assert list(tmp_path.iterdir()) == [path]
+
+    metrics.remove()
+    assert 'vm-1' not in registry.expose()
+
+
+def test_serve(caplog):
+    caplog.set_level(logging.DEBUG)
+    registry = MetricsRegistry()
+    vm = IntcodeComputerV9('104,1,99')
+    vm.metrics = VMMetrics(registry, 'vm-1')
+    vm.run()
+    server = registry.serve()
+    try:
+        host, port = server.server_address[:2]
+        with urllib.request.urlopen(f'http://{host}:{port}/metrics', timeout=2) as response:
+            assert response.headers['Content-Type'] == CONTENT_TYPE
+            assert response.read().decode() == registry.expose()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,53 @@
+import logging
+
+import numpy
+import pytest
+
+from adventofcode2019.intcode.network import Network, ShmRing
+from adventofcode2019.intcode.run_status import RunStatus
+
+LOG = logging.getLogger(__name__)
+
+FEEDBACK = '3,26,1001,26,-4,26,3,27,1002,27,2,27,1,27,26,27,4,27,1001,28,-1,28,1005,28,6,99,0,0,5'
+# outputs 500 down to 1
+EMITTER = '4,10,1001,10,-1,10,1005,10,0,99,500'
+# passes on whatever it reads, forever
+REPEATER = '3,7,4,7,1105,1,0,0'
+
+
+def test_ring_buffer():
+    ring = ShmRing(numpy.zeros(ShmRing.cells(3), dtype=numpy.int64))
+    assert ring.empty()
+    assert [ring.put(value) for value in (1, 2, 3, 4)] == [True, True, True, False]
+    assert ring.drain() == [1, 2, 3]
+    assert ring.put(5) and ring.put(-6)
+    assert ring.drain() == [5, -6]
+    assert ring.drain() == [] and ring.empty()
+
+
+@pytest.mark.parametrize('workers', [0, 2, 5])
+def test_feedback_ring(workers, caplog):
+    caplog.set_level(logging.DEBUG)
+    network = Network.ring(FEEDBACK, [[9], [8], [7], [6], [5]])
+    network.send(0, 0)
+    results = network.run(workers)
+    assert results[4].last_output == 139629729
+    assert all(result.status is RunStatus.HALTED for result in results.values())
+
+
+@pytest.mark.parametrize('workers', [0, 3])
+def test_backpressure(workers, caplog):
+    caplog.set_level(logging.DEBUG)
+    # far more values than the rings between workers hold
+    network = Network(ring_capacity=8)
+    network.add('emitter', EMITTER)
+    for idx in range(6):
+        network.add(idx, REPEATER)
+    network.connect('emitter', 0)
+    for idx in range(5):
+        network.connect(idx, idx + 1)
+    results = network.run(workers)
+    assert results['emitter'].status is RunStatus.HALTED
+    assert results['emitter'].last_output == 1
+    assert results[5].outputs == tuple(range(500, 0, -1))
+    assert results[5].status is RunStatus.NEEDS_INPUT
@@ -0,0 +1,59 @@
+import json
+import logging
+
+from adventofcode2019.intcode.computer import IntcodeComputerV9
+from adventofcode2019.intcode.profiler import Profiler
+from adventofcode2019.intcode.run_status import RunStatus
+
+LOG = logging.getLogger(__name__)
+
+
+def test_counts(caplog):
+    caplog.set_level(logging.DEBUG)
+    # counts [20] down from 3, then reads [21] and outputs it
+    vm = IntcodeComputerV9('1001,20,-1,20,1005,20,0,3,21,4,21,99' + ',0' * 8 + ',3')
+    vm.profiler = profiler = Profiler()
+    assert vm.run_until() is RunStatus.NEEDS_INPUT
+    vm.put_stdin(5)
+    assert vm.run_until() is RunStatus.HALTED
+    assert list(vm.stdout) == [5]
+
+    data = profiler.as_dict()
+    # the input instruction is dispatched again once input has arrived
+    assert data['dispatches'] == 10
+    assert data['opcodes'] == {'ADD': 3, 'JUMP_IF_TRUE': 3, 'SAVE': 2, 'OUTPUT': 1, 'HALT': 1}
+    assert data['modes'] == {'ADD/010': 3, 'JUMP_IF_TRUE/01': 3, 'SAVE/0': 2, 'OUTPUT/0': 1,
+                             'HALT/': 1}
+    assert data['addresses'] == {'0': 3, '4': 3, '7': 2, '9': 1, '11': 1}
+    assert data['instruction_classes']['SaveInstruction']['mean_ns'] > 0
+    assert data['io_wait_ns'] > 0
+    assert json.loads(profiler.to_json()) == json.loads(json.dumps(data))
+    assert 'AddInstruction' in profiler.report()
+
+
+def test_detach(caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV9('104,1,1105,1,0')
+    vm.profiler = profiler = Profiler()
+    vm.run(max_steps=4)
+    vm.profiler = None
+    vm.run(max_steps=4)
+    assert profiler.as_dict()['dispatches'] == 4
+    assert list(vm.stdout) == [1] * 4
+
+
+def test_superinstructions(caplog):
+    caplog.set_level(logging.DEBUG)
+    # counts [20] up to 5, then outputs it
+    vm = IntcodeComputerV9('1001,20,1,20,1007,20,5,21,1005,21,0,4,20,99' + ',0' * 7,
+                           fused=True)
+    vm.profiler = profiler = Profiler()
+    vm.run()
+    assert list(vm.stdout) == [5]
+
+    data = profiler.as_dict()
+    assert data['dispatches'] == 7
+    assert data['superinstructions'] == {
+        'increment_compare_branch': {'count': 5, 'instructions': 15},
+    }
+    assert 'increment_compare_branch' in profiler.report()
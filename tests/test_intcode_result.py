@@ -0,0 +1,103 @@
+import io
+import logging
+
+import pytest
+
+from adventofcode2019.intcode.computer import IntcodeComputerV9, run_intcode
+from adventofcode2019.intcode.memory import ArrayMemory, DictMemory, PagedMemory
+from adventofcode2019.intcode.result import serialize
+from adventofcode2019.intcode.run_status import RunStatus
+
+LOG = logging.getLogger(__name__)
+
+
+def test_run_intcode(caplog):
+    caplog.set_level(logging.DEBUG)
+    result = run_intcode('1,9,10,3,2,3,11,0,99,30,40,50')
+    assert result.status is RunStatus.HALTED
+    assert result.steps == 3
+    assert result.outputs == ()
+    assert result.memory[0] == 3500
+    assert result.memory[3] == 70
+    assert result.memory[-1] == 50
+    assert result.memory[9:] == [30, 40, 50]
+    assert len(result.memory) == 12
+    with pytest.raises(IndexError):
+        result.memory[12]
+    assert str(result) == '3500,9,10,70,2,3,11,0,99,30,40,50'
+
+
+@pytest.mark.parametrize('memory_class', [DictMemory, ArrayMemory, PagedMemory])
+def test_memory_view(memory_class, caplog):
+    caplog.set_level(logging.DEBUG)
+    # writes 2 to [10], past the end of the image, then outputs it
+    vm = IntcodeComputerV9('1101,1,1,10,4,10,99', memory_class=memory_class)
+    vm.run()
+    result = vm.result()
+    assert result.outputs == (2,)
+    assert list(result.memory) == [1101, 1, 1, 10, 4, 10, 99, 0, 0, 0, 2]
+    assert result.memory.numpy().tolist() == list(result.memory)
+    # reading through the view allocates nothing
+    cells = len(vm.memory)
+    assert result.memory[8] == 0
+    assert len(vm.memory) == cells
+
+
+class ScannedMemory(DictMemory):
+    """counts the scans of its addresses, such as finding the highest one"""
+    scans = 0
+
+    def __iter__(self):
+        type(self).scans += 1
+        return super().__iter__()
+
+
+def test_memory_view_follows_memory(caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV9('1101,1,1,10,99', memory_class=ScannedMemory)
+    view = vm.result().memory
+    assert view[4] == 99
+    assert ScannedMemory.scans == 0
+    assert len(view) == 5
+    with pytest.raises(IndexError):
+        view[10]
+    vm.run()
+    assert len(view) == 11
+    assert view[10] == 2
+    assert view[-1] == 2
+
+
+def test_numpy_shares_array_memory():
+    vm = IntcodeComputerV9('1101,1,1,0,99', memory_class=ArrayMemory)
+    vm.run()
+    cells = vm.result().memory.numpy()
+    assert not cells.flags.writeable
+    vm.memory[1] = 7
+    assert cells[1] == 7
+
+
+def test_steps(caplog):
+    caplog.set_level(logging.DEBUG)
+    # counts [20] down from 1000, then outputs 1
+    vm = IntcodeComputerV9('1001,20,-1,20,1005,20,0,104,1,99' + ',0' * 10 + ',1000')
+    assert vm.run_until(max_steps=10) is RunStatus.BUDGET_EXHAUSTED
+    assert vm.result().steps == 10
+    assert vm.result().status is RunStatus.BUDGET_EXHAUSTED
+    assert vm.run_until(RunStatus.OUTPUT_READY) is RunStatus.OUTPUT_READY
+    assert vm.result().steps == 2001
+    vm.run()
+    assert vm.result().steps == 2002
+    assert vm.result().status is RunStatus.HALTED
+
+
+def test_streaming(caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV9('1,0,0,10,99')
+    vm.run()
+    result = vm.result()
+    text = '1,0,0,10,99,...0xa::2'
+    assert ''.join(serialize(vm.memory, chunk_size=2)) == text == str(vm)
+    assert list(result.memory.chunks(chunk_size=3)) == ['1,0,0', ',10,99,...0xa::2']
+    out = io.StringIO()
+    result.write(out)
+    assert out.getvalue() == text
@@ -0,0 +1,59 @@
+import logging
+
+import pytest
+
+from adventofcode2019.intcode.computer import IntcodeComputerV5
+from adventofcode2019.intcode.scheduler import Scheduler
+
+LOG = logging.getLogger(__name__)
+
+# reads one value, outputs it plus one and halts
+RELAY = '3,9,1001,9,1,9,4,9,99,0'
+# counts [20] down from 1000, then outputs 1
+BUSY = '1001,20,-1,20,1005,20,0,104,1,99' + ',0' * 10 + ',1000'
+QUICK = '104,2,99'
+# outputs the two values it reads, in order
+COLLECTOR = '3,11,3,12,4,11,4,12,99,0,0,0,0'
+
+
+def test_chain(caplog):
+    caplog.set_level(logging.DEBUG)
+    scheduler = Scheduler()
+    vms = [IntcodeComputerV5(RELAY) for _ in range(200)]
+    # added back to front, so most VMs start out waiting for input
+    for vm in reversed(vms):
+        scheduler.add(vm)
+    for source, destination in zip(vms, vms[1:]):
+        scheduler.connect(source, destination)
+    scheduler.send(vms[0], 0)
+    scheduler.run()
+    assert all(vm.is_terminated for vm in vms)
+    assert not scheduler.waiting
+    assert scheduler.last_output[vms[-2]] == 199
+    # the last VM has no outgoing edge, so its output stays in its stdout
+    assert list(vms[-1].stdout) == [200]
+
+
+@pytest.mark.parametrize(('time_slice', 'stdout'), [(None, [1, 2]), (10, [2, 1])])
+def test_time_slice(time_slice, stdout, caplog):
+    caplog.set_level(logging.DEBUG)
+    scheduler = Scheduler(time_slice)
+    busy, quick = scheduler.add(IntcodeComputerV5(BUSY)), scheduler.add(IntcodeComputerV5(QUICK))
+    collector = scheduler.add(IntcodeComputerV5(COLLECTOR))
+    scheduler.connect(busy, collector)
+    scheduler.connect(quick, collector)
+    scheduler.run()
+    assert list(collector.stdout) == stdout
+
+
+def test_waiting(caplog):
+    caplog.set_level(logging.DEBUG)
+    scheduler = Scheduler()
+    vm = scheduler.add(IntcodeComputerV5(RELAY))
+    scheduler.run()
+    assert scheduler.waiting == {vm}
+    scheduler.send(vm, 41)
+    scheduler.run()
+    assert not scheduler.waiting
+    assert vm.is_terminated
+    assert list(vm.stdout) == [42]
@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from adventofcode2019.intcode.channel import SynchronizedChannel
+from adventofcode2019.intcode.computer import IntcodeComputerV5, IntcodeComputerV9, \
+    IntcodeComputerV11
+from adventofcode2019.intcode.exceptions import InvalidState, WaitingForInput
+from adventofcode2019.intcode.memory import ListMemory, PagedMemory
+
+LOG = logging.getLogger(__name__)
+
+# reads two numbers and outputs their sum
+ADDER = '3,11,3,12,1,11,12,13,4,13,99,0,0,0'
+
+
+@pytest.mark.parametrize('memory_class', [ListMemory, PagedMemory])
+def test_fork_after_first_input(memory_class, caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV11(ADDER, stdin=[40], memory_class=memory_class)
+    with pytest.raises(WaitingForInput):
+        vm.run()
+    children = [vm.fork() for _ in range(3)]
+    for idx, child in enumerate(children):
+        assert type(child) is IntcodeComputerV11
+        assert child.iptr == vm.iptr == 2
+        child.put_stdin(idx)
+        child.run()
+        assert list(child.stdout) == [40 + idx]
+        assert child.is_terminated
+    assert vm.memory[13] == 0
+    assert not vm.is_terminated
+
+
+def test_snapshot_queued_io(caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV9('104,7,99', stdin=[1, 2], compiled=True)
+    vm.run()
+    snapshot = vm.snapshot()
+    assert snapshot.stdin == (1, 2)
+    assert snapshot.stdout == (7,)
+    restored = snapshot.restore()
+    assert restored.compiler is not None
+    assert restored.is_terminated
+    assert list(restored.stdout) == [7]
+    assert list(vm.stdout) == [7]
+
+
+def test_copy_on_write_pages():
+    parent = PagedMemory(range(3000))
+    child = parent.copy()
+    assert child.owned_pages == 0
+    child[5] = -1
+    assert child.owned_pages == 1
+    assert parent[5] == 5
+    parent[2500] = -2
+    assert parent.owned_pages == 1
+    assert child[2500] == 2500
+
+
+def test_restore_shares_pages(caplog):
+    caplog.set_level(logging.DEBUG)
+    snapshot = IntcodeComputerV9(ADDER, memory_class=PagedMemory).snapshot()
+    assert isinstance(snapshot.memory, PagedMemory)
+    child = snapshot.restore()
+    assert child.memory.owned_pages == 0
+    child.put_stdin(1)
+    child.put_stdin(2)
+    child.run()
+    assert list(child.stdout) == [3]
+    assert child.memory.owned_pages == 1
+    assert snapshot.memory[13] == 0
+
+
+def test_restore_configuration(caplog):
+    caplog.set_level(logging.DEBUG)
+    # writes far past the program, which the default memory prints with its address
+    vm = IntcodeComputerV9('1101,1,1,10,1101,2,0,4096,99')
+    vm.hot_threshold = 3
+    vm.blocking = False
+    vm.run()
+    child = vm.fork()
+    assert str(child) == str(vm) == '1101,1,1,10,1101,2,0,4096,99,...0xa::2,...0x1000::2'
+    assert child.options() == vm.options()
+    assert child.steps == vm.steps == 3
+    assert child.hot_threshold == 3
+    assert child.blocking is False
+
+
+def test_snapshot_while_running(caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV5(ADDER, stdin=SynchronizedChannel())
+    thread = threading.Thread(target=vm.run)
+    thread.start()
+    while not vm._running:
+        time.sleep(0.001)
+    with pytest.raises(InvalidState):
+        vm.snapshot()
+    vm.put_stdin(1)
+    vm.put_stdin(2)
+    thread.join()
+    assert vm.snapshot().iptr == 10
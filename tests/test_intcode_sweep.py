@@ -0,0 +1,43 @@
+import itertools
+import logging
+from pathlib import Path
+
+from adventofcode2019.intcode import sweep
+from adventofcode2019.intcode.memory import Memory
+
+LOG = logging.getLogger(__name__)
+
+# reads x and outputs (x - 3) * (7 - x), which peaks at x == 5
+PARABOLA = '3,21,1001,21,-3,22,1002,21,-1,23,1001,23,7,23,2,22,23,24,4,24,99'
+
+
+def is_target(memory: Memory) -> bool:
+    return memory[0] == 19690720
+
+
+def first_output(stdout):
+    return stdout[0]
+
+
+def test_find_patch(caplog):
+    caplog.set_level(logging.DEBUG)
+    code = (Path(__file__).parent.parent / 'inputs' / 'day2.txt').read_text()
+    candidates = ({1: noun, 2: verb} for noun, verb in itertools.product(range(28, 34), range(100)))
+    patch, memory = sweep.find(code, candidates, is_target, evaluate=sweep.patched_memory,
+                               workers=2, chunksize=50)
+    assert patch == {1: 31, 2: 46}
+    assert memory[0] == 19690720
+
+
+def test_find_nothing(caplog):
+    caplog.set_level(logging.DEBUG)
+    assert sweep.find('99', [[1], [2]], bool, workers=1) is None
+
+
+def test_stream_max(caplog):
+    caplog.set_level(logging.DEBUG)
+    improvements = list(sweep.stream_max(PARABOLA, ([x] for x in range(10)), first_output,
+                                         workers=2, chunksize=3))
+    assert improvements[-1] == ([5], 4)
+    assert [value for _, value in improvements] == sorted(value for _, value in improvements)
+    assert sweep.arg_max(PARABOLA, ([x] for x in range(10)), first_output, workers=1) == ([5], 4)
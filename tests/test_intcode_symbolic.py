@@ -0,0 +1,64 @@
+import logging
+from pathlib import Path
+
+import pytest
+
+from adventofcode2019.intcode import symbolic
+from adventofcode2019.intcode.exceptions import NotSymbolic
+from adventofcode2019.intcode.symbolic import Const, Symbol
+
+# [0] = ([9] + [10]) * 3
+AFFINE = '1,9,10,0,1002,0,3,0,99,0,0'
+
+
+def test_execute(caplog):
+    caplog.set_level(logging.DEBUG)
+    memory = symbolic.execute(AFFINE, symbols=(9, 10))
+    assert memory[0].linear() == (0, {9: 3, 10: 3})
+    assert memory[0].evaluate({9: 4, 10: 5}) == 27
+    assert memory[9] == Symbol(9)
+    assert memory[4] == Const(1002)
+
+
+def test_symbolic_address():
+    # [0] = [[1]] * [10]
+    memory = symbolic.execute('2,9,10,0,99,0,0,0,0,5,6', symbols=(1,))
+    assert memory[0].linear() is None
+    assert memory[0].evaluate({1: 9}) == 5 * 6
+    # the value read through an address is the one before later writes
+    memory = symbolic.execute('2,9,11,0,1101,5,0,11,99,0,0,3', symbols=(1,))
+    assert memory[0].evaluate({1: 11}) == 3 * 3
+    assert memory[11] == Const(5)
+
+
+@pytest.mark.parametrize(('program', 'symbols'), [
+    ('3,0,99', ()),
+    ('104,0,99', ()),
+    ('1005,4,3,99,0', (4,)),
+    ('1105,1,4,99,0', (4,)),
+    ('1,0,0,3,99', (3,)),
+    ('1105,1,0', ()),
+])
+def test_not_symbolic(program, symbols):
+    with pytest.raises(NotSymbolic):
+        symbolic.execute(program, symbols, max_steps=100)
+
+
+@pytest.mark.parametrize(('program', 'target', 'solution'), [
+    (AFFINE, 27, (0, 9)),
+    (AFFINE, 28, None),
+    # [0] = [9] * [10]
+    ('2,9,10,0,99,0,0,0,0,0,0', 42, (1, 42)),
+    # [0] = [9] if [9] else [10]
+    ('1005,9,7,1001,10,0,0,1001,9,0,0,99', 7, (0, 7)),
+    ('1005,9,7,1001,10,0,0,1001,9,0,0,99', 0, (0, 0)),
+])
+def test_solve(program, target, solution, caplog):
+    caplog.set_level(logging.DEBUG)
+    assert symbolic.solve(program, target, symbols=(9, 10), domain=range(100)) == solution
+
+
+def test_solve_day2():
+    code = (Path(__file__).parent.parent / 'inputs' / 'day2.txt').read_text()
+    assert symbolic.solve(code, 19690720) == (31, 46)
+    assert symbolic.solve(code, 8017076) == (12, 2)
@@ -0,0 +1,56 @@
+import io
+import logging
+
+from adventofcode2019.intcode import trace
+from adventofcode2019.intcode.computer import IntcodeComputerV9, IntcodeComputerV11
+from adventofcode2019.intcode.opcode import Opcode
+from adventofcode2019.intcode.trace import INT64_MIN, TraceRecord, Tracer
+
+LOG = logging.getLogger(__name__)
+
+
+def test_records(caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV9('1,9,10,11,4,11,99,0,0,2,3,0', compiled=True)
+    vm.hot_threshold = 0
+    vm.tracer = tracer = Tracer()
+    vm.run()
+    assert list(tracer) == [
+        TraceRecord(0, 1, 2, 3, 11, 11, 5),
+        TraceRecord(4, 4, 5, 0, 0, -1, 0),
+        TraceRecord(6, 99, 0, 0, 0, -1, 0),
+    ]
+    assert [record.opcode for record in tracer] == [Opcode.ADD, Opcode.OUTPUT, Opcode.HALT]
+
+
+def test_input_and_overflow(caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV11('203,3,1102,4294967296,4294967296,9,99,0,0,0')
+    vm.rbptr = 5
+    vm.tracer = tracer = Tracer()
+    vm.run_until()
+    assert not len(tracer)
+    vm.put_stdin(7)
+    vm.run_until()
+    assert vm.memory[9] == 1 << 64
+    assert list(tracer)[:2] == [
+        TraceRecord(0, 203, 8, 0, 0, 8, 7),
+        TraceRecord(2, 1102, 4294967296, 4294967296, 9, 9, INT64_MIN),
+    ]
+
+
+def test_ring_dump_and_load(caplog):
+    caplog.set_level(logging.DEBUG)
+    # counts [20] down from 10
+    vm = IntcodeComputerV9('1001,20,-1,20,1005,20,0,99' + ',0' * 12 + ',10')
+    vm.tracer = tracer = Tracer(capacity=4)
+    vm.run()
+    assert tracer.count == 21
+    records = list(tracer)
+    assert [record.iptr for record in records] == [4, 0, 4, 7]
+    assert records[1] == TraceRecord(0, 1001, 1, -1, 20, 20, 0)
+
+    dumped = io.BytesIO()
+    tracer.dump(dumped)
+    dumped.seek(0)
+    assert trace.load(dumped) == records
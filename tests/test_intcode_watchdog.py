@@ -0,0 +1,79 @@
+import logging
+
+import pytest
+
+from adventofcode2019.intcode.computer import IntcodeComputerV9, IntcodeComputerV11
+from adventofcode2019.intcode.exceptions import InfiniteLoop, LimitExceeded
+from adventofcode2019.intcode.memory import DictMemory, PagedMemory
+from adventofcode2019.intcode.run_status import RunStatus
+from adventofcode2019.intcode.watchdog import Cycle, Watchdog
+
+# counts [20] up to 3 and back to 0, forever: 3 + 3 + 5 dispatches per cycle
+WRAPPING_COUNTER = '1001,20,1,20,1008,20,3,21,1006,21,0,1101,0,0,20,1105,1,0'
+# a jump back to 0 whose target is read from memory
+INDIRECT = '1001,10,0,10,105,1,9,99,99,0,0'
+# counts [20] up forever, never repeating a state
+COUNTER = '1001,20,1,20,1105,1,0'
+
+
+@pytest.mark.parametrize('memory_class', [DictMemory, PagedMemory])
+@pytest.mark.parametrize(
+    ('code', 'cycle'), [
+        ('1105,1,0', Cycle(0, 1)),
+        (WRAPPING_COUNTER, Cycle(0, 11)),
+        (INDIRECT, Cycle(0, 2)),
+    ],
+)
+def test_cycle(code, cycle, memory_class, caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV9(code, memory_class=memory_class)
+    vm.watchdog = watchdog = Watchdog(check_interval=4)
+    assert vm.run_until() is RunStatus.LOOPING
+    assert watchdog.cycle == cycle
+    assert vm.iptr == cycle.address
+    # stopped in the state found repeating, from which it keeps looping
+    with pytest.raises(InfiniteLoop) as excinfo:
+        vm.run()
+    assert excinfo.value.cycle == cycle
+
+
+@pytest.mark.parametrize('options', [{'compiled': True}, {'fused': True}])
+def test_cycle_optimized(options, caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV9(WRAPPING_COUNTER, **options)
+    vm.hot_threshold = 0
+    vm.watchdog = watchdog = Watchdog()
+    assert vm.run_until() is RunStatus.LOOPING
+    assert watchdog.cycle.address == 0
+
+
+def test_no_false_positives(caplog):
+    caplog.set_level(logging.DEBUG)
+    # counts [20] down from 5000, then outputs 1
+    vm = IntcodeComputerV9('1001,20,-1,20,1005,20,0,104,1,99' + ',0' * 10 + ',5000')
+    vm.watchdog = Watchdog(check_interval=1)
+    assert vm.run_until() is RunStatus.HALTED
+    assert list(vm.stdout) == [1]
+
+    # echoes its input forever, but each repetition consumes some
+    vm = IntcodeComputerV11('3,100,4,100,1105,1,0', stdin=[7] * 100)
+    vm.watchdog = Watchdog(check_interval=1)
+    assert vm.run_until() is RunStatus.NEEDS_INPUT
+    assert list(vm.stdout) == [7] * 100
+
+
+def test_limits(caplog):
+    caplog.set_level(logging.DEBUG)
+    vm = IntcodeComputerV9(COUNTER)
+    vm.watchdog = Watchdog(max_steps=1000)
+    assert vm.run_until(max_steps=600) is RunStatus.BUDGET_EXHAUSTED
+    assert vm.run_until() is RunStatus.LIMIT_EXCEEDED
+    assert vm.steps == 1000
+    with pytest.raises(LimitExceeded):
+        vm.run()
+
+    vm = IntcodeComputerV9(COUNTER)
+    vm.watchdog = watchdog = Watchdog(timeout=0.05, check_interval=16)
+    with pytest.raises(LimitExceeded):
+        vm.run()
+    assert watchdog.elapsed > 0.05